@@ -155,12 +155,12 @@ def get_embeddings(embedding_model: Embedding, chunks_to_embed):
 
     return chunk_embeddings
 
-def add_chunks_to_db(chunk_db: ChunkDB, chunks, chunks_to_embed, chunk_embeddings, metadata, doc_id, supp_id):
-    # add the chunks to the chunk database
+def get_chunk_db_document(chunks, chunks_to_embed, chunk_embeddings, metadata, doc_id, supp_id) -> dict:
+    # the arguments of ChunkDB.add_document, in the shape ChunkDB.add_documents takes them
     assert len(chunks) == len(chunk_embeddings) == len(chunks_to_embed)
-    chunk_db.add_document(
-        doc_id,
-        {
+    return {
+        "doc_id": doc_id,
+        "chunks": {
             i: {
                 "chunk_text": chunk["content"],
                 "document_title": chunk["document_title"],
@@ -173,11 +173,21 @@ def add_chunks_to_db(chunk_db: ChunkDB, chunks, chunks_to_embed, chunk_embedding
             }
             for i, chunk in enumerate(chunks)
         },
-        supp_id,
-        metadata
+        "supp_id": supp_id,
+        "metadata": metadata,
+    }
+
+def add_chunks_to_db(chunk_db: ChunkDB, chunks, chunks_to_embed, chunk_embeddings, metadata, doc_id, supp_id):
+    # add the chunks to the chunk database
+    document = get_chunk_db_document(chunks, chunks_to_embed, chunk_embeddings, metadata, doc_id, supp_id)
+    chunk_db.add_document(
+        document["doc_id"],
+        document["chunks"],
+        document["supp_id"],
+        document["metadata"]
     )
 
-def add_vectors_to_db(vector_db: VectorDB, chunks, chunk_embeddings, metadata, doc_id):
+def add_vectors_to_db(vector_db: VectorDB, chunks, chunk_embeddings, metadata, doc_id, supp_id=""):
     # create metadata list to add to the vector database
     vector_metadata = []
     for i, chunk in enumerate(chunks):
@@ -201,6 +211,8 @@ def add_vectors_to_db(vector_db: VectorDB, chunks, chunk_embeddings, metadata, d
                 ),
                 "chunk_page_start": chunk_page_start,
                 "chunk_page_end": chunk_page_end,
+                # Only stored when set, so vector dbs with a fixed schema are unaffected
+                **({"supp_id": supp_id} if supp_id else {}),
                 # Add the rest of the metadata to the vector metadata
                 **metadata
             }
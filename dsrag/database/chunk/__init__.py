@@ -3,11 +3,13 @@ from .types import FormattedDocument
 
 # Always import the basic DB as it has no dependencies
 from .basic_db import BasicChunkDB
+from .cached_db import CachedChunkDB
 
 # Define what's in __all__ for "from dsrag.database.chunk import *"
 __all__ = [
     "ChunkDB", 
     "BasicChunkDB", 
+    "CachedChunkDB",
     "FormattedDocument"
 ]
 
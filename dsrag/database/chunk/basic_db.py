@@ -1,18 +1,177 @@
+import hashlib
+import json
 import os
 import pickle
-from typing import Any, Optional, cast
+import shutil
+import threading
+from collections.abc import Mapping
+from typing import Any, Optional, Sequence, cast
 
-from dsrag.database.chunk.db import ChunkDB
+from dsrag.database.chunk.db import ChunkDB, validate_chunk_fields
 from dsrag.database.chunk.types import FormattedDocument
+from dsrag.database.record_file import (
+    MAX_LOAD_ATTEMPTS,
+    RecordFile,
+    write_atomically,
+    write_record_file,
+)
+
+
+# format of the per-document layout's manifest; the single-pickle layout before it had none
+STORAGE_FORMAT_VERSION = 1
+
+
+def document_file_name(doc_id: str) -> str:
+    """doc_ids can contain any character, so document files are named after a hash of them."""
+    return hashlib.sha1(doc_id.encode("utf-8")).hexdigest() + ".pkl"
+
+
+class _DocumentFiles(Mapping):
+    """
+    The documents of a `BasicChunkDB`, stored as one pickle per document plus a manifest.
+
+    The manifest lists every document with the attributes that document-level calls need, so
+    only the documents that are actually read get unpickled. Loaded documents are kept in memory.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.manifest_path = os.path.join(directory, "manifest.json")
+        # doc_id -> {"file", "supp_id", "num_characters"}
+        self._entries: dict[str, dict[str, Any]] = {}
+        self._loaded: dict[str, dict[int, dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r") as f:
+                self._entries = json.load(f)["documents"]
+
+    def __getitem__(self, doc_id: str) -> dict[int, dict[str, Any]]:
+        entry = self._entries[doc_id]
+        document = self._loaded.get(doc_id)
+        if document is None:
+            with self._lock:
+                # another thread may have loaded it while we waited
+                document = self._loaded.get(doc_id)
+                if document is None:
+                    with open(os.path.join(self.directory, entry["file"]), "rb") as f:
+                        document = pickle.load(f)
+                    self._loaded[doc_id] = document
+        return document
+
+    def __contains__(self, doc_id) -> bool:
+        return doc_id in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def supp_id(self, doc_id: str) -> str:
+        return self._entries[doc_id]["supp_id"]
+
+    def num_characters(self) -> int:
+        return sum(entry["num_characters"] for entry in self._entries.values())
+
+    def add(self, documents: list[tuple[str, dict[int, dict[str, Any]], str]], persist: bool = True) -> None:
+        """Add or replace (doc_id, chunks, supp_id) documents, writing the manifest once."""
+        if persist:
+            os.makedirs(self.directory, exist_ok=True)
+        for doc_id, chunks, supp_id in documents:
+            file_name = document_file_name(doc_id)
+            if persist:
+                write_atomically(
+                    os.path.join(self.directory, file_name),
+                    lambda f: pickle.dump(chunks, f, protocol=pickle.HIGHEST_PROTOCOL),
+                )
+            first_chunk = chunks[min(chunks)] if chunks else {}
+            self._entries[doc_id] = {
+                "file": file_name,
+                "supp_id": supp_id or first_chunk.get("supp_id", ""),
+                "num_characters": sum(len(chunk.get("chunk_text", "")) for chunk in chunks.values()),
+            }
+            self._loaded[doc_id] = chunks
+        if persist:
+            self.save()
+
+    def remove(self, doc_id: str) -> None:
+        entry = self._entries.pop(doc_id, None)
+        if entry is None:
+            return
+        self._loaded.pop(doc_id, None)
+        # the manifest goes first, so a crash never leaves it pointing at a missing file
+        self.save()
+        try:
+            os.remove(os.path.join(self.directory, entry["file"]))
+        except OSError:
+            pass
+
+    def save(self) -> None:
+        manifest = {"format_version": STORAGE_FORMAT_VERSION, "documents": self._entries}
+        write_atomically(self.manifest_path, lambda f: f.write(json.dumps(manifest).encode("utf-8")))
+
+
+class _SharedDocument(Mapping):
+    """The chunks of one document in a published snapshot, unpickled on access."""
+
+    def __init__(self, records: RecordFile, start: int, chunk_indices: list[int]):
+        self._records = records
+        self._positions = {chunk_index: start + i for i, chunk_index in enumerate(chunk_indices)}
+
+    def __getitem__(self, chunk_index: int) -> dict[str, Any]:
+        return self._records[self._positions[chunk_index]]
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+
+class _SharedChunks(Mapping):
+    """A read-only view of a published snapshot with the same shape as `BasicChunkDB.data`."""
+
+    def __init__(self, records: RecordFile, documents: dict[str, tuple]):
+        self._records = records
+        # doc_id -> (start, chunk indices, supp_id); snapshots published before the per-document
+        # layout don't have the supp_id
+        self._documents = documents
+
+    def __getitem__(self, doc_id: str) -> _SharedDocument:
+        start, chunk_indices = self._documents[doc_id][:2]
+        return _SharedDocument(self._records, start, chunk_indices)
+
+    def __iter__(self):
+        return iter(self._documents)
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def supp_id(self, doc_id: str) -> str:
+        if len(self._documents[doc_id]) > 2:
+            return self._documents[doc_id][2]
+        return self[doc_id][0].get("supp_id", "")
+
+    def num_characters(self) -> int:
+        return sum(
+            len(chunk["chunk_text"]) for document in self.values() for chunk in document.values()
+        )
 
 
 class BasicChunkDB(ChunkDB):
     """
-    This is a basic implementation of a ChunkDB that stores chunks in a nested dictionary and persists them to disk by pickling the dictionary.
+    This is a basic implementation of a ChunkDB that stores chunks in a nested dictionary and persists them to disk with one pickle per document plus a manifest, so adding or removing a document only writes that document, and a document is only unpickled when it is first read. KBs saved as a single pickle are migrated to this layout when they are first loaded.
+
+    With `lazy_load=True` the manifest isn't read until the chunks are first accessed; `prefetch()` reads it in a background thread instead.
+
+    `publish()` writes the chunks as a versioned, memory-mapped snapshot. Instances opened with `read_only=True` serve that snapshot without copying it, so processes that open the same KB share one copy of the chunk text, and switch to a newer snapshot when `refresh()` is called.
     """
 
-    def __init__(self, kb_id: str, storage_directory: str = "~/dsRAG") -> None:
+    open_options = ("lazy_load", "read_only")
+
+    def __init__(self, kb_id: str, storage_directory: str = "~/dsRAG", lazy_load: bool = False, read_only: bool = False) -> None:
         self.kb_id = kb_id
+        self.read_only = read_only
         self.storage_directory = os.path.expanduser(
             storage_directory
         )  # Expand the user path
@@ -21,17 +180,54 @@ class BasicChunkDB(ChunkDB):
             os.path.join(self.storage_directory, "chunk_storage"), exist_ok=True
         )
         self.storage_path = os.path.join(
+            self.storage_directory, "chunk_storage", kb_id
+        )
+        self.legacy_storage_path = os.path.join(
             self.storage_directory, "chunk_storage", f"{kb_id}.pkl"
         )
-        self.load()
+        self.shared_storage_path = os.path.join(
+            self.storage_directory, "chunk_storage", f"{kb_id}.shared"
+        )
+        self.manifest_path = os.path.join(self.shared_storage_path, "manifest.json")
+        self.generation = 0
+        self._data: Optional[Mapping] = None
+        self._load_lock = threading.Lock()
+        if not lazy_load:
+            self.load()
+
+    @property
+    def data(self) -> Mapping:
+        """The stored chunks as a read-only {doc_id: {chunk_index: chunk}} mapping."""
+        if self._data is None:
+            with self._load_lock:
+                # another thread (e.g. a prefetch) may have loaded it while we waited
+                if self._data is None:
+                    self._data = self._read()
+        return self._data
+
+    def prefetch(self) -> threading.Thread:
+        thread = threading.Thread(
+            target=lambda: self.data, name=f"dsrag-prefetch-{self.kb_id}", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise ValueError(f"BasicChunkDB '{self.kb_id}' was opened read-only.")
 
     def add_document(self, doc_id: str, chunks: dict[int, dict[str, Any]], supp_id: str = "", metadata: Optional[dict] = None) -> None:
-        self.data[doc_id] = chunks
-        self.save()
+        self.add_documents([{"doc_id": doc_id, "chunks": chunks, "supp_id": supp_id, "metadata": metadata}])
+
+    def add_documents(self, documents: list[dict[str, Any]]) -> None:
+        self._check_writable()
+        self.data.add(
+            [(document["doc_id"], document["chunks"], document.get("supp_id", "")) for document in documents]
+        )
 
     def remove_document(self, doc_id: str):
-        self.data.pop(doc_id, None)
-        self.save()
+        self._check_writable()
+        self.data.remove(doc_id)
 
     def get_chunk_text(self, doc_id: str, chunk_index: int) -> Optional[str]:
         if doc_id in self.data and chunk_index in self.data[doc_id]:
@@ -51,6 +247,27 @@ class BasicChunkDB(ChunkDB):
             )
         return None, None
 
+    def get_chunks(
+        self,
+        doc_id: str,
+        chunk_start: int,
+        chunk_end: int,
+        fields: Optional[Sequence[str]] = None,
+    ) -> dict[int, dict[str, Any]]:
+        fields = validate_chunk_fields(fields)
+        document = self.data.get(doc_id)
+        if document is None:
+            return {}
+        chunks = {}
+        for chunk_index in range(chunk_start, chunk_end):
+            if chunk_index in document:
+                chunk = document[chunk_index]
+                # is_visual defaults to False for backwards compatibility, as in get_is_visual
+                chunks[chunk_index] = {
+                    field: chunk.get(field, False if field == "is_visual" else None) for field in fields
+                }
+        return chunks
+
     def get_document(
         self, doc_id: str, include_content: bool = False
     ) -> Optional[FormattedDocument]:
@@ -109,13 +326,17 @@ class BasicChunkDB(ChunkDB):
                 return None
         return None
 
+    def has_document(self, doc_id: str) -> bool:
+        # answered from the manifest, without loading the document
+        return doc_id in self.data
+
     def get_all_doc_ids(self, supp_id: Optional[str] = None) -> list[str]:
         doc_ids = list(self.data.keys())
         if supp_id:
             doc_ids = [
                 doc_id
                 for doc_id in doc_ids
-                if self.data[doc_id][0].get("supp_id", "") == supp_id
+                if self.data.supp_id(doc_id) == supp_id
             ]
         return doc_ids
     
@@ -124,26 +345,108 @@ class BasicChunkDB(ChunkDB):
         return len(self.data.keys())
     
     def get_total_num_characters(self) -> int:
-        total_num_characters = 0
-        for _, doc in self.data.items():
-            for chunk in doc.values():
-                total_num_characters += len(chunk["chunk_text"])
-        return total_num_characters
+        # taken from the manifest, so no document has to be loaded
+        return self.data.num_characters()
 
     def load(self):
-        try:
-            with open(self.storage_path, "rb") as f:
-                self.data = pickle.load(f)
-        except FileNotFoundError:
-            self.data = {}
+        with self._load_lock:
+            self._data = self._read()
+
+    def _read(self) -> Mapping:
+        if self.read_only and os.path.exists(self.manifest_path):
+            return self._read_snapshot()
+        documents = _DocumentFiles(self.storage_path)
+        if not os.path.exists(documents.manifest_path) and os.path.exists(self.legacy_storage_path):
+            self._migrate_legacy_storage(documents)
+        return documents
+
+    def _migrate_legacy_storage(self, documents: _DocumentFiles) -> None:
+        """Split a single-pickle KB into per-document files. Read-only instances only read it."""
+        with open(self.legacy_storage_path, "rb") as f:
+            legacy_data = pickle.load(f)
+        documents.add(
+            [(doc_id, chunks, "") for doc_id, chunks in legacy_data.items()],
+            persist=not self.read_only,
+        )
+        if not self.read_only:
+            os.remove(self.legacy_storage_path)
+
+    def _snapshot_paths(self, generation: int) -> tuple[str, str]:
+        return (
+            os.path.join(self.shared_storage_path, f"chunks.{generation}.records"),
+            os.path.join(self.shared_storage_path, f"documents.{generation}.pkl"),
+        )
+
+    def _read_manifest(self) -> dict:
+        with open(self.manifest_path, "r") as f:
+            return json.load(f)
+
+    def _read_snapshot(self) -> _SharedChunks:
+        for attempt in range(MAX_LOAD_ATTEMPTS):
+            generation = self._read_manifest()["generation"]
+            records_path, documents_path = self._snapshot_paths(generation)
+            try:
+                records = RecordFile(records_path)
+                with open(documents_path, "rb") as f:
+                    documents = pickle.load(f)
+                break
+            except FileNotFoundError:
+                # a newer snapshot was published and this one removed while opening it
+                if attempt == MAX_LOAD_ATTEMPTS - 1:
+                    raise
+        self.generation = generation
+        return _SharedChunks(records, documents)
 
     def save(self):
-        with open(self.storage_path, "wb") as f:
-            pickle.dump(self.data, f)
+        # documents are written as they're added; this only rewrites the manifest
+        self._check_writable()
+        self.data.save()
+
+    def publish(self) -> None:
+        """Write the current chunks as a new snapshot generation for read-only instances."""
+        self._check_writable()
+        os.makedirs(self.shared_storage_path, exist_ok=True)
+        if os.path.exists(self.manifest_path):
+            self.generation = self._read_manifest()["generation"] + 1
+        else:
+            self.generation = 1
+        documents = {}
+        records = []
+        for doc_id, chunks in self.data.items():
+            documents[doc_id] = (len(records), list(chunks.keys()), self.data.supp_id(doc_id))
+            records.extend(chunks.values())
+        records_path, documents_path = self._snapshot_paths(self.generation)
+        write_atomically(records_path, lambda f: write_record_file(f, records))
+        write_atomically(documents_path, lambda f: pickle.dump(documents, f, protocol=pickle.HIGHEST_PROTOCOL))
+        manifest = {"generation": self.generation, "num_documents": len(documents)}
+        write_atomically(self.manifest_path, lambda f: f.write(json.dumps(manifest).encode("utf-8")))
+
+        current_files = {os.path.basename(path) for path in (self.manifest_path, records_path, documents_path)}
+        for file_name in os.listdir(self.shared_storage_path):
+            if file_name not in current_files:
+                try:
+                    # readers that still map the old snapshot keep it alive until they refresh
+                    os.remove(os.path.join(self.shared_storage_path, file_name))
+                except OSError:
+                    pass
+
+    def refresh(self) -> bool:
+        if not self.read_only or self._data is None or not os.path.exists(self.manifest_path):
+            return False
+        if self._read_manifest()["generation"] == self.generation:
+            return False
+        self.load()
+        return True
 
     def delete(self):
+        self._check_writable()
         if os.path.exists(self.storage_path):
-            os.remove(self.storage_path)
+            shutil.rmtree(self.storage_path)
+        if os.path.exists(self.legacy_storage_path):
+            os.remove(self.legacy_storage_path)
+        if os.path.exists(self.shared_storage_path):
+            shutil.rmtree(self.shared_storage_path)
+        self._data = None
 
     def to_dict(self):
         return {
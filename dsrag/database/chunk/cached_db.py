@@ -0,0 +1,326 @@
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Optional, Sequence, Union
+
+from dsrag.database.chunk.db import ChunkDB, validate_chunk_fields
+from dsrag.database.chunk.types import FormattedDocument
+
+DEFAULT_MAX_ENTRIES = 100_000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# rough per-entry bookkeeping cost (key tuple, LRU links, per-document index) added to each value
+ENTRY_OVERHEAD_BYTES = 200
+
+
+class _FieldCache:
+    """
+    A thread-safe LRU of (doc_id, chunk_index, field) -> value, bounded by entry count and by
+    the approximate size of the cached values.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[tuple, tuple[Any, int]] = OrderedDict()
+        self._doc_keys: dict[str, set] = {}
+        # bumped on every invalidation, so values read before a write are not cached after it
+        self._doc_generations: dict[str, int] = {}
+        self._epoch = 0
+        self.num_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def generation(self, doc_id: str) -> tuple[int, int]:
+        with self._lock:
+            return self._epoch, self._doc_generations.get(doc_id, 0)
+
+    def get_many(self, keys: list[tuple]) -> dict[tuple, Any]:
+        """The cached values of `keys`; keys that aren't cached are left out."""
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    self.misses += 1
+                    continue
+                self._entries.move_to_end(key)
+                self.hits += 1
+                found[key] = entry[0]
+        return found
+
+    def put_many(self, doc_id: str, generation: tuple[int, int], values: dict[tuple, Any]) -> None:
+        with self._lock:
+            if (self._epoch, self._doc_generations.get(doc_id, 0)) != generation:
+                return
+            for key, value in values.items():
+                size = sys.getsizeof(value) + ENTRY_OVERHEAD_BYTES
+                if size > self.max_bytes:
+                    continue
+                previous = self._entries.pop(key, None)
+                if previous is not None:
+                    self.num_bytes -= previous[1]
+                self._entries[key] = (value, size)
+                self._doc_keys.setdefault(doc_id, set()).add(key)
+                self.num_bytes += size
+            while len(self._entries) > self.max_entries or self.num_bytes > self.max_bytes:
+                key, (_, size) = self._entries.popitem(last=False)
+                self.num_bytes -= size
+                self.evictions += 1
+                doc_keys = self._doc_keys[key[0]]
+                doc_keys.discard(key)
+                if not doc_keys:
+                    del self._doc_keys[key[0]]
+
+    def invalidate(self, doc_id: str) -> None:
+        with self._lock:
+            self._doc_generations[doc_id] = self._doc_generations.get(doc_id, 0) + 1
+            for key in self._doc_keys.pop(doc_id, ()):
+                self.num_bytes -= self._entries.pop(key)[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._epoch += 1
+            self._doc_generations.clear()
+            self._entries.clear()
+            self._doc_keys.clear()
+            self.num_bytes = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "bytes": self.num_bytes,
+            }
+
+
+class CachedChunkDB(ChunkDB):
+    """
+    A read-through cache in front of any other ChunkDB.
+
+    Chunk fields are cached individually, so a query that reads a chunk's text and one that only
+    reads its page numbers share entries, in an LRU bounded both by the number of cached values
+    and by their approximate size in memory. Adding or removing a document through this wrapper
+    drops that document's cached values. Writes made to the underlying database by other
+    processes are not seen until the affected values are evicted, or `refresh()` picks up a new
+    published generation.
+
+    Args:
+        chunk_db: The ChunkDB to cache, or its `to_dict()` config.
+        max_entries: The most field values to keep.
+        max_bytes: The most memory (approximately) the cached values may use.
+        lazy_load, read_only: Passed on to the wrapped ChunkDB when it is created from a config
+            and supports them.
+    """
+
+    open_options = ("lazy_load", "read_only")
+
+    def __init__(
+        self,
+        chunk_db: Union[ChunkDB, dict],
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        lazy_load: bool = False,
+        read_only: bool = False,
+    ) -> None:
+        if max_entries < 1 or max_bytes < 1:
+            raise ValueError(
+                f"Invalid chunk cache size: max_entries={max_entries}, max_bytes={max_bytes}."
+            )
+        if isinstance(chunk_db, dict):
+            subclass = ChunkDB.subclasses.get(chunk_db.get("subclass_name"))
+            supported = subclass.open_options if subclass is not None else ()
+            options = {"lazy_load": lazy_load, "read_only": read_only}
+            chunk_db = ChunkDB.from_dict({
+                **chunk_db,
+                **{name: True for name, enabled in options.items() if enabled and name in supported},
+            })
+        self.chunk_db = chunk_db
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._cache = _FieldCache(max_entries, max_bytes)
+
+    def to_dict(self):
+        parent_dict = super().to_dict()
+        return {
+            **parent_dict,
+            "chunk_db": self.chunk_db.to_dict(),
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+        }
+
+    def cache_stats(self) -> dict[str, int]:
+        return self._cache.stats()
+
+    def _get_cached(self, getter_name: str, doc_id: str, chunk_index: int) -> Any:
+        # single-chunk getters are cached apart from `get_chunks` fields: they return None for
+        # chunks that don't exist, which `get_chunks` has to leave out instead
+        key = (doc_id, chunk_index, getter_name)
+        found = self._cache.get_many([key])
+        if key in found:
+            return found[key]
+        generation = self._cache.generation(doc_id)
+        value = getattr(self.chunk_db, getter_name)(doc_id, chunk_index)
+        self._cache.put_many(doc_id, generation, {key: value})
+        return value
+
+    def add_document(self, doc_id: str, chunks: dict[int, dict[str, Any]], supp_id: str = "", metadata: Optional[dict] = None) -> None:
+        try:
+            self.chunk_db.add_document(doc_id, chunks, supp_id, metadata)
+        finally:
+            self._cache.invalidate(doc_id)
+
+    def add_documents(self, documents: list[dict[str, Any]]) -> None:
+        try:
+            self.chunk_db.add_documents(documents)
+        finally:
+            for document in documents:
+                self._cache.invalidate(document["doc_id"])
+
+    def remove_document(self, doc_id: str) -> None:
+        try:
+            self.chunk_db.remove_document(doc_id)
+        finally:
+            self._cache.invalidate(doc_id)
+
+    def get_chunk_text(self, doc_id: str, chunk_index: int) -> Optional[str]:
+        return self._get_cached("get_chunk_text", doc_id, chunk_index)
+
+    def get_is_visual(self, doc_id: str, chunk_index: int) -> Optional[bool]:
+        return self._get_cached("get_is_visual", doc_id, chunk_index)
+
+    def get_chunk_page_numbers(self, doc_id: str, chunk_index: int) -> Optional[tuple[int, int]]:
+        return self._get_cached("get_chunk_page_numbers", doc_id, chunk_index)
+
+    def get_document(self, doc_id: str, include_content: bool = False) -> Optional[FormattedDocument]:
+        return self.chunk_db.get_document(doc_id, include_content=include_content)
+
+    def get_document_title(self, doc_id: str, chunk_index: int) -> Optional[str]:
+        return self._get_cached("get_document_title", doc_id, chunk_index)
+
+    def get_document_summary(self, doc_id: str, chunk_index: int) -> Optional[str]:
+        return self._get_cached("get_document_summary", doc_id, chunk_index)
+
+    def get_section_title(self, doc_id: str, chunk_index: int) -> Optional[str]:
+        return self._get_cached("get_section_title", doc_id, chunk_index)
+
+    def get_section_summary(self, doc_id: str, chunk_index: int) -> Optional[str]:
+        return self._get_cached("get_section_summary", doc_id, chunk_index)
+
+    def _lookup_chunks(
+        self, doc_id: str, chunk_start: int, chunk_end: int, fields: list[str]
+    ) -> tuple[dict[tuple, Any], Optional[tuple[int, int, list[str]]]]:
+        """
+        The cached values of the range, and the (chunk_start, chunk_end, fields) still to fetch
+        from the wrapped ChunkDB: the uncached fields of the uncached part of the range.
+        """
+        keys = [
+            (doc_id, chunk_index, field)
+            for chunk_index in range(chunk_start, chunk_end)
+            for field in fields
+        ]
+        values = self._cache.get_many(keys)
+        missing = [key for key in keys if key not in values]
+        if not missing:
+            return values, None
+        missing_fields = [field for field in fields if any(key[2] == field for key in missing)]
+        return values, (missing[0][1], missing[-1][1] + 1, missing_fields)
+
+    def _fill_chunks(
+        self,
+        doc_id: str,
+        chunk_start: int,
+        chunk_end: int,
+        fields: list[str],
+        values: dict[tuple, Any],
+        fetched: Optional[dict[int, dict[str, Any]]] = None,
+        generation: Optional[tuple[int, int]] = None,
+    ) -> dict[int, dict[str, Any]]:
+        if fetched is not None:
+            fetched_values = {
+                (doc_id, chunk_index, field): value
+                for chunk_index, chunk in fetched.items()
+                for field, value in chunk.items()
+            }
+            self._cache.put_many(doc_id, generation, fetched_values)
+            values.update(fetched_values)
+
+        chunks = {}
+        for chunk_index in range(chunk_start, chunk_end):
+            chunk_keys = [(doc_id, chunk_index, field) for field in fields]
+            # chunks that don't exist are never cached or fetched
+            if all(key in values for key in chunk_keys):
+                chunks[chunk_index] = {key[2]: values[key] for key in chunk_keys}
+        return chunks
+
+    def get_chunks(
+        self,
+        doc_id: str,
+        chunk_start: int,
+        chunk_end: int,
+        fields: Optional[Sequence[str]] = None,
+    ) -> dict[int, dict[str, Any]]:
+        """
+        Serve the range from the cache, fetching the uncached fields of the uncached part of the
+        range (from its first to its last uncached chunk) with one call to the wrapped ChunkDB.
+        """
+        fields = validate_chunk_fields(fields)
+        values, missing = self._lookup_chunks(doc_id, chunk_start, chunk_end, fields)
+        if missing is None:
+            return self._fill_chunks(doc_id, chunk_start, chunk_end, fields, values)
+        generation = self._cache.generation(doc_id)
+        missing_start, missing_end, missing_fields = missing
+        fetched = self.chunk_db.get_chunks(doc_id, missing_start, missing_end, fields=missing_fields)
+        return self._fill_chunks(doc_id, chunk_start, chunk_end, fields, values, fetched, generation)
+
+    async def aget_chunks(
+        self,
+        doc_id: str,
+        chunk_start: int,
+        chunk_end: int,
+        fields: Optional[Sequence[str]] = None,
+    ) -> dict[int, dict[str, Any]]:
+        """Like `get_chunks`, but a range that's fully cached is served without leaving the event loop."""
+        fields = validate_chunk_fields(fields)
+        values, missing = self._lookup_chunks(doc_id, chunk_start, chunk_end, fields)
+        if missing is None:
+            return self._fill_chunks(doc_id, chunk_start, chunk_end, fields, values)
+        generation = self._cache.generation(doc_id)
+        missing_start, missing_end, missing_fields = missing
+        fetched = await self.chunk_db.aget_chunks(doc_id, missing_start, missing_end, fields=missing_fields)
+        return self._fill_chunks(doc_id, chunk_start, chunk_end, fields, values, fetched, generation)
+
+    def has_document(self, doc_id: str) -> bool:
+        return self.chunk_db.has_document(doc_id)
+
+    def get_all_doc_ids(self, supp_id: Optional[str] = None) -> list[str]:
+        return self.chunk_db.get_all_doc_ids(supp_id)
+
+    def get_document_count(self) -> int:
+        return self.chunk_db.get_document_count()
+
+    def get_total_num_characters(self) -> Optional[int]:
+        return self.chunk_db.get_total_num_characters()
+
+    def prefetch(self):
+        return self.chunk_db.prefetch()
+
+    def publish(self) -> None:
+        self.chunk_db.publish()
+
+    def refresh(self) -> bool:
+        refreshed = self.chunk_db.refresh()
+        if refreshed:
+            self._cache.clear()
+        return refreshed
+
+    def delete(self) -> None:
+        try:
+            self.chunk_db.delete()
+        finally:
+            self._cache.clear()
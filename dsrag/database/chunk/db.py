@@ -1,11 +1,38 @@
+import threading
 from abc import ABC, abstractmethod
-from typing import Any, Optional
+from typing import Any, Optional, Sequence
 
 from dsrag.database.chunk.types import FormattedDocument
+from dsrag.utils.async_utils import run_sync
+
+# per-chunk columns that `ChunkDB.get_chunks` can return
+CHUNK_FIELDS = (
+    "chunk_text",
+    "document_title",
+    "document_summary",
+    "section_title",
+    "section_summary",
+    "chunk_page_start",
+    "chunk_page_end",
+    "is_visual",
+)
+
+
+def validate_chunk_fields(fields: Optional[Sequence[str]]) -> tuple[str, ...]:
+    """Return the requested fields, or all of them if `fields` is None."""
+    if fields is None:
+        return CHUNK_FIELDS
+    unknown = [field for field in fields if field not in CHUNK_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown chunk fields: {unknown}. Expected a subset of {CHUNK_FIELDS}.")
+    return tuple(fields)
 
 
 class ChunkDB(ABC):
     subclasses = {}
+    # open-time constructor flags the subclass accepts: "lazy_load" defers its disk reads until
+    # first use, "read_only" serves published data shared between processes
+    open_options: tuple[str, ...] = ()
 
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
@@ -34,6 +61,22 @@ class ChunkDB(ABC):
         """
         pass
 
+    def add_documents(self, documents: list[dict[str, Any]]) -> None:
+        """
+        Store several documents at once. Each entry has the arguments of `add_document` as keys:
+        "doc_id", "chunks" and optionally "supp_id" and "metadata".
+
+        The default adds them one at a time; backends that can write them in a single
+        transaction override this.
+        """
+        for document in documents:
+            self.add_document(
+                document["doc_id"],
+                document["chunks"],
+                document.get("supp_id", ""),
+                document.get("metadata"),
+            )
+
     @abstractmethod
     def remove_document(self, doc_id: str) -> None:
         """
@@ -97,6 +140,75 @@ class ChunkDB(ABC):
         """
         pass
 
+    def get_chunks(
+        self,
+        doc_id: str,
+        chunk_start: int,
+        chunk_end: int,
+        fields: Optional[Sequence[str]] = None,
+    ) -> dict[int, dict[str, Any]]:
+        """
+        Retrieve several fields of a contiguous range of chunks in one call.
+
+        Args:
+            doc_id: The document ID.
+            chunk_start: The first chunk index of the range.
+            chunk_end: The chunk index after the last one in the range (non-inclusive, like
+                segment ends).
+            fields: The names of the fields to return, from `CHUNK_FIELDS`. Defaults to all of them.
+
+        Returns:
+            A dictionary mapping each chunk index in the range that exists to a dictionary of
+            the requested fields.
+
+        The default implementation calls the per-chunk getters; backends override it with a
+        single range read.
+        """
+        fields = validate_chunk_fields(fields)
+        getters = {
+            "chunk_text": self.get_chunk_text,
+            "document_title": self.get_document_title,
+            "document_summary": self.get_document_summary,
+            "section_title": self.get_section_title,
+            "section_summary": self.get_section_summary,
+            "is_visual": self.get_is_visual,
+        }
+        chunks = {}
+        for chunk_index in range(chunk_start, chunk_end):
+            chunk_text = self.get_chunk_text(doc_id, chunk_index)
+            if chunk_text is None:
+                continue
+            chunk = {}
+            if "chunk_page_start" in fields or "chunk_page_end" in fields:
+                chunk["chunk_page_start"], chunk["chunk_page_end"] = self.get_chunk_page_numbers(doc_id, chunk_index)
+            for field in fields:
+                if field == "chunk_text":
+                    chunk[field] = chunk_text
+                elif field in getters:
+                    chunk[field] = getters[field](doc_id, chunk_index)
+            chunks[chunk_index] = {field: chunk[field] for field in fields}
+        return chunks
+
+    def has_document(self, doc_id: str) -> bool:
+        """
+        Check whether a document is stored. The default lists every document ID; backends
+        override it with an indexed lookup.
+        """
+        return doc_id in self.get_all_doc_ids()
+
+    async def aget_chunks(
+        self,
+        doc_id: str,
+        chunk_start: int,
+        chunk_end: int,
+        fields: Optional[Sequence[str]] = None,
+    ) -> dict[int, dict[str, Any]]:
+        """
+        Async version of `get_chunks`. The default runs `get_chunks` in a shared thread pool;
+        backends with an async driver override it.
+        """
+        return await run_sync(self.get_chunks, doc_id, chunk_start, chunk_end, fields)
+
     @abstractmethod
     def get_all_doc_ids(self, supp_id: Optional[str] = None) -> list[str]:
         """
@@ -104,6 +216,32 @@ class ChunkDB(ABC):
         """
         pass
 
+    def prefetch(self) -> Optional[threading.Thread]:
+        """
+        Start loading a lazily loaded chunk database in a background thread, so the first query
+        doesn't pay for it. Returns the thread, or None for backends with nothing to load.
+        """
+        return None
+
+    def publish(self) -> None:
+        """
+        Make all changes so far visible to read-only instances of the chunk database. A no-op for
+        backends whose writes are visible to all readers as soon as they are made.
+        """
+        return None
+
+    def refresh(self) -> bool:
+        """
+        Switch a read-only instance to the latest published data. Returns True if anything changed.
+        """
+        return False
+
+    def cache_stats(self) -> Optional[dict[str, int]]:
+        """
+        Hit/miss counters of a caching chunk database, or None for backends that don't cache.
+        """
+        return None
+
     @abstractmethod
     def delete(self) -> None:
         """
@@ -1,13 +1,22 @@
 import os
-from typing import Any, Optional
+import threading
+from typing import Any, Optional, Sequence
 from decimal import Decimal
 import time
 from dsrag.utils.imports import boto3
-from dsrag.database.chunk.db import ChunkDB
+from dsrag.database.chunk.db import ChunkDB, validate_chunk_fields
 from dsrag.database.chunk.types import FormattedDocument
 from dsrag.database.chunk.metadata_utils import deserialize_metadata
 
 
+# the most keys a single BatchGetItem request may ask for
+BATCH_GET_MAX_KEYS = 100
+
+# keys DynamoDB leaves unprocessed (e.g. when throttled) are retried with exponential backoff
+MAX_BATCH_GET_ATTEMPTS = 8
+BATCH_GET_RETRY_DELAY = 0.05  # seconds
+
+
 def get_key():
     """Helper function to get the Key class from boto3.dynamodb.conditions"""
     return boto3.dynamodb.conditions.Key
@@ -29,10 +38,18 @@ def process_items(items):
 
 
 class DynamoDB(ChunkDB):
+    """
+    A ChunkDB backed by a DynamoDB table keyed by (doc_id, chunk_index).
+
+    Each thread reuses its own boto3 resource and Table (boto3 resources aren't thread-safe),
+    rather than creating a client per call.
+    """
 
     def __init__(self, kb_id: str, table_name: str = None, billing_mode: str = "PAY_PER_REQUEST") -> None:
         self.kb_id = kb_id
         self.billing_mode = billing_mode
+        self._local = threading.local()
+        self._table_active = False
         if table_name is not None:
             self.table_name = table_name
         else:
@@ -85,16 +102,32 @@ class DynamoDB(ChunkDB):
         # If the table name is provided, check if the table exists
         # If the table does not exist, create a new table
 
+    def _resources(self):
+        """This thread's (resource, Table), created on first use in each thread and process."""
+        local = self._local
+        if getattr(local, "table", None) is None or local.pid != os.getpid():
+            local.resource = self.create_dynamo_client()
+            local.table = local.resource.Table(self.table_name)
+            local.pid = os.getpid()
+        return local.resource, local.table
+
+    @property
+    def table(self):
+        return self._resources()[1]
+
     def check_table_status(self):
         # Need to make sure the table has been created before proceeding
-        dynamodb = self.create_dynamo_client()
-        table = dynamodb.Table(self.table_name)
+        if self._table_active:
+            return "ACTIVE"
         try:
-            response = table.table_status
-            return response
+            # a cached Table keeps the status it first loaded, so ask DynamoDB directly
+            response = self.table.meta.client.describe_table(TableName=self.table_name)
         except Exception as e:
             print(e)
             return None
+        status = response["Table"]["TableStatus"]
+        self._table_active = status == "ACTIVE"
+        return status
     
     def create_dynamo_client(self):
         dynamodb_client = boto3.resource(
@@ -136,15 +169,13 @@ class DynamoDB(ChunkDB):
                 BillingMode=self.billing_mode,  # On-demand billing
             )
             print("Table creation initiated. Status:", response)
-            time.sleep(5)
+            response.wait_until_exists()
         except Exception as e:
             print(e)
 
 
     def add_document(self, doc_id: str, chunks: dict[int, dict[str, Any]], supp_id: str = "", metadata: Optional[dict] = None) -> None:
-        # Initialize DynamoDB resource
-        dynamo_db = self.create_dynamo_client()
-        table = dynamo_db.Table(self.table_name)
+        table = self.table
 
         table_status = self.check_table_status()
         if table_status is None:
@@ -216,16 +247,21 @@ class DynamoDB(ChunkDB):
 
     def remove_document(self, doc_id: str) -> None:
         # Have to get all the items first
-        dynamo_db = self.create_dynamo_client()
-        table = dynamo_db.Table(self.table_name)
+        table = self.table
         
         # Get all items from the table with the given doc_id
-        response = table.query(
-            KeyConditionExpression=get_key()('doc_id').eq(doc_id),
-            ProjectionExpression='doc_id, chunk_index'
-        )
+        query_kwargs = {
+            'KeyConditionExpression': get_key()('doc_id').eq(doc_id),
+            'ProjectionExpression': 'doc_id, chunk_index',
+        }
+        response = table.query(**query_kwargs)
         items = response.get('Items', [])
 
+        # Handle pagination
+        while 'LastEvaluatedKey' in response:
+            response = table.query(**query_kwargs, ExclusiveStartKey=response['LastEvaluatedKey'])
+            items.extend(response.get('Items', []))
+
         # Delete the items in batches (25 items per batch)
         # Keep track of which items have been deleted
         deleted_items = []
@@ -243,8 +279,7 @@ class DynamoDB(ChunkDB):
 
 
     def get_document(self, doc_id: str, include_content: bool = False) -> Optional[FormattedDocument]:
-        dynamo_db = self.create_dynamo_client()
-        table = dynamo_db.Table(self.table_name)
+        table = self.table
 
         # Define the attributes to retrieve
         projection_attributes = ['supp_id', 'document_title', 'document_summary', 'created_on', 'metadata']
@@ -330,9 +365,87 @@ class DynamoDB(ChunkDB):
             # Handle exceptions as needed
             return None
 
+    def get_chunks(
+        self,
+        doc_id: str,
+        chunk_start: int,
+        chunk_end: int,
+        fields: Optional[Sequence[str]] = None,
+    ) -> dict[int, dict[str, Any]]:
+        fields = validate_chunk_fields(fields)
+        if chunk_end <= chunk_start:
+            return {}
+        table = self.table
+
+        # Build the ProjectionExpression and ExpressionAttributeNames to handle reserved words
+        attributes = ['chunk_index', *fields]
+        expression_attribute_names = {f'#{attr}': attr for attr in attributes}
+        query_kwargs = {
+            'KeyConditionExpression': get_key()('doc_id').eq(doc_id)
+            & get_key()('chunk_index').between(chunk_start, chunk_end - 1),
+            'ProjectionExpression': ', '.join(expression_attribute_names.keys()),
+            'ExpressionAttributeNames': expression_attribute_names,
+        }
+        response = table.query(**query_kwargs)
+        items = response.get('Items', [])
+
+        # Handle pagination
+        while 'LastEvaluatedKey' in response:
+            response = table.query(**query_kwargs, ExclusiveStartKey=response['LastEvaluatedKey'])
+            items.extend(response.get('Items', []))
+
+        return {
+            item['chunk_index']: {field: item.get(field) for field in fields}
+            for item in process_items(items)
+        }
+
+    def get_chunks_by_keys(
+        self,
+        keys: Sequence[tuple[str, int]],
+        fields: Optional[Sequence[str]] = None,
+    ) -> dict[tuple[str, int], dict[str, Any]]:
+        """
+        Fetch chunks from any number of documents by (doc_id, chunk_index), with one BatchGetItem
+        request per 100 keys. `get_chunks` is cheaper for a contiguous range of one document.
+
+        Returns:
+            {(doc_id, chunk_index): {field: value}}. Chunks that don't exist are left out.
+        """
+        fields = validate_chunk_fields(fields)
+        resource = self._resources()[0]
+        attributes = ['doc_id', 'chunk_index', *fields]
+        expression_attribute_names = {f'#{attr}': attr for attr in attributes}
+        unique_keys = list(dict.fromkeys((doc_id, int(chunk_index)) for doc_id, chunk_index in keys))
+
+        chunks = {}
+        for start in range(0, len(unique_keys), BATCH_GET_MAX_KEYS):
+            request_items = {
+                self.table_name: {
+                    'Keys': [
+                        {'doc_id': doc_id, 'chunk_index': chunk_index}
+                        for doc_id, chunk_index in unique_keys[start:start + BATCH_GET_MAX_KEYS]
+                    ],
+                    'ProjectionExpression': ', '.join(expression_attribute_names.keys()),
+                    'ExpressionAttributeNames': expression_attribute_names,
+                }
+            }
+            for attempt in range(MAX_BATCH_GET_ATTEMPTS):
+                response = resource.batch_get_item(RequestItems=request_items)
+                for item in process_items(response.get('Responses', {}).get(self.table_name, [])):
+                    chunks[(item['doc_id'], item['chunk_index'])] = {field: item.get(field) for field in fields}
+                request_items = response.get('UnprocessedKeys') or {}
+                if not request_items:
+                    break
+                time.sleep(BATCH_GET_RETRY_DELAY * 2 ** attempt)
+            else:
+                raise RuntimeError(
+                    f"DynamoDB left {len(request_items[self.table_name]['Keys'])} keys unprocessed "
+                    f"after {MAX_BATCH_GET_ATTEMPTS} attempts."
+                )
+        return chunks
+
     def get_chunk_text(self, doc_id: str, chunk_index: int) -> Optional[str]:
-        dynamo_db = self.create_dynamo_client()
-        table = dynamo_db.Table(self.table_name)
+        table = self.table
 
         response = table.get_item(
             Key={
@@ -350,8 +463,7 @@ class DynamoDB(ChunkDB):
 
     def get_is_visual(self, doc_id: str, chunk_index: int) -> Optional[bool]:
         # Get the 'is_visual' attribute for the given doc_id and chunk_index
-        dynamo_db = self.create_dynamo_client()
-        table = dynamo_db.Table(self.table_name)
+        table = self.table
         response = table.get_item(
             Key={
                 'doc_id': doc_id,
@@ -367,8 +479,7 @@ class DynamoDB(ChunkDB):
 
     def get_chunk_page_numbers(self, doc_id: str, chunk_index: int) -> Optional[tuple[int, int]]:
         # Get the chunk page start and end
-        dynamo_db = self.create_dynamo_client()
-        table = dynamo_db.Table(self.table_name)
+        table = self.table
         response = table.get_item(
             Key={
                 'doc_id': doc_id,
@@ -386,8 +497,7 @@ class DynamoDB(ChunkDB):
             return None, None
 
     def get_document_title(self, doc_id: str, chunk_index: int) -> Optional[str]:
-        dynamo_db = self.create_dynamo_client()
-        table = dynamo_db.Table(self.table_name)
+        table = self.table
         response = table.get_item(
             Key={
                 'doc_id': doc_id,
@@ -402,8 +512,7 @@ class DynamoDB(ChunkDB):
             return None
 
     def get_document_summary(self, doc_id: str, chunk_index: int) -> Optional[str]:
-        dynamo_db = self.create_dynamo_client()
-        table = dynamo_db.Table(self.table_name)
+        table = self.table
         response = table.get_item(
             Key={
                 'doc_id': doc_id,
@@ -419,8 +528,7 @@ class DynamoDB(ChunkDB):
             return None
 
     def get_section_title(self, doc_id: str, chunk_index: int) -> Optional[str]:
-        dynamo_db = self.create_dynamo_client()
-        table = dynamo_db.Table(self.table_name)
+        table = self.table
         response = table.get_item(
             Key={
                 'doc_id': doc_id,
@@ -435,8 +543,7 @@ class DynamoDB(ChunkDB):
             return None
 
     def get_section_summary(self, doc_id: str, chunk_index: int) -> Optional[str]:
-        dynamo_db = self.create_dynamo_client()
-        table = dynamo_db.Table(self.table_name)
+        table = self.table
         response = table.get_item(
             Key={
                 'doc_id': doc_id,
@@ -450,9 +557,17 @@ class DynamoDB(ChunkDB):
         else:
             return None
 
+    def has_document(self, doc_id: str) -> bool:
+        # a single-item key query rather than a scan of all doc_ids
+        response = self.table.query(
+            KeyConditionExpression=get_key()('doc_id').eq(doc_id),
+            ProjectionExpression='doc_id',
+            Limit=1,
+        )
+        return len(response.get('Items', [])) > 0
+
     def get_all_doc_ids(self, supp_id: Optional[str] = None) -> list[str]:
-        dynamo_db = self.create_dynamo_client()
-        table = dynamo_db.Table(self.table_name)
+        table = self.table
 
         doc_ids = set()
 
@@ -500,8 +615,7 @@ class DynamoDB(ChunkDB):
         return list(doc_ids)
 
     def get_document_count(self) -> int:
-        dynamo_db = self.create_dynamo_client()
-        table = dynamo_db.Table(self.table_name)
+        table = self.table
 
         doc_ids = set()
 
@@ -531,9 +645,11 @@ class DynamoDB(ChunkDB):
 
     def delete(self) -> None:
         # Delete the dynamo db table
-        dynamo_db = self.create_dynamo_client()
-        table = dynamo_db.Table(self.table_name)
+        table = self.table
         response = table.delete()
+        # the table is gone: check its status again, and drop every thread's cached Table
+        self._table_active = False
+        self._local = threading.local()
         return response
 
     def to_dict(self) -> dict[str, str]:
@@ -1,11 +1,12 @@
 import os
 import time
 import sqlite3
-from typing import Any, Optional, ContextManager
+import threading
+from typing import Any, Optional, ContextManager, Sequence
 import contextlib
 import logging
 
-from dsrag.database.chunk.db import ChunkDB
+from dsrag.database.chunk.db import ChunkDB, validate_chunk_fields
 from dsrag.database.chunk.types import FormattedDocument
 from dsrag.database.chunk.metadata_utils import (
     deserialize_metadata,
@@ -13,15 +14,68 @@ from dsrag.database.chunk.metadata_utils import (
 )
 
 
+# upper bound on how much of the database file SQLite reads through a memory map
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+
+# stored in PRAGMA user_version; a database with an older version is migrated when it's opened
+SCHEMA_VERSION = 1
+
+# per-document attributes, so document-level calls don't have to scan the chunks
+DOCUMENT_INFO_COLUMNS = [
+    {"name": "doc_id", "type": "TEXT PRIMARY KEY"},
+    {"name": "supp_id", "type": "TEXT"},
+    {"name": "document_title", "type": "TEXT"},
+    {"name": "document_summary", "type": "TEXT"},
+    {"name": "created_on", "type": "TEXT"},
+    {"name": "metadata", "type": "TEXT"},
+    {"name": "chunk_count", "type": "INT"},
+]
+
+# column order of the rows built by SQLiteDB._insert_documents, which first deletes the chunks of
+# documents that are being added again
+INSERT_CHUNK_STATEMENT = (
+    "INSERT OR REPLACE INTO documents "
+    "(doc_id, document_title, document_summary, section_title, section_summary, chunk_text, "
+    "chunk_index, chunk_length, chunk_page_start, chunk_page_end, is_visual, created_on, supp_id, metadata) "
+    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+INSERT_DOCUMENT_INFO_STATEMENT = (
+    "INSERT OR REPLACE INTO document_info "
+    "(doc_id, supp_id, document_title, document_summary, created_on, metadata, chunk_count) "
+    "VALUES (?, ?, ?, ?, ?, ?, (SELECT COUNT(*) FROM documents WHERE doc_id=?))"
+)
+
+
 class SQLiteDB(ChunkDB):
+    """
+    A ChunkDB backed by one SQLite file per knowledge base.
+
+    Each thread keeps a long-lived connection (a forked process opens its own), and the database
+    runs in WAL mode with `synchronous=NORMAL`, so readers don't block the ingestion writer and
+    vice versa. WAL mode needs a local filesystem; it isn't supported on network filesystems.
 
-    def __init__(self, kb_id: str, storage_directory: str = "~/dsRAG") -> None:
+    Args:
+        kb_id: ID of the knowledge base.
+        storage_directory: Root directory for the KB's files.
+        mmap_size: Bytes of the database file SQLite may read through a memory map instead of
+            read() calls. 0 disables memory-mapped I/O.
+    """
+
+    def __init__(self, kb_id: str, storage_directory: str = "~/dsRAG", mmap_size: int = DEFAULT_MMAP_SIZE) -> None:
         self.kb_id = kb_id
         self.storage_directory = os.path.expanduser(storage_directory)
         os.makedirs(
             os.path.join(self.storage_directory, "chunk_storage"), exist_ok=True
         )
         self.db_path = os.path.join(self.storage_directory, "chunk_storage")
+        self.mmap_size = mmap_size
+        self.timeout = 60.0  # seconds
+        self.max_retries = 3
+        self.retry_delay = 1.0  # seconds
+        self._local = threading.local()
+        # bumped by close() so that every thread reconnects on its next call
+        self._epoch = 0
         self.columns = [
             {"name": "doc_id", "type": "TEXT"},
             {"name": "document_title", "type": "TEXT"},
@@ -40,7 +94,11 @@ class SQLiteDB(ChunkDB):
         ]
 
         # Create a table for this kb_id if it doesn't exist
-        conn = sqlite3.connect(os.path.join(self.db_path, f"{kb_id}.db"))
+        with self.get_connection() as conn:
+            self._create_or_update_table(conn)
+            self._migrate_schema(conn)
+
+    def _create_or_update_table(self, conn: sqlite3.Connection) -> None:
         c = conn.cursor()
         result = c.execute(
             "SELECT name FROM sqlite_master WHERE type='table' AND name='documents'"
@@ -62,24 +120,90 @@ class SQLiteDB(ChunkDB):
                 if column["name"] not in column_names:
                     # Add the column to the table
                     c.execute("ALTER TABLE documents ADD COLUMN {} {}".format(column["name"], column["type"]))
-        conn.close()
+            conn.commit()
 
-        # Add these settings
-        self.timeout = 60.0  # seconds
-        self.max_retries = 3
-        self.retry_delay = 1.0  # seconds
+    def _migrate_schema(self, conn: sqlite3.Connection) -> None:
+        """Bring the schema up to SCHEMA_VERSION, one version at a time."""
+        if conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+        # take the write lock first, so that only one process runs the migration
+        conn.execute("BEGIN IMMEDIATE")
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        if version < 1:
+            self._migrate_to_v1(conn)
+        conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        conn.commit()
+
+    def _migrate_to_v1(self, conn: sqlite3.Connection) -> None:
+        """Index chunk lookups and add the document_info table."""
+        # adding a document twice used to insert its chunks twice; keep the latest copy
+        conn.execute(
+            "DELETE FROM documents WHERE rowid NOT IN "
+            "(SELECT MAX(rowid) FROM documents GROUP BY doc_id, chunk_index)"
+        )
+        conn.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS documents_doc_id_chunk_index "
+            "ON documents (doc_id, chunk_index)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS documents_supp_id ON documents (supp_id)")
+        columns = ", ".join(f"{column['name']} {column['type']}" for column in DOCUMENT_INFO_COLUMNS)
+        conn.execute(f"CREATE TABLE IF NOT EXISTS document_info ({columns})")
+        conn.execute("CREATE INDEX IF NOT EXISTS document_info_supp_id ON document_info (supp_id)")
+        # the document-level attributes are stored on every chunk; take them from the first one
+        conn.execute(
+            "INSERT OR REPLACE INTO document_info "
+            "(doc_id, supp_id, document_title, document_summary, created_on, metadata, chunk_count) "
+            "SELECT d.doc_id, d.supp_id, d.document_title, d.document_summary, d.created_on, d.metadata, c.chunk_count "
+            "FROM documents d JOIN "
+            "(SELECT doc_id, MIN(chunk_index) AS first_chunk_index, COUNT(*) AS chunk_count FROM documents GROUP BY doc_id) c "
+            "ON d.doc_id = c.doc_id AND d.chunk_index = c.first_chunk_index "
+            "ORDER BY d.rowid"
+        )
+
+    @property
+    def db_file(self) -> str:
+        return os.path.join(self.db_path, f"{self.kb_id}.db")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_file, timeout=self.timeout)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(f"PRAGMA mmap_size={int(self.mmap_size)}")
+        return conn
+
+    def _thread_connection(self) -> sqlite3.Connection:
+        local = self._local
+        conn = getattr(local, "conn", None)
+        if conn is not None and local.pid == os.getpid() and local.epoch == self._epoch:
+            return conn
+        if conn is not None and local.pid == os.getpid():
+            conn.close()
+        # a connection inherited through fork() must not be used by the child, so it's replaced
+        local.conn = self._connect()
+        local.pid = os.getpid()
+        local.epoch = self._epoch
+        return local.conn
 
     @contextlib.contextmanager
     def get_connection(self) -> ContextManager[sqlite3.Connection]:
-        """Get a database connection with proper timeout settings."""
-        conn = sqlite3.connect(
-            os.path.join(self.db_path, f"{self.kb_id}.db"),
-            timeout=self.timeout
-        )
+        """
+        Get this thread's connection. If the operation fails, anything it left uncommitted is
+        rolled back so the connection can be reused.
+        """
+        conn = self._thread_connection()
         try:
             yield conn
-        finally:
+        except Exception:
+            conn.rollback()
+            raise
+
+    def close(self) -> None:
+        """Close the calling thread's connection. Other threads reconnect on their next call."""
+        self._epoch += 1
+        conn = getattr(self._local, "conn", None)
+        if conn is not None and self._local.pid == os.getpid():
             conn.close()
+        self._local.conn = None
 
     def _execute_with_retry(self, operation: callable, *args, **kwargs) -> Any:
         """Execute a database operation with retries."""
@@ -103,47 +227,76 @@ class SQLiteDB(ChunkDB):
 
         raise last_error
 
-    def add_document(self, doc_id: str, chunks: dict[int, dict[str, Any]], supp_id: str = "", metadata: Optional[dict] = None) -> None:
-        def _add_doc(conn: sqlite3.Connection, doc_id: str, chunks: dict, supp_id: str, metadata: dict) -> None:
-            c = conn.cursor()
-            created_on = str(int(time.time()))
-            metadata_str = serialize_metadata(metadata)
-
+    def _fetch(self, query: str, params: tuple = (), one: bool = False) -> Any:
+        def _run(conn: sqlite3.Connection) -> Any:
+            cursor = conn.execute(query, params)
+            return cursor.fetchone() if one else cursor.fetchall()
+
+        return self._execute_with_retry(_run)
+
+    def _insert_documents(self, conn: sqlite3.Connection, documents: list[dict[str, Any]]) -> None:
+        """Write every document in `documents` in a single transaction."""
+        chunk_rows = []
+        document_info_rows = []
+        created_on = str(int(time.time()))
+        for document in documents:
+            doc_id = document["doc_id"]
+            chunks = document["chunks"]
+            supp_id = document.get("supp_id", "")
+            metadata_str = serialize_metadata(document.get("metadata"))
             for chunk_index, chunk in chunks.items():
                 chunk_text = chunk.get("chunk_text", "")
-                chunk_length = len(chunk_text)
-
-                values_dict = {
-                    'doc_id': doc_id,
-                    'document_title': chunk.get("document_title", ""),
-                    'document_summary': chunk.get("document_summary", ""),
-                    'section_title': chunk.get("section_title", ""),
-                    'section_summary': chunk.get("section_summary", ""),
-                    'chunk_text': chunk_text,
-                    'chunk_page_start': chunk.get("chunk_page_start", None),
-                    'chunk_page_end': chunk.get("chunk_page_end", None),
-                    'is_visual': chunk.get("is_visual", False),
-                    'chunk_index': chunk_index,
-                    'chunk_length': chunk_length,
-                    'created_on': created_on,
-                    'supp_id': supp_id,
-                    'metadata': metadata_str
-                }
-
-                columns = ', '.join(values_dict.keys())
-                placeholders = ', '.join(['?'] * len(values_dict))
-                sql = f"INSERT INTO documents ({columns}) VALUES ({placeholders})"
-                
-                c.execute(sql, tuple(values_dict.values()))
-            
-            conn.commit()
+                chunk_rows.append((
+                    doc_id,
+                    chunk.get("document_title", ""),
+                    chunk.get("document_summary", ""),
+                    chunk.get("section_title", ""),
+                    chunk.get("section_summary", ""),
+                    chunk_text,
+                    chunk_index,
+                    len(chunk_text),
+                    chunk.get("chunk_page_start", None),
+                    chunk.get("chunk_page_end", None),
+                    chunk.get("is_visual", False),
+                    created_on,
+                    supp_id,
+                    metadata_str,
+                ))
+            if chunks:
+                first_chunk = chunks[min(chunks)]
+                document_info_rows.append((
+                    doc_id,
+                    supp_id,
+                    first_chunk.get("document_title", ""),
+                    first_chunk.get("document_summary", ""),
+                    created_on,
+                    metadata_str,
+                    doc_id,
+                ))
+
+        # take the write lock up front, rather than upgrading a read lock halfway through
+        conn.execute("BEGIN IMMEDIATE")
+        # a document added again replaces all of its old chunks, not only those with the same index
+        doc_id_rows = [(doc_id,) for doc_id in dict.fromkeys(document["doc_id"] for document in documents)]
+        conn.executemany("DELETE FROM documents WHERE doc_id=?", doc_id_rows)
+        conn.executemany("DELETE FROM document_info WHERE doc_id=?", doc_id_rows)
+        conn.executemany(INSERT_CHUNK_STATEMENT, chunk_rows)
+        # written after the chunks, so that the chunk_count subquery sees them
+        conn.executemany(INSERT_DOCUMENT_INFO_STATEMENT, document_info_rows)
+        conn.commit()
 
-        self._execute_with_retry(_add_doc, doc_id, chunks, supp_id, metadata)
+    def add_document(self, doc_id: str, chunks: dict[int, dict[str, Any]], supp_id: str = "", metadata: Optional[dict] = None) -> None:
+        self.add_documents([{"doc_id": doc_id, "chunks": chunks, "supp_id": supp_id, "metadata": metadata}])
+
+    def add_documents(self, documents: list[dict[str, Any]]) -> None:
+        if documents:
+            self._execute_with_retry(self._insert_documents, documents)
 
     def remove_document(self, doc_id: str) -> None:
         def _remove_doc(conn: sqlite3.Connection, doc_id: str) -> None:
             c = conn.cursor()
             c.execute(f"DELETE FROM documents WHERE doc_id=?", (doc_id,))
+            c.execute("DELETE FROM document_info WHERE doc_id=?", (doc_id,))
             conn.commit()
 
         self._execute_with_retry(_remove_doc, doc_id)
@@ -151,37 +304,28 @@ class SQLiteDB(ChunkDB):
     def get_document(
         self, doc_id: str, include_content: bool = False
     ) -> Optional[FormattedDocument]:
-        # Retrieve the document from the sqlite table
-        conn = sqlite3.connect(os.path.join(self.db_path, f"{self.kb_id}.db"))
-        c = conn.cursor()
-        columns = ["supp_id", "document_title", "document_summary", "created_on", "metadata"]
-        if include_content:
-            columns += ["chunk_text", "chunk_index"]
-
-        query_statement = f"SELECT {', '.join(columns)} FROM documents WHERE doc_id=?"
-        c.execute(query_statement, (doc_id,))
-        results = c.fetchall()
-        conn.close()
+        # Retrieve the document from the document_info table
+        columns = ["supp_id", "document_title", "document_summary", "created_on", "metadata", "chunk_count"]
+        query_statement = f"SELECT {', '.join(columns)} FROM document_info WHERE doc_id=?"
+        result = self._fetch(query_statement, (doc_id,), one=True)
 
         # If there are no results, return None
-        if not results:
+        if not result:
             return None
 
-        # Turn the results into an object where the columns are keys
         full_document_string = ""
         if include_content:
-            # Concatenate the chunks into a single string
-            for result in results:
-                # Join each chunk text with a new line character
-                full_document_string += result[columns.index("chunk_text")] + "\n"
-            # Remove the last new line character
-            full_document_string = full_document_string[:-1]
-
-        supp_id = results[0][columns.index("supp_id")]
-        title = results[0][columns.index("document_title")]
-        summary = results[0][columns.index("document_summary")]
-        created_on = results[0][columns.index("created_on")]
-        metadata = results[0][columns.index("metadata")]
+            chunks = self._fetch(
+                "SELECT chunk_text FROM documents WHERE doc_id=? ORDER BY chunk_index", (doc_id,)
+            )
+            # Join the chunk texts with a new line character
+            full_document_string = "\n".join(chunk[0] for chunk in chunks)
+
+        supp_id = result[columns.index("supp_id")]
+        title = result[columns.index("document_title")]
+        summary = result[columns.index("document_summary")]
+        created_on = result[columns.index("created_on")]
+        metadata = result[columns.index("metadata")]
 
         # Convert the metadata string back into a dictionary
         metadata = deserialize_metadata(metadata)
@@ -194,151 +338,141 @@ class SQLiteDB(ChunkDB):
             summary=summary,
             created_on=created_on,
             metadata=metadata,
-            chunk_count=len(results)
+            chunk_count=result[columns.index("chunk_count")]
         )
 
+    def get_chunks(
+        self,
+        doc_id: str,
+        chunk_start: int,
+        chunk_end: int,
+        fields: Optional[Sequence[str]] = None,
+    ) -> dict[int, dict[str, Any]]:
+        fields = validate_chunk_fields(fields)
+        results = self._fetch(
+            f"SELECT chunk_index, {', '.join(fields)} FROM documents "
+            "WHERE doc_id=? AND chunk_index BETWEEN ? AND ?",
+            (doc_id, chunk_start, chunk_end - 1),
+        )
+        return {result[0]: dict(zip(fields, result[1:])) for result in results}
+
     def get_chunk_text(self, doc_id: str, chunk_index: int) -> Optional[str]:
         # Retrieve the chunk text from the sqlite table
-        conn = sqlite3.connect(os.path.join(self.db_path, f"{self.kb_id}.db"))
-        c = conn.cursor()
-        c.execute(
+        result = self._fetch(
             "SELECT chunk_text FROM documents WHERE doc_id=? AND chunk_index=?",
             (doc_id, chunk_index),
+            one=True,
         )
-        result = c.fetchone()
-        conn.close()
         if result:
             return result[0]
         return None
     
     def get_is_visual(self, doc_id: str, chunk_index: int) -> Optional[bool]:
         # Retrieve the is_visual param from the sqlite table
-        conn = sqlite3.connect(os.path.join(self.db_path, f"{self.kb_id}.db"))
-        c = conn.cursor()
-        c.execute(
+        result = self._fetch(
             "SELECT is_visual FROM documents WHERE doc_id=? AND chunk_index=?",
             (doc_id, chunk_index),
+            one=True,
         )
-        result = c.fetchone()
-        conn.close()
         if result:
             return result[0]
         return None
     
     def get_chunk_page_numbers(self, doc_id: str, chunk_index: int) -> Optional[tuple[int, int]]:
         # Retrieve the chunk page numbers from the sqlite table
-        conn = sqlite3.connect(os.path.join(self.db_path, f"{self.kb_id}.db"))
-        c = conn.cursor()
-        c.execute(
+        result = self._fetch(
             "SELECT chunk_page_start, chunk_page_end FROM documents WHERE doc_id=? AND chunk_index=?",
             (doc_id, chunk_index),
+            one=True,
         )
-        result = c.fetchone()
-        conn.close()
         if result:
             return result
         return None, None
 
     def get_document_title(self, doc_id: str, chunk_index: int) -> Optional[str]:
         # Retrieve the document title from the sqlite table
-        conn = sqlite3.connect(os.path.join(self.db_path, f"{self.kb_id}.db"))
-        c = conn.cursor()
-        c.execute(
+        result = self._fetch(
             "SELECT document_title FROM documents WHERE doc_id=? AND chunk_index=?",
             (doc_id, chunk_index),
+            one=True,
         )
-        result = c.fetchone()
-        conn.close()
         if result:
             return result[0]
         return None
 
     def get_document_summary(self, doc_id: str, chunk_index: int) -> Optional[str]:
         # Retrieve the document summary from the sqlite table
-        conn = sqlite3.connect(os.path.join(self.db_path, f"{self.kb_id}.db"))
-        c = conn.cursor()
-        c.execute(
+        result = self._fetch(
             "SELECT document_summary FROM documents WHERE doc_id=? AND chunk_index=?",
             (doc_id, chunk_index),
+            one=True,
         )
-        result = c.fetchone()
-        conn.close()
         if result:
             return result[0]
         return None
 
     def get_section_title(self, doc_id: str, chunk_index: int) -> Optional[str]:
         # Retrieve the section title from the sqlite table
-        conn = sqlite3.connect(os.path.join(self.db_path, f"{self.kb_id}.db"))
-        c = conn.cursor()
-        c.execute(
+        result = self._fetch(
             "SELECT section_title FROM documents WHERE doc_id=? AND chunk_index=?",
             (doc_id, chunk_index),
+            one=True,
         )
-        result = c.fetchone()
-        conn.close()
         if result:
             return result[0]
         return None
 
     def get_section_summary(self, doc_id: str, chunk_index: int) -> Optional[str]:
         # Retrieve the section summary from the sqlite table
-        conn = sqlite3.connect(os.path.join(self.db_path, f"{self.kb_id}.db"))
-        c = conn.cursor()
-        c.execute(
+        result = self._fetch(
             "SELECT section_summary FROM documents WHERE doc_id=? AND chunk_index=?",
             (doc_id, chunk_index),
+            one=True,
         )
-        result = c.fetchone()
-        conn.close()
         if result:
             return result[0]
         return None
 
+    def has_document(self, doc_id: str) -> bool:
+        # a primary key lookup on document_info
+        result = self._fetch("SELECT 1 FROM document_info WHERE doc_id=?", (doc_id,), one=True)
+        return result is not None
+
     def get_all_doc_ids(self, supp_id: Optional[str] = None) -> list[str]:
         # Retrieve all document IDs from the sqlite table
-        conn = sqlite3.connect(os.path.join(self.db_path, f"{self.kb_id}.db"))
-        c = conn.cursor()
-        query_statement = "SELECT DISTINCT doc_id FROM documents"
+        query_statement = "SELECT doc_id FROM document_info"
         if supp_id:
             query_statement += " WHERE supp_id=?"
-            c.execute(query_statement, (supp_id,))
+            results = self._fetch(query_statement, (supp_id,))
         else:
-            c.execute(query_statement)
-        results = c.fetchall()
-        conn.close()
+            results = self._fetch(query_statement)
         return [result[0] for result in results]
     
     def get_document_count(self) -> int:
         # Retrieve the number of documents in the sqlite table
-        conn = sqlite3.connect(os.path.join(self.db_path, f'{self.kb_id}.db'))
-        c = conn.cursor()
-        c.execute(f"SELECT COUNT(DISTINCT doc_id) FROM documents")
-        result = c.fetchone()
-        conn.close()
+        result = self._fetch("SELECT COUNT(*) FROM document_info", one=True)
         if result is None:
             return 0
         return result[0]
 
     def get_total_num_characters(self) -> int:
         # Retrieve the total number of characters in the sqlite table
-        conn = sqlite3.connect(os.path.join(self.db_path, f'{self.kb_id}.db'))
-        c = conn.cursor()
-        c.execute(f"SELECT SUM(chunk_length) FROM documents")
-        result = c.fetchone()
-        conn.close()
+        result = self._fetch("SELECT SUM(chunk_length) FROM documents", one=True)
         if result is None or result[0] is None:
             return 0
         return result[0]
 
     def delete(self) -> None:
-        # Delete the sqlite database
-        if os.path.exists(os.path.join(self.db_path, f"{self.kb_id}.db")):
-            os.remove(os.path.join(self.db_path, f"{self.kb_id}.db"))
+        # Delete the sqlite database, along with its write-ahead log and shared-memory index
+        self.close()
+        for path in (self.db_file, f"{self.db_file}-wal", f"{self.db_file}-shm"):
+            if os.path.exists(path):
+                os.remove(path)
 
-    def to_dict(self) -> dict[str, str]:
+    def to_dict(self) -> dict[str, Any]:
         return {
             **super().to_dict(),
             "kb_id": self.kb_id,
             "storage_directory": self.storage_directory,
+            "mmap_size": self.mmap_size,
         }
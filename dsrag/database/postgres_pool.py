@@ -0,0 +1,213 @@
+import asyncio
+import contextlib
+import os
+import threading
+import time
+from typing import Iterator, Optional
+
+from dsrag.utils.async_utils import LoopLocal
+from dsrag.utils.imports import LazyLoader
+
+# Lazy load PostgreSQL dependencies
+psycopg2 = LazyLoader("psycopg2", "psycopg2-binary")
+asyncpg = LazyLoader("asyncpg")
+
+DEFAULT_MIN_CONNECTIONS = 1
+DEFAULT_MAX_CONNECTIONS = 10
+
+# a connection that sat idle for longer than this is checked with a round trip before it's reused
+HEALTH_CHECK_INTERVAL = 30.0  # seconds
+
+_pools: dict[tuple, "PostgresConnectionPool"] = {}
+_pools_lock = threading.Lock()
+
+# asyncpg pools can only be used from the event loop they were created in, so each loop has its own
+_async_pools: LoopLocal[dict] = LoopLocal(dict)
+
+
+_PooledConnection = None
+
+
+def _connection_class():
+    """A psycopg2 connection that can carry the pool's per-connection state."""
+    global _PooledConnection
+    if _PooledConnection is None:
+        class PooledConnection(psycopg2.extensions.connection):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                self.vector_registered = False
+                self.last_used = time.monotonic()
+
+        _PooledConnection = PooledConnection
+    return _PooledConnection
+
+
+class PostgresConnectionPool:
+    """
+    A thread-safe pool of connections to one Postgres database.
+
+    Use `get_connection_pool` rather than creating pools directly, so that every component that
+    connects to the same server with the same credentials shares one pool.
+
+    `min_connections` connections stay open between operations; up to `max_connections` are opened
+    when more threads need one at the same time, and callers beyond that wait for a free connection.
+    Connections that are found closed, or that fail a health check after sitting idle, are replaced.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        database: str,
+        username: str,
+        password: str,
+        min_connections: int = DEFAULT_MIN_CONNECTIONS,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+    ):
+        if not 0 <= min_connections <= max_connections or max_connections < 1:
+            raise ValueError(
+                f"Invalid Postgres pool size: min_connections={min_connections}, max_connections={max_connections}."
+            )
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+        # ThreadedConnectionPool raises when it runs out of connections; callers wait here instead
+        self._available = threading.BoundedSemaphore(max_connections)
+        self._pool = psycopg2.pool.ThreadedConnectionPool(
+            min_connections,
+            max_connections,
+            dbname=database,
+            user=username,
+            password=password,
+            host=host,
+            port=port,
+            connection_factory=_connection_class(),
+        )
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - conn.last_used < HEALTH_CHECK_INTERVAL:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            return False
+
+    def _checkout(self):
+        # every connection in the pool can be stale (e.g. after a server restart), plus a new one
+        for _ in range(self.max_connections + 1):
+            conn = self._pool.getconn()
+            if self._is_healthy(conn):
+                return conn
+            self._pool.putconn(conn, close=True)
+        raise psycopg2.OperationalError("Could not get a working connection from the Postgres pool.")
+
+    @contextlib.contextmanager
+    def connection(self, register_vector: bool = False) -> Iterator:
+        """
+        Borrow a connection for the duration of the block.
+
+        Work the block doesn't commit is rolled back when the connection is returned, and a
+        connection that broke while it was borrowed is closed instead of being returned.
+
+        Args:
+            register_vector: Register the pgvector types on the connection (once per connection).
+        """
+        self._available.acquire()
+        try:
+            conn = self._checkout()
+            broken = False
+            try:
+                if register_vector and not conn.vector_registered:
+                    from pgvector.psycopg2 import register_vector as register
+                    register(conn)
+                    conn.vector_registered = True
+                yield conn
+            except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                broken = True
+                raise
+            finally:
+                broken = broken or conn.closed != 0
+                if not broken:
+                    try:
+                        if conn.info.transaction_status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                            conn.rollback()
+                        conn.last_used = time.monotonic()
+                    except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                        broken = True
+                self._pool.putconn(conn, close=broken)
+        finally:
+            self._available.release()
+
+    def close(self) -> None:
+        self._pool.closeall()
+
+
+def quote_identifier(name: str) -> str:
+    """Quote a table or column name for SQL that isn't composed with psycopg2 (e.g. asyncpg queries)."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def get_connection_pool(
+    host: str,
+    port: int,
+    database: str,
+    username: str,
+    password: str,
+    min_connections: int = DEFAULT_MIN_CONNECTIONS,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+) -> PostgresConnectionPool:
+    """
+    The pool for this server, database and user, created on first use. The size of an existing
+    pool is not changed. A forked process gets its own pools rather than sharing its parent's sockets.
+    """
+    key = (os.getpid(), host, int(port), database, username, password)
+    with _pools_lock:
+        pool: Optional[PostgresConnectionPool] = _pools.get(key)
+        if pool is None:
+            pool = PostgresConnectionPool(
+                host, port, database, username, password, min_connections, max_connections
+            )
+            _pools[key] = pool
+        return pool
+
+
+async def get_async_connection_pool(
+    host: str,
+    port: int,
+    database: str,
+    username: str,
+    password: str,
+    min_connections: int = DEFAULT_MIN_CONNECTIONS,
+    max_connections: int = DEFAULT_MAX_CONNECTIONS,
+):
+    """
+    The asyncpg pool for this server, database and user in the running event loop, created on
+    first use, for the async methods of the Postgres components.
+    """
+    pools = _async_pools.get()
+    key = (host, int(port), database, username, password)
+    creating = pools.get(key)
+    if creating is None:
+        creating = asyncio.ensure_future(
+            asyncpg.create_pool(
+                host=host,
+                port=port,
+                database=database,
+                user=username,
+                password=password,
+                min_size=min_connections,
+                max_size=max_connections,
+            )
+        )
+        pools[key] = creating
+    try:
+        # shielded so that one cancelled caller doesn't cancel the pool the others are waiting for
+        return await asyncio.shield(creating)
+    except Exception:
+        if pools.get(key) is creating and creating.done():
+            del pools[key]
+        raise
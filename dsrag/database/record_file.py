@@ -0,0 +1,68 @@
+import mmap
+import os
+import pickle
+from collections.abc import Sequence
+from typing import Any, BinaryIO, Callable, Iterable
+
+import numpy as np
+
+
+# file layout: [record count: int64][count + 1 offsets: int64][pickled records]
+_HEADER_DTYPE = np.dtype("<i8")
+
+# read-only instances retry when a writer removes the generation they were about to open
+MAX_LOAD_ATTEMPTS = 5
+
+
+def write_atomically(path: str, write_fn: Callable[[BinaryIO], None]) -> None:
+    """Write a file via a temporary sibling so readers never see a partial file."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        write_fn(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def write_record_file(f: BinaryIO, records: Iterable[Any]) -> None:
+    """Write `records` to an open binary file in the layout `RecordFile` reads."""
+    payloads = [pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL) for record in records]
+    offsets = np.zeros(len(payloads) + 1, dtype=_HEADER_DTYPE)
+    np.cumsum([len(payload) for payload in payloads], out=offsets[1:])
+    f.write(np.array([len(payloads)], dtype=_HEADER_DTYPE).tobytes())
+    f.write(offsets.tobytes())
+    for payload in payloads:
+        f.write(payload)
+
+
+class RecordFile(Sequence):
+    """
+    A read-only, memory-mapped sequence of pickled records.
+
+    Records are only unpickled when they are accessed, and the file is mapped rather than read,
+    so every process that opens the same file shares a single copy of it in the page cache.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        count = int(np.frombuffer(self._mmap, dtype=_HEADER_DTYPE, count=1)[0])
+        self._offsets = np.frombuffer(
+            self._mmap, dtype=_HEADER_DTYPE, count=count + 1, offset=_HEADER_DTYPE.itemsize
+        )
+        self._data_start = _HEADER_DTYPE.itemsize * (count + 2)
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("record index out of range")
+        start = self._data_start + int(self._offsets[index])
+        end = self._data_start + int(self._offsets[index + 1])
+        return pickle.loads(self._mmap[start:end])
@@ -1,24 +1,285 @@
+import json
 import pickle
+import shutil
+import threading
+from dsrag.database.record_file import (
+    MAX_LOAD_ATTEMPTS,
+    RecordFile,
+    write_atomically,
+    write_record_file,
+)
 from dsrag.database.vector.db import VectorDB
+from dsrag.database.vector.faiss_index import FaissIndex
+from dsrag.database.vector.metadata_index import ColumnarMetadataIndex
+from dsrag.database.vector.quantization import QuantizedMatrix
+from dsrag.database.vector.sharded_search import ShardedExactSearch, top_k_indices
 from typing import Sequence, Optional
-from dsrag.database.vector.types import ChunkMetadata, Vector, VectorSearchResult
+from dsrag.database.vector.types import ChunkMetadata, MetadataFilter, Vector, VectorSearchResult
 from sklearn.metrics.pairwise import cosine_similarity
 import os
 import numpy as np
-from dsrag.utils.imports import faiss
+
+
+STORAGE_FORMAT_VERSION = 2
+
+# The write-ahead log is folded into the base files once it grows past the size of the base
+# vector file (and this floor), which keeps both replay time and total bytes written linear.
+AUTO_COMPACT_MIN_WAL_BYTES = 16 * 1024 * 1024
+
+# Removed rows are only tombstoned; their space is reclaimed by the next compaction, which is
+# forced once they make up more than this share of the rows (and at least this many rows).
+AUTO_COMPACT_TOMBSTONE_RATIO = 0.5
+AUTO_COMPACT_MIN_TOMBSTONES = 10_000
+
+# Filters matching at most this many rows are answered by scoring those rows exactly. An ANN
+# index restricted to a small subset can miss matches entirely (e.g. IVF cells not probed).
+FAISS_EXACT_FILTER_MAX_ROWS = 10_000
+
+# With quantization, at least this many candidates are re-scored exactly, however small top_k is
+MIN_RESCORE_CANDIDATES = 100
 
 
 class BasicVectorDB(VectorDB):
+    """
+    A local vector database that keeps vectors in a contiguous float32 matrix.
+
+    On disk, each KB gets its own directory under `vector_storage/` containing:
+    - `manifest.json`: the storage format version and the current base generation
+    - `vectors.{generation}.npy`: the (num_vectors, dimension) float32 matrix, opened with
+      `np.load(mmap_mode="r")` so loading is close to O(1) and the pages are shared between
+      processes via the OS page cache
+    - `metadata.{generation}.pkl`: the list of chunk metadata dicts, row-aligned with the vectors
+    - `wal.{generation}.log`: an append-only log of the vectors added and documents removed since
+      the base files were written. It is replayed on `load()` and folded into a new base
+      generation by `compact()`.
+    - `faiss.{generation}.index`: with `use_faiss`, the serialized FAISS index over the base
+      vectors. Rows added since are appended to the index after loading.
+
+    KBs saved in the legacy single-pickle format (`vector_storage/{kb_id}.pkl`) are migrated
+    to the new layout the first time they are loaded.
+
+    Removing a document only marks its rows in a tombstone bitmap (found through a
+    doc_id -> rows map), which searches skip. The rows are physically dropped by `compact()`.
+
+    Metadata filters are evaluated against a columnar side-index (see `ColumnarMetadataIndex`)
+    that yields a row mask, so only the matching rows are scored.
+
+    With `quantization`, a float16 or int8 copy of the normalized vectors is kept in memory and
+    scanned first, and only the best `rescore_multiplier * top_k` candidates are re-scored
+    against the float32 vectors, which stay memory-mapped on disk. Returned similarities are
+    always exact.
+
+    With `search_shards`, exact search runs over a pre-normalized copy of the vectors split into
+    that many shards, which are scored in parallel threads. Results are identical to the
+    unsharded search.
+
+    With `lazy_load`, nothing is read from disk until the database is first used, and
+    `prefetch()` can load it in a background thread ahead of the first query.
+
+    With `read_only`, the instance serves the last published generation straight from the
+    memory-mapped files without copying them, so any number of processes (e.g. the workers of a
+    pre-fork server) share a single copy of the vectors and metadata in the page cache. Put the
+    storage directory on a RAM-backed filesystem such as /dev/shm to keep it out of disk caching
+    entirely. A writer makes its changes visible with `publish()`, which writes a new generation
+    next to the current one; readers keep serving the generation they have mapped until they call
+    `refresh()`. Read-only instances don't see changes that are only in the writer's log yet, and
+    any faiss index, quantized matrix or search shards they build are private to the process.
+
+    Args:
+        kb_id: ID of the knowledge base.
+        storage_directory: Root directory for the KB's files.
+        use_faiss: Serve searches from a persistent FAISS index instead of exact numpy search.
+        faiss_index_type: "flat" (exact inner product), "hnsw" or "ivfpq".
+        ef_search: HNSW search depth. Higher is more accurate and slower.
+        nprobe: Number of IVF cells visited per query for "ivfpq".
+        quantization: None (exact search), "float16" or "int8". Ignored when `use_faiss` is set.
+        rescore_multiplier: How many candidates per result the quantized pass hands to exact
+            re-scoring. Higher values trade speed for recall.
+        search_shards: Number of shards (and threads) for exact search, e.g. `os.cpu_count()`.
+            None keeps the single-threaded search, which needs no extra memory.
+        lazy_load: Defer loading the stored vectors until the first read or write.
+        read_only: Serve the last published generation without copying it; writes raise a
+            ValueError.
+    """
+
+    open_options = ("lazy_load", "read_only")
+
     def __init__(
-        self, kb_id: str, storage_directory: str = "~/dsRAG", use_faiss: bool = False
+        self,
+        kb_id: str,
+        storage_directory: str = "~/dsRAG",
+        use_faiss: bool = False,
+        faiss_index_type: str = "flat",
+        ef_search: int = 64,
+        nprobe: int = 8,
+        quantization: Optional[str] = None,
+        rescore_multiplier: int = 4,
+        search_shards: Optional[int] = None,
+        lazy_load: bool = False,
+        read_only: bool = False,
     ) -> None:
         self.kb_id = kb_id
+        self.read_only = read_only
         self.storage_directory = storage_directory
         self.use_faiss = use_faiss
+        self.faiss_index_type = faiss_index_type
+        self.ef_search = ef_search
+        self.nprobe = nprobe
+        self._faiss_index = FaissIndex(
+            index_type=faiss_index_type, ef_search=ef_search, nprobe=nprobe
+        )
+        self.quantization = quantization
+        self.rescore_multiplier = rescore_multiplier
+        self._quantized = QuantizedMatrix(quantization) if quantization else None
+        self.search_shards = search_shards
+        self._sharded = ShardedExactSearch(search_shards) if search_shards else None
         self.vector_storage_path = os.path.join(
+            self.storage_directory, "vector_storage", kb_id
+        )
+        self.manifest_path = os.path.join(self.vector_storage_path, "manifest.json")
+        self.legacy_storage_path = os.path.join(
             self.storage_directory, "vector_storage", f"{kb_id}.pkl"
         )
-        self.load()
+        self._load_lock = threading.RLock()
+        self._load_started = False
+        self._load_complete = False
+        if not lazy_load:
+            self._ensure_loaded()
+
+    def _ensure_loaded(self) -> None:
+        """Load the stored vectors on first use. Safe to call from any thread."""
+        if self._load_complete:
+            return
+        with self._load_lock:
+            # _load_started is also set while this thread is inside load() itself
+            if self._load_started:
+                return
+            self.load()
+
+    def prefetch(self) -> threading.Thread:
+        thread = threading.Thread(
+            target=self._ensure_loaded, name=f"dsrag-prefetch-{self.kb_id}", daemon=True
+        )
+        thread.start()
+        return thread
+
+    @property
+    def vectors_path(self) -> str:
+        self._ensure_loaded()
+        return os.path.join(self.vector_storage_path, f"vectors.{self.generation}.npy")
+
+    @property
+    def metadata_path(self) -> str:
+        self._ensure_loaded()
+        return os.path.join(self.vector_storage_path, f"metadata.{self.generation}.records")
+
+    @property
+    def pickled_metadata_path(self) -> str:
+        """Where stores written before format version 2 keep their metadata."""
+        self._ensure_loaded()
+        return os.path.join(self.vector_storage_path, f"metadata.{self.generation}.pkl")
+
+    @property
+    def wal_path(self) -> str:
+        self._ensure_loaded()
+        return os.path.join(self.vector_storage_path, f"wal.{self.generation}.log")
+
+    @property
+    def faiss_index_path(self) -> str:
+        self._ensure_loaded()
+        return os.path.join(self.vector_storage_path, f"faiss.{self.generation}.index")
+
+    @property
+    def _rows(self) -> np.ndarray:
+        """All stored rows, including tombstoned ones."""
+        return self._buffer[: self._num_vectors]
+
+    @property
+    def _deleted(self) -> np.ndarray:
+        """The tombstone bitmap, row-aligned with `_rows`."""
+        return self._deleted_buffer[: self._num_vectors]
+
+    @property
+    def _num_live(self) -> int:
+        return self._num_vectors - self._num_deleted
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """The vectors of all documents that haven't been removed."""
+        self._ensure_loaded()
+        if self._num_deleted == 0:
+            return self._rows
+        return self._rows[~self._deleted]
+
+    @property
+    def metadata(self) -> Sequence[ChunkMetadata]:
+        """The metadata of all documents that haven't been removed, row-aligned with `vectors`."""
+        self._ensure_loaded()
+        if self._num_deleted == 0:
+            return self._metadata
+        return [meta for meta, deleted in zip(self._metadata, self._deleted) if not deleted]
+
+    def _set_rows(self, rows: np.ndarray, metadata: Sequence[ChunkMetadata]) -> None:
+        """Replace all rows, without tombstones."""
+        self._buffer = rows
+        self._num_vectors = len(rows)
+        self._deleted_buffer = np.zeros(len(rows), dtype=bool)
+        self._num_deleted = 0
+        self._metadata = metadata
+        self._doc_rows = {}
+        if not self.read_only:
+            # only needed to remove documents, and would unpickle every record of a shared file
+            self._index_doc_rows(0, metadata)
+
+    def _check_writable(self) -> None:
+        if self.read_only:
+            raise ValueError(f"BasicVectorDB '{self.kb_id}' was opened read-only.")
+
+    def _index_doc_rows(self, start: int, metadata: Sequence[ChunkMetadata]) -> None:
+        for offset, meta in enumerate(metadata):
+            self._doc_rows.setdefault(meta["doc_id"], []).append(start + offset)
+
+    def _append_to_buffer(self, new_vectors: np.ndarray) -> None:
+        """Append rows to the in-memory matrix, growing its capacity geometrically."""
+        num_new = len(new_vectors)
+        if self._num_vectors == 0:
+            self._buffer = new_vectors
+            self._num_vectors = num_new
+            self._deleted_buffer = np.zeros(num_new, dtype=bool)
+            return
+        if new_vectors.shape[1] != self._buffer.shape[1]:
+            raise ValueError(
+                f"Error in add_vectors: expected vectors of dimension {self._buffer.shape[1]}, "
+                f"got {new_vectors.shape[1]}."
+            )
+        required = self._num_vectors + num_new
+        # a memory-mapped base is read-only, so the first append copies it into a writable buffer
+        if required > len(self._buffer) or not self._buffer.flags.writeable:
+            capacity = max(required, 2 * self._num_vectors)
+            buffer = np.empty((capacity, self._buffer.shape[1]), dtype=np.float32)
+            buffer[: self._num_vectors] = self._buffer[: self._num_vectors]
+            self._buffer = buffer
+        if required > len(self._deleted_buffer):
+            deleted_buffer = np.zeros(len(self._buffer), dtype=bool)
+            deleted_buffer[: self._num_vectors] = self._deleted
+            self._deleted_buffer = deleted_buffer
+        self._buffer[self._num_vectors : required] = new_vectors
+        self._num_vectors = required
+
+    def _apply_add(self, new_vectors: np.ndarray, metadata: Sequence[ChunkMetadata]) -> None:
+        start = self._num_vectors
+        self._append_to_buffer(new_vectors)
+        self._metadata.extend(metadata)
+        self._index_doc_rows(start, metadata)
+        self._metadata_index.append(metadata)
+
+    def _apply_remove(self, doc_id) -> bool:
+        rows = self._doc_rows.pop(doc_id, None)
+        if not rows:
+            return False
+        self._deleted[rows] = True
+        self._num_deleted += len(rows)
+        return True
 
     def add_vectors(
         self, vectors: Sequence[Vector], metadata: Sequence[ChunkMetadata]
@@ -29,109 +290,392 @@ class BasicVectorDB(VectorDB):
             raise ValueError(
                 "Error in add_vectors: the number of vectors and metadata items must be the same."
             )
-        self.vectors.extend(vectors)
-        self.metadata.extend(metadata)
-        self.save()
+        if len(vectors) == 0:
+            return
 
-    def search(self, query_vector, top_k=10, metadata_filter: Optional[dict] = None) -> list[VectorSearchResult]:
-        if not self.vectors:
+        self._check_writable()
+        self._ensure_loaded()
+        new_vectors = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+        metadata = list(metadata)
+        self._apply_add(new_vectors, metadata)
+        self._append_to_wal(("add", new_vectors, metadata))
+        if self.use_faiss:
+            try:
+                self._faiss_index.sync(self._rows)
+            except ImportError:
+                # search reports the missing dependency and falls back to numpy
+                pass
+
+    def search(
+        self, query_vector, top_k=10, metadata_filter: Optional[MetadataFilter] = None
+    ) -> list[VectorSearchResult]:
+        return self.search_batch([query_vector], top_k=top_k, metadata_filter=metadata_filter)[0]
+
+    def search_batch(
+        self, query_vectors, top_k=10, metadata_filter: Optional[MetadataFilter] = None
+    ) -> list[list[VectorSearchResult]]:
+        """Score all the query vectors against the matrix with a single matrix-matrix product."""
+        num_queries = len(query_vectors)
+        if num_queries == 0:
             return []
+        self._ensure_loaded()
+        if self._num_live == 0:
+            return [[] for _ in range(num_queries)]
+
+        rows = self._filter_rows(metadata_filter)
+        if rows is not None and len(rows) == 0:
+            return [[] for _ in range(num_queries)]
 
         if self.use_faiss:
             try:
-                return self.search_faiss(query_vector, top_k)
+                return self._search_faiss_batch(query_vectors, top_k, rows=rows)
             except Exception as e:
                 print(f"Faiss search failed: {e}. Falling back to numpy search.")
-                return self._fallback_search(query_vector, top_k)
-        else:
-            return self._fallback_search(query_vector, top_k)
+        if rows is None and self._num_deleted:
+            rows = np.flatnonzero(~self._deleted)
+        if self._quantized is not None:
+            return self._quantized_search_batch(query_vectors, top_k, rows=rows)
+        if self._sharded is not None:
+            return self._sharded_search_batch(query_vectors, top_k, rows=rows)
+        return self._exact_search_batch(query_vectors, top_k, rows=rows)
+
+    def _filter_rows(self, metadata_filter: Optional[MetadataFilter]) -> Optional[np.ndarray]:
+        """
+        Return the indices of the live rows matching the filter, or None when there is no filter.
+        """
+        if not metadata_filter:
+            return None
+        mask = self._metadata_index.mask(metadata_filter, self._metadata)
+        if self._num_deleted:
+            mask &= ~self._deleted
+        return np.flatnonzero(mask)
+
+    def _candidate_vectors(self, rows: Optional[np.ndarray]) -> np.ndarray:
+        return self._rows if rows is None else self._rows[rows]
 
-    def _fallback_search(self, query_vector, top_k=10) -> list[VectorSearchResult]:
+    def _fallback_search(
+        self, query_vector, top_k=10, rows: Optional[np.ndarray] = None
+    ) -> list[VectorSearchResult]:
         """Fallback search method using numpy when faiss is not available."""
-        similarities = cosine_similarity([query_vector], self.vectors)[0]
-        indexed_similarities = sorted(
-            enumerate(similarities), key=lambda x: x[1], reverse=True
+        return self._exact_search_batch([query_vector], top_k, rows=rows)[0]
+
+    def _exact_search_batch(
+        self, query_vectors, top_k=10, rows: Optional[np.ndarray] = None
+    ) -> list[list[VectorSearchResult]]:
+        all_similarities = cosine_similarity(query_vectors, self._candidate_vectors(rows))
+        all_results: list[list[VectorSearchResult]] = []
+        for similarities in all_similarities:
+            results: list[VectorSearchResult] = []
+            for i in top_k_indices(similarities, top_k):
+                row = i if rows is None else rows[i]
+                result = VectorSearchResult(
+                    doc_id=None,
+                    vector=None,
+                    metadata=self._metadata[row],
+                    similarity=similarities[i],
+                )
+                results.append(result)
+            all_results.append(results)
+        return all_results
+
+    def _sharded_search_batch(
+        self, query_vectors, top_k=10, rows: Optional[np.ndarray] = None
+    ) -> list[list[VectorSearchResult]]:
+        all_results: list[list[VectorSearchResult]] = []
+        for similarities, ids in self._sharded.search(query_vectors, self._rows, top_k, rows=rows):
+            results: list[VectorSearchResult] = []
+            for row, similarity in zip(ids, similarities):
+                result = VectorSearchResult(
+                    doc_id=None,
+                    vector=None,
+                    metadata=self._metadata[row],
+                    similarity=similarity,
+                )
+                results.append(result)
+            all_results.append(results)
+        return all_results
+
+    def _quantized_search_batch(
+        self, query_vectors, top_k=10, rows: Optional[np.ndarray] = None
+    ) -> list[list[VectorSearchResult]]:
+        """Scan the quantized matrix, then re-score the best candidates exactly."""
+        self._quantized.sync(self._rows)
+        approximate = self._quantized.scores(query_vectors, rows=rows)
+        num_candidates = min(
+            approximate.shape[1], max(top_k * self.rescore_multiplier, MIN_RESCORE_CANDIDATES)
         )
-        results: list[VectorSearchResult] = []
-        for i, similarity in indexed_similarities[:top_k]:
-            result = VectorSearchResult(
-                doc_id=None,
-                vector=None,
-                metadata=self.metadata[i],
-                similarity=similarity,
-            )
-            results.append(result)
-        return results
 
-    def search_faiss(self, query_vector, top_k=10) -> list[VectorSearchResult]:
+        all_results: list[list[VectorSearchResult]] = []
+        for query_vector, scores in zip(query_vectors, approximate):
+            if num_candidates < len(scores):
+                candidates = np.argpartition(-scores, num_candidates - 1)[:num_candidates]
+            else:
+                candidates = np.arange(len(scores))
+            # keep the candidates in row order so exact ties resolve the same way as in exact search
+            candidates.sort()
+            candidate_rows = candidates if rows is None else rows[candidates]
+            similarities = cosine_similarity([query_vector], self._rows[candidate_rows])[0]
+            results: list[VectorSearchResult] = []
+            for i in top_k_indices(similarities, top_k):
+                result = VectorSearchResult(
+                    doc_id=None,
+                    vector=None,
+                    metadata=self._metadata[candidate_rows[i]],
+                    similarity=similarities[i],
+                )
+                results.append(result)
+            all_results.append(results)
+        return all_results
+
+    def search_faiss(
+        self, query_vector, top_k=10, rows: Optional[np.ndarray] = None
+    ) -> list[VectorSearchResult]:
+        self._ensure_loaded()
+        return self._search_faiss_batch([query_vector], top_k, rows=rows)[0]
+
+    def _search_faiss_batch(
+        self, query_vectors, top_k=10, rows: Optional[np.ndarray] = None
+    ) -> list[list[VectorSearchResult]]:
+        if rows is not None and len(rows) <= FAISS_EXACT_FILTER_MAX_ROWS:
+            return self._exact_search_batch(query_vectors, top_k, rows=rows)
+
         # Limit top_k to the number of vectors we have - Faiss doesn't automatically handle this
-        top_k = min(top_k, len(self.vectors))
+        top_k = min(top_k, self._num_live if rows is None else len(rows))
+        self._faiss_index.sync(self._rows)
+        excluded = np.flatnonzero(self._deleted) if rows is None and self._num_deleted else None
+
+        all_results: list[list[VectorSearchResult]] = []
+        for scores, ids in self._faiss_index.search(
+            query_vectors, top_k, rows=rows, excluded=excluded
+        ):
+            results: list[VectorSearchResult] = []
+            for i, similarity in zip(ids, scores):
+                result = VectorSearchResult(
+                    doc_id=None,
+                    vector=None,
+                    metadata=self._metadata[i],
+                    similarity=float(similarity),
+                )
+                results.append(result)
+            all_results.append(results)
+        return all_results
+
+    def remove_document(self, doc_id):
+        self._check_writable()
+        self._ensure_loaded()
+        if not self._apply_remove(doc_id):
+            return
+        self._append_to_wal(("remove", doc_id))
+        if self._num_deleted > max(
+            AUTO_COMPACT_MIN_TOMBSTONES, AUTO_COMPACT_TOMBSTONE_RATIO * self._num_vectors
+        ):
+            self.compact()
 
-        # faiss expects 2D arrays of vectors
-        vectors_array = (
-            np.array(self.vectors).astype("float32").reshape(len(self.vectors), -1)
+    def _append_to_wal(self, record: tuple) -> None:
+        """Durably append a single record to the write-ahead log."""
+        os.makedirs(self.vector_storage_path, exist_ok=True)
+        with open(self.wal_path, "ab") as f:
+            pickle.dump(record, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+            wal_size = f.tell()
+
+        base_size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        if wal_size > max(base_size, AUTO_COMPACT_MIN_WAL_BYTES):
+            self.compact()
+
+    def _replay_wal(self) -> None:
+        """Apply the records in the write-ahead log on top of the base files."""
+        if not os.path.exists(self.wal_path):
+            return
+        with open(self.wal_path, "rb+") as f:
+            while True:
+                record_start = f.tell()
+                try:
+                    record = pickle.load(f)
+                except EOFError:
+                    if f.tell() != record_start:
+                        # a crash mid-append left a partial record - drop it
+                        f.truncate(record_start)
+                    break
+                except (pickle.UnpicklingError, ValueError, AttributeError, IndexError):
+                    f.truncate(record_start)
+                    break
+                if record[0] == "add":
+                    self._apply_add(record[1], record[2])
+                elif record[0] == "remove":
+                    self._apply_remove(record[1])
+
+    def compact(self) -> None:
+        """
+        Rewrite the base files from the current state and discard the write-ahead log.
+
+        Tombstoned rows are dropped here. The new base is written under the next generation number
+        and only becomes visible once the manifest points at it, so a crash at any point leaves a
+        consistent store behind.
+        """
+        self._check_writable()
+        self._ensure_loaded()
+        os.makedirs(self.vector_storage_path, exist_ok=True)
+        vectors = np.ascontiguousarray(self.vectors, dtype=np.float32)
+        metadata = self.metadata
+        if self._num_deleted:
+            # row positions shift, so the row-aligned side structures follow
+            self._metadata_index.select(~self._deleted)
+            self._faiss_index.invalidate()
+            if self._quantized is not None:
+                self._quantized.invalidate()
+            if self._sharded is not None:
+                self._sharded.invalidate()
+        self.generation += 1
+        write_atomically(self.vectors_path, lambda f: np.save(f, vectors))
+        write_atomically(self.metadata_path, lambda f: write_record_file(f, metadata))
+        manifest = {
+            "format_version": STORAGE_FORMAT_VERSION,
+            "generation": self.generation,
+            "num_vectors": len(vectors),
+            "dimension": vectors.shape[1] if vectors.ndim == 2 else 0,
+        }
+        if self.use_faiss and self._faiss_index.index is not None:
+            self._faiss_index.sync(vectors)
+            write_atomically(
+                self.faiss_index_path, lambda f: f.write(self._faiss_index.serialize())
+            )
+            manifest["faiss_index"] = self._faiss_index.state()
+        write_atomically(
+            self.manifest_path, lambda f: f.write(json.dumps(manifest).encode("utf-8"))
         )
-        query_vector_array = np.array(query_vector).astype("float32").reshape(1, -1)
+        # serve from the freshly written base so the in-memory copy can be released
+        self._set_rows(np.load(self.vectors_path, mmap_mode="r"), metadata)
+        self._remove_stale_files()
+
+    def save(self):
+        self.compact()
 
+    def publish(self) -> None:
+        """Make all changes so far visible to read-only instances, by compacting into a new generation."""
+        self.compact()
+
+    def refresh(self) -> bool:
+        """Switch to the latest generation if a writer has published one since this instance loaded."""
+        self._ensure_loaded()
         try:
-            # Access nested modules step by step
-            contrib = faiss.contrib
-            exhaustive_search = contrib.exhaustive_search
-            knn_func = exhaustive_search.knn
-            
-            _, I = knn_func(query_vector_array, vectors_array, top_k)
-        except AttributeError:
-            # If the nested module structure doesn't work, try direct import as a fallback
-            try:
-                from faiss.contrib.exhaustive_search import knn as direct_knn
-                _, I = direct_knn(query_vector_array, vectors_array, top_k)
-            except (ImportError, AttributeError):
-                # If both approaches fail, raise an error
-                raise ImportError(
-                    "Could not import faiss.contrib.exhaustive_search.knn. "
-                    "Please ensure faiss is installed correctly."
-                )
-                
-        # I is a list of indices in the corpus_vectors array
-        results: list[VectorSearchResult] = []
-        for i in I[0]:
-            result = VectorSearchResult(
-                doc_id=None,
-                vector=None,
-                metadata=self.metadata[i],
-                similarity=cosine_similarity([query_vector], [self.vectors[i]])[0][0],
+            with open(self.manifest_path, "r") as f:
+                generation = json.load(f)["generation"]
+        except FileNotFoundError:
+            return False
+        if generation == self.generation:
+            return False
+        self.load()
+        return True
+
+    def _remove_stale_files(self) -> None:
+        """Delete base and log files that belong to previous generations."""
+        current_files = {
+            os.path.basename(path)
+            for path in (
+                self.manifest_path,
+                self.vectors_path,
+                self.metadata_path,
+                self.wal_path,
+                self.faiss_index_path,
             )
-            results.append(result)
-        return results
+        }
+        for file_name in os.listdir(self.vector_storage_path):
+            if file_name in current_files:
+                continue
+            try:
+                os.remove(os.path.join(self.vector_storage_path, file_name))
+            except OSError:
+                # e.g. still memory-mapped on platforms that forbid removing open files
+                pass
 
-    def remove_document(self, doc_id):
-        i = 0
-        while i < len(self.metadata):
-            if self.metadata[i]["doc_id"] == doc_id:
-                del self.vectors[i]
-                del self.metadata[i]
+    def load(self):
+        with self._load_lock:
+            self._load_started = True
+            try:
+                self._load()
+            except Exception:
+                self._load_started = False
+                raise
+            self._load_complete = True
+
+    def _load(self):
+        self.generation = 0
+        self._set_rows(np.empty((0, 0), dtype=np.float32), [])
+        self._metadata_index = ColumnarMetadataIndex()
+        self._faiss_index.reset()
+        if self._quantized is not None:
+            self._quantized.reset()
+        if self._sharded is not None:
+            self._sharded.reset()
+
+        if os.path.exists(self.manifest_path):
+            for attempt in range(MAX_LOAD_ATTEMPTS):
+                try:
+                    self._load_generation()
+                    break
+                except FileNotFoundError:
+                    # a newer generation was published and this one removed while opening it
+                    if attempt == MAX_LOAD_ATTEMPTS - 1:
+                        raise
+        elif os.path.exists(self.legacy_storage_path):
+            if self.read_only:
+                self._set_rows(*self._read_legacy_storage())
             else:
-                i += 1
-        self.save()
+                self._migrate_legacy_storage()
+            return
 
-    def save(self):
-        os.makedirs(
-            os.path.dirname(self.vector_storage_path), exist_ok=True
-        )  # Ensure the directory exists
-        with open(self.vector_storage_path, "wb") as f:
-            pickle.dump((self.vectors, self.metadata), f)
+        if not self.read_only:
+            self._replay_wal()
 
-    def load(self):
-        if os.path.exists(self.vector_storage_path):
-            with open(self.vector_storage_path, "rb") as f:
-                self.vectors, self.metadata = pickle.load(f)
+    def _load_generation(self) -> None:
+        with open(self.manifest_path, "r") as f:
+            manifest = json.load(f)
+        self.generation = manifest["generation"]
+        if manifest.get("format_version", 1) < 2:
+            with open(self.pickled_metadata_path, "rb") as f:
+                metadata = pickle.load(f)
         else:
-            self.vectors = []
-            self.metadata = []
+            metadata = RecordFile(self.metadata_path)
+            if not self.read_only:
+                # writers need a list they can append to; readers share the mapped file
+                metadata = list(metadata)
+        # Memory-map the matrix instead of reading it; pages are loaded on demand
+        self._set_rows(np.load(self.vectors_path, mmap_mode="r"), metadata)
+        if self.use_faiss and "faiss_index" in manifest:
+            self._load_faiss_index(manifest["faiss_index"])
+
+    def _load_faiss_index(self, state: dict) -> None:
+        """Load the saved faiss index; if it can't be used, it is rebuilt on the next search."""
+        try:
+            if not self._faiss_index.read(self.faiss_index_path, state):
+                self._faiss_index.reset()
+        except (ImportError, RuntimeError) as e:
+            print(f"Could not load faiss index: {e}. It will be rebuilt.")
+            self._faiss_index.reset()
+
+    def _read_legacy_storage(self) -> tuple[np.ndarray, list[ChunkMetadata]]:
+        with open(self.legacy_storage_path, "rb") as f:
+            vectors, metadata = pickle.load(f)
+        if len(vectors) > 0:
+            vectors = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1)
+        else:
+            vectors = np.empty((0, 0), dtype=np.float32)
+        return vectors, list(metadata)
+
+    def _migrate_legacy_storage(self):
+        """Convert a legacy `(vectors, metadata)` pickle into the memory-mapped layout."""
+        self._set_rows(*self._read_legacy_storage())
+        self.compact()
+        os.remove(self.legacy_storage_path)
 
     def delete(self):
+        self._check_writable()
         if os.path.exists(self.vector_storage_path):
-            os.remove(self.vector_storage_path)
+            shutil.rmtree(self.vector_storage_path)
+        if os.path.exists(self.legacy_storage_path):
+            os.remove(self.legacy_storage_path)
 
     def to_dict(self):
         return {
@@ -139,4 +683,10 @@ class BasicVectorDB(VectorDB):
             "kb_id": self.kb_id,
             "storage_directory": self.storage_directory,
             "use_faiss": self.use_faiss,
+            "faiss_index_type": self.faiss_index_type,
+            "ef_search": self.ef_search,
+            "nprobe": self.nprobe,
+            "quantization": self.quantization,
+            "rescore_multiplier": self.rescore_multiplier,
+            "search_shards": self.search_shards,
         }
@@ -110,6 +110,40 @@ class ChromaDB(VectorDB):
 
         return results
 
+    def search_batch(
+        self, query_vectors, top_k=10, metadata_filter: Optional[MetadataFilter] = None
+    ) -> list[list[VectorSearchResult]]:
+        """Runs all the searches in a single multi-embedding `query` call."""
+        if len(query_vectors) == 0:
+            return []
+        if self.get_num_vectors() == 0:
+            return [[] for _ in query_vectors]
+
+        query_embeddings = [
+            query_vector.tolist() if isinstance(query_vector, np.ndarray) else query_vector
+            for query_vector in query_vectors
+        ]
+        query_results = self.collection.query(
+            query_embeddings=query_embeddings,
+            n_results=top_k,
+            include=["distances", "metadatas"],
+            where=format_metadata_filter(metadata_filter) if metadata_filter else None
+        )
+
+        all_results: list[list[VectorSearchResult]] = []
+        for distances, metadatas in zip(query_results["distances"], query_results["metadatas"]):
+            results = [
+                VectorSearchResult(
+                    doc_id=metadata["doc_id"],
+                    vector=None,
+                    metadata=metadata,
+                    similarity=1 - distance,
+                )
+                for distance, metadata in zip(distances, metadatas)
+            ]
+            all_results.append(sorted(results, key=lambda x: x["similarity"], reverse=True))
+        return all_results
+
     def remove_document(self, doc_id: str):
         data = self.collection.get(where={"doc_id": doc_id})
         doc_ids = data["ids"]
@@ -1,10 +1,15 @@
+import threading
 from abc import ABC, abstractmethod
 from typing import Sequence, Optional
 from dsrag.database.vector.types import ChunkMetadata, Vector, VectorSearchResult
+from dsrag.utils.async_utils import run_sync
 
 
 class VectorDB(ABC):
     subclasses = {}
+    # open-time constructor flags the subclass accepts: "lazy_load" defers its disk reads until
+    # first use, "read_only" serves published data shared between processes
+    open_options: tuple[str, ...] = ()
 
     def __init_subclass__(cls, **kwargs):
         super().__init_subclass__(**kwargs)
@@ -60,6 +65,58 @@ class VectorDB(ABC):
         """
         pass
 
+    def search_batch(
+        self, query_vectors: Sequence[Vector], top_k: int = 10, metadata_filter: Optional[dict] = None
+    ) -> list[list[VectorSearchResult]]:
+        """
+        Run several searches at once. Returns one list of results per query vector, in the same
+        format and order as `search`.
+
+        The default implementation calls `search` for each query vector; backends that can
+        answer many queries in a single call should override it.
+        """
+        return [
+            self.search(query_vector, top_k=top_k, metadata_filter=metadata_filter)
+            for query_vector in query_vectors
+        ]
+
+    async def asearch(
+        self, query_vector, top_k: int = 10, metadata_filter: Optional[dict] = None
+    ) -> list[VectorSearchResult]:
+        """
+        Async version of `search`. The default runs `search` in a shared thread pool; backends
+        with an async client override it.
+        """
+        return await run_sync(self.search, query_vector, top_k=top_k, metadata_filter=metadata_filter)
+
+    async def asearch_batch(
+        self, query_vectors: Sequence[Vector], top_k: int = 10, metadata_filter: Optional[dict] = None
+    ) -> list[list[VectorSearchResult]]:
+        """
+        Async version of `search_batch`. The default runs `search_batch` in a shared thread pool.
+        """
+        return await run_sync(self.search_batch, query_vectors, top_k=top_k, metadata_filter=metadata_filter)
+
+    def prefetch(self) -> Optional[threading.Thread]:
+        """
+        Start loading a lazily loaded vector database in a background thread, so the first query
+        doesn't pay for it. Returns the thread, or None for backends with nothing to load.
+        """
+        return None
+
+    def publish(self) -> None:
+        """
+        Make all changes so far visible to read-only instances of the vector database. A no-op for
+        backends whose writes are visible to all readers as soon as they are made.
+        """
+        return None
+
+    def refresh(self) -> bool:
+        """
+        Switch a read-only instance to the latest published data. Returns True if anything changed.
+        """
+        return False
+
     @abstractmethod
     def delete(self) -> None:
         """
@@ -0,0 +1,198 @@
+import math
+from typing import Optional
+
+import numpy as np
+
+from dsrag.utils.imports import faiss
+
+
+FAISS_INDEX_TYPES = ("flat", "hnsw", "ivfpq")
+
+# IVF-PQ needs training data, and below this size a flat index is both exact and fast enough
+IVFPQ_MIN_TRAINING_ROWS = 10_000
+
+# candidate sub-quantizer counts for IVF-PQ, most precise first
+PQ_SUBQUANTIZERS = (64, 48, 32, 24, 16, 12, 8, 4, 2, 1)
+
+# sub-vectors narrower than this make training slow without improving recall much
+PQ_MIN_SUBVECTOR_DIMENSION = 8
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length so that inner product equals cosine similarity."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return np.ascontiguousarray(vectors / norms, dtype=np.float32)
+
+
+class FaissIndex:
+    """
+    A FAISS inner-product index over the unit-normalized rows of a `BasicVectorDB`.
+
+    Index ids are row positions, so rows appended to the vector matrix are appended to the index
+    as-is. Anything that moves rows around (e.g. removing a document) marks the index as stale
+    and it is rebuilt on the next `sync()`.
+
+    Args:
+        index_type: "flat" (exact), "hnsw" or "ivfpq". An "ivfpq" index is served by a flat index
+            until there are enough rows to train it.
+        ef_search: HNSW search depth; raised to `top_k` when smaller.
+        nprobe: Number of IVF cells visited per query.
+        hnsw_m: Number of neighbors per HNSW node.
+        ivf_nlist: Number of IVF cells. Defaults to sqrt(num_vectors).
+        pq_m: Number of PQ sub-quantizers. Defaults to the largest candidate that divides the
+            dimension into sub-vectors of at least `PQ_MIN_SUBVECTOR_DIMENSION` values.
+    """
+
+    def __init__(
+        self,
+        index_type: str = "flat",
+        ef_search: int = 64,
+        nprobe: int = 8,
+        hnsw_m: int = 32,
+        ivf_nlist: Optional[int] = None,
+        pq_m: Optional[int] = None,
+    ):
+        if index_type not in FAISS_INDEX_TYPES:
+            raise ValueError(
+                f"Unsupported faiss_index_type: {index_type}. Expected one of {FAISS_INDEX_TYPES}."
+            )
+        self.index_type = index_type
+        self.ef_search = ef_search
+        self.nprobe = nprobe
+        self.hnsw_m = hnsw_m
+        self.ivf_nlist = ivf_nlist
+        self.pq_m = pq_m
+        self.reset()
+
+    def reset(self) -> None:
+        self.index = None
+        # the structure actually built, which can differ from index_type while IVF-PQ is untrained
+        self.kind: Optional[str] = None
+        self.stale = False
+
+    def invalidate(self) -> None:
+        self.stale = True
+
+    def _nlist(self, num_vectors: int) -> int:
+        if self.ivf_nlist is not None:
+            return self.ivf_nlist
+        return max(1, int(math.sqrt(num_vectors)))
+
+    def _pq_m(self, dimension: int) -> int:
+        if self.pq_m is not None:
+            return self.pq_m
+        return next(
+            (
+                m
+                for m in PQ_SUBQUANTIZERS
+                if dimension % m == 0 and dimension // m >= PQ_MIN_SUBVECTOR_DIMENSION
+            ),
+            1,
+        )
+
+    def _kind_for(self, num_vectors: int) -> str:
+        if self.index_type != "ivfpq":
+            return self.index_type
+        if self.kind == "ivfpq":
+            # a trained index keeps absorbing new rows without retraining
+            return "ivfpq"
+        min_rows = max(IVFPQ_MIN_TRAINING_ROWS, 39 * self._nlist(num_vectors))
+        return "ivfpq" if num_vectors >= min_rows else "flat"
+
+    def build(self, vectors: np.ndarray) -> None:
+        """Build the index from scratch over all rows."""
+        num_vectors, dimension = vectors.shape
+        normalized = normalize_rows(vectors)
+        self.kind = None
+        kind = self._kind_for(num_vectors)
+        if kind == "hnsw":
+            index = faiss.IndexHNSWFlat(dimension, self.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+        elif kind == "ivfpq":
+            quantizer = faiss.IndexFlatIP(dimension)
+            index = faiss.IndexIVFPQ(
+                quantizer,
+                dimension,
+                self._nlist(num_vectors),
+                self._pq_m(dimension),
+                8,
+                faiss.METRIC_INNER_PRODUCT,
+            )
+            index.train(normalized)
+        else:
+            index = faiss.IndexFlatIP(dimension)
+        index.add(normalized)
+        self.index = index
+        self.kind = kind
+        self.stale = False
+
+    def sync(self, vectors: np.ndarray) -> None:
+        """Bring the index up to date with `vectors`, adding only the rows it hasn't seen."""
+        num_vectors = len(vectors)
+        if (
+            self.index is None
+            or self.stale
+            or self.index.ntotal > num_vectors
+            or self.kind != self._kind_for(num_vectors)
+        ):
+            self.build(vectors)
+        elif self.index.ntotal < num_vectors:
+            self.index.add(normalize_rows(vectors[self.index.ntotal :]))
+
+    def _search_parameters(
+        self, top_k: int, rows: Optional[np.ndarray], excluded: Optional[np.ndarray]
+    ):
+        kwargs = {}
+        if rows is not None:
+            kwargs["sel"] = faiss.IDSelectorBatch(np.asarray(rows, dtype=np.int64))
+        elif excluded is not None:
+            kwargs["sel"] = faiss.IDSelectorNot(
+                faiss.IDSelectorBatch(np.asarray(excluded, dtype=np.int64))
+            )
+        if self.kind == "hnsw":
+            return faiss.SearchParametersHNSW(efSearch=max(self.ef_search, top_k), **kwargs)
+        if self.kind == "ivfpq":
+            return faiss.SearchParametersIVF(nprobe=self.nprobe, **kwargs)
+        return faiss.SearchParameters(**kwargs) if kwargs else None
+
+    def search(
+        self,
+        query_vectors,
+        top_k: int,
+        rows: Optional[np.ndarray] = None,
+        excluded: Optional[np.ndarray] = None,
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """
+        Args:
+            query_vectors: The query vectors.
+            top_k: The number of hits per query.
+            rows: If given, only these row ids are searched.
+            excluded: If given (and `rows` isn't), these row ids are skipped.
+
+        Returns:
+            For each query vector, the (scores, row ids) of its hits, best first. Scores are
+            cosine similarities (approximate for IVF-PQ).
+        """
+        queries = normalize_rows(np.asarray(query_vectors).reshape(len(query_vectors), -1))
+        params = self._search_parameters(top_k, rows, excluded)
+        scores, ids = self.index.search(queries, top_k, params=params)
+        return [
+            (query_scores[query_ids >= 0], query_ids[query_ids >= 0])
+            for query_scores, query_ids in zip(scores, ids)
+        ]
+
+    def serialize(self) -> bytes:
+        return faiss.serialize_index(self.index).tobytes()
+
+    def state(self) -> dict:
+        return {"index_type": self.index_type, "kind": self.kind}
+
+    def read(self, path: str, state: dict) -> bool:
+        """Load a saved index if it was built with the same index type. Returns True on success."""
+        if state.get("index_type") != self.index_type:
+            return False
+        self.index = faiss.read_index(path)
+        self.kind = state["kind"]
+        self.stale = False
+        return True
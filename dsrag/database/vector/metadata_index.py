@@ -0,0 +1,155 @@
+from typing import Any, Optional, Sequence
+
+import numpy as np
+
+from dsrag.database.vector.types import ChunkMetadata, MetadataFilter
+
+
+SUPPORTED_OPERATORS = (
+    "equals",
+    "not_equals",
+    "in",
+    "not_in",
+    "greater_than",
+    "less_than",
+    "greater_than_equals",
+    "less_than_equals",
+)
+
+# code used for rows where the field is missing (or holds an unhashable value)
+MISSING_CODE = -1
+
+
+def _as_number(value: Any) -> float:
+    if isinstance(value, bool) or not isinstance(value, (int, float, np.number)):
+        return np.nan
+    return float(value)
+
+
+class _Column:
+    """
+    A single metadata field stored column-wise.
+
+    Values are dictionary-encoded into integer codes for equality/membership tests, and numeric
+    values are additionally kept in a float array (NaN when missing) for range comparisons.
+    """
+
+    def __init__(self, field: str, metadata: Sequence[ChunkMetadata]):
+        self.field = field
+        self.vocabulary: dict[Any, int] = {}
+        self._codes: list[int] = []
+        self._numbers: list[float] = []
+        self._cached_arrays: Optional[tuple[np.ndarray, np.ndarray]] = None
+        self.append(metadata)
+
+    def _encode(self, value: Any) -> int:
+        try:
+            return self.vocabulary.setdefault(value, len(self.vocabulary))
+        except TypeError:
+            return MISSING_CODE
+
+    def append(self, metadata: Sequence[ChunkMetadata]) -> None:
+        for meta in metadata:
+            if self.field in meta:
+                value = meta[self.field]
+                self._codes.append(self._encode(value))
+                self._numbers.append(_as_number(value))
+            else:
+                self._codes.append(MISSING_CODE)
+                self._numbers.append(np.nan)
+        self._cached_arrays = None
+
+    def select(self, keep: np.ndarray) -> None:
+        codes, numbers = self.arrays()
+        self._codes = codes[keep].tolist()
+        self._numbers = numbers[keep].tolist()
+        self._cached_arrays = None
+
+    def arrays(self) -> tuple[np.ndarray, np.ndarray]:
+        if self._cached_arrays is None:
+            self._cached_arrays = (
+                np.asarray(self._codes, dtype=np.int64),
+                np.asarray(self._numbers, dtype=np.float64),
+            )
+        return self._cached_arrays
+
+    def code_of(self, value: Any) -> Optional[int]:
+        try:
+            return self.vocabulary.get(value)
+        except TypeError:
+            return None
+
+
+class ColumnarMetadataIndex:
+    """
+    A side-index over vector metadata that turns a `MetadataFilter` into a row mask.
+
+    Columns are only materialized for fields that are actually filtered on, and are then kept
+    up to date as rows are appended or removed, so repeated filtered searches never have to
+    walk the metadata dicts again. Rows that don't have the filtered field never match.
+    """
+
+    def __init__(self):
+        self._columns: dict[str, _Column] = {}
+
+    def reset(self) -> None:
+        self._columns = {}
+
+    def append(self, metadata: Sequence[ChunkMetadata]) -> None:
+        for column in self._columns.values():
+            column.append(metadata)
+
+    def select(self, keep: np.ndarray) -> None:
+        """Keep only the rows where `keep` is True, e.g. after a document has been removed."""
+        for column in self._columns.values():
+            column.select(keep)
+
+    def mask(self, metadata_filter: MetadataFilter, metadata: Sequence[ChunkMetadata]) -> np.ndarray:
+        """
+        Evaluate the filter against every row.
+
+        Args:
+            metadata_filter: The filter to evaluate.
+            metadata: The full, row-aligned metadata list. Only used to build the column the
+                first time a field is filtered on.
+
+        Returns:
+            A boolean array with one entry per row.
+        """
+        field = metadata_filter["field"]
+        operator = metadata_filter["operator"]
+        value = metadata_filter["value"]
+        if operator not in SUPPORTED_OPERATORS:
+            raise ValueError(f"Unsupported operator: {operator}")
+
+        column = self._columns.get(field)
+        if column is None:
+            column = self._columns[field] = _Column(field, metadata)
+        codes, numbers = column.arrays()
+        present = codes != MISSING_CODE
+
+        if operator in ("equals", "not_equals"):
+            code = column.code_of(value)
+            matches = codes == code if code is not None else np.zeros(len(codes), dtype=bool)
+            return matches if operator == "equals" else present & ~matches
+
+        if operator in ("in", "not_in"):
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            value_codes = [column.code_of(v) for v in values]
+            matches = np.isin(codes, [code for code in value_codes if code is not None])
+            return matches if operator == "in" else present & ~matches
+
+        # range comparisons only apply to numeric values
+        threshold = _as_number(value)
+        if np.isnan(threshold):
+            raise ValueError(
+                f"Operator '{operator}' requires a numeric value, got {value!r}"
+            )
+        with np.errstate(invalid="ignore"):
+            if operator == "greater_than":
+                return numbers > threshold
+            if operator == "less_than":
+                return numbers < threshold
+            if operator == "greater_than_equals":
+                return numbers >= threshold
+            return numbers <= threshold
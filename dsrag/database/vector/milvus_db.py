@@ -145,6 +145,31 @@ class MilvusDB(VectorDB):
 
         return results
 
+    def search_batch(self, query_vectors, top_k: int=10, metadata_filter: Optional[dict] = None) -> list[list[VectorSearchResult]]:
+        if len(query_vectors) == 0:
+            return []
+        batch_results = self.client.search(
+            collection_name=self.kb_id,
+            data=list(query_vectors),
+            filter=_convert_metadata_to_expr(metadata_filter),
+            limit=top_k,
+            output_fields=["*"]
+        )
+        all_results: list[list[VectorSearchResult]] = []
+        for query_results in batch_results:
+            results: list[VectorSearchResult] = []
+            for res in query_results:
+                results.append(
+                    VectorSearchResult(
+                        doc_id=res['entity']['doc_id'],
+                        metadata=res['entity']['metadata'],
+                        similarity=res['distance'],
+                        vector=res['entity']['vector'],
+                    )
+                )
+            all_results.append(sorted(results, key=lambda x: x['similarity'], reverse=True))
+        return all_results
+
     def remove_document(self, doc_id):
         self.client.delete(
             collection_name=self.kb_id,
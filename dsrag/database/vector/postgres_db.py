@@ -1,3 +1,6 @@
+import asyncio
+import csv
+import io
 import os
 import re
 from typing import Optional, Sequence
@@ -6,13 +9,23 @@ import numpy as np
 
 from dsrag.database.vector.db import VectorDB
 from dsrag.database.vector.types import VectorSearchResult, MetadataFilter, ChunkMetadata, Vector
-from dsrag.utils.imports import LazyLoader
+from dsrag.database.postgres_pool import (
+    DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_MIN_CONNECTIONS,
+    get_async_connection_pool,
+    get_connection_pool,
+    quote_identifier,
+)
 
-# Lazy load PostgreSQL dependencies
-psycopg2 = LazyLoader("psycopg2", "psycopg2-binary")
-pgvector = LazyLoader("pgvector")
 
-# We'll import register_vector when needed to avoid immediate import
+ITERATIVE_SCAN_MODES = ("off", "strict_order", "relaxed_order")
+
+# the largest hnsw.ef_search pgvector accepts
+MAX_EF_SEARCH = 1000
+
+
+def parse_version(version: str) -> tuple[int, ...]:
+    return tuple(int(part) for part in re.findall(r"\d+", version))
 
 
 def format_metadata_filter(metadata_filter: MetadataFilter) -> tuple[str, tuple]:
@@ -70,8 +83,55 @@ def format_metadata_filter(metadata_filter: MetadataFilter) -> tuple[str, tuple]
     return filter_expression, params
 
 
+def number_placeholders(expression: str, first: int) -> str:
+    """Turn the `%s` placeholders of a psycopg2 expression into asyncpg's `$1`, `$2`, ... from `first`."""
+    parts = expression.split("%s")
+    return "".join(
+        part + (f"${first + i}" if i < len(parts) - 1 else "") for i, part in enumerate(parts)
+    )
+
+
 class PostgresVectorDB(VectorDB):
-    def __init__(self, kb_id: str, username: Optional[str] = None, password: Optional[str] = None, database: Optional[str] = None, host: str = "localhost", port: int = 5432, vector_dimension: int = 768):
+    """
+    A VectorDB backed by a pgvector table per knowledge base.
+
+    Connections come from a pool that is shared with every other component (e.g. a
+    `PostgresChunkDB`) that connects to the same server and database as the same user.
+    `asearch` uses an asyncpg pool of the same size per event loop.
+
+    Args:
+        min_connections: Connections the shared pool keeps open between operations.
+        max_connections: Upper bound on the shared pool's open connections.
+        ef_search: HNSW search depth; raised to `top_k` for larger searches, since pgvector
+            returns at most `hnsw.ef_search` rows from an index scan.
+        iterative_scan: pgvector iterative index scan mode for filtered searches ("off",
+            "strict_order" or "relaxed_order"). Ignored before pgvector 0.8.0.
+        use_halfvec: Store embeddings as half-precision `halfvec`, halving the table and index
+            size. Only applies when the table is created.
+        defer_index_build: Don't create the HNSW index with the table. Call `build_index()` once
+            the initial load is done, which is much faster than maintaining the index row by row.
+    """
+
+    def __init__(
+        self,
+        kb_id: str,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        database: Optional[str] = None,
+        host: str = "localhost",
+        port: int = 5432,
+        vector_dimension: int = 768,
+        min_connections: int = DEFAULT_MIN_CONNECTIONS,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        ef_search: int = 40,
+        iterative_scan: str = "relaxed_order",
+        use_halfvec: bool = False,
+        defer_index_build: bool = False,
+    ):
+        if iterative_scan not in ITERATIVE_SCAN_MODES:
+            raise ValueError(
+                f"Unsupported iterative_scan: {iterative_scan}. Expected one of {ITERATIVE_SCAN_MODES}."
+            )
         self.kb_id = kb_id
         self.table_name = f'{kb_id}_vectors'
         self.index_name = f'{kb_id}_embedding_index'
@@ -81,208 +141,255 @@ class PostgresVectorDB(VectorDB):
         self.host = host or os.environ.get("POSTGRES_HOST", "localhost")
         self.port = port or int(os.environ.get("POSTGRES_PORT", 5432))
         self.vector_dimension = vector_dimension
+        self.ef_search = ef_search
+        self.iterative_scan = iterative_scan
+        self.use_halfvec = use_halfvec
+        self.defer_index_build = defer_index_build
 
         if not self.username or not self.password or not self.database:
             raise ValueError(
                 "PostgresVectorDB requires username, password, and database. "
                 "Provide them directly or set POSTGRES_USER/POSTGRES_PASSWORD/POSTGRES_DB."
             )
+        self.min_connections = min_connections
+        self.max_connections = max_connections
+        self._pool = get_connection_pool(
+            self.host, self.port, self.database, self.username, self.password,
+            min_connections, max_connections,
+        )
 
         # Create the extension if it doesn't exist
-        conn = psycopg2.connect(
-            dbname=self.database,
-            user=self.username,
-            password=self.password,
-            host=self.host,
-            port=self.port,
-        )
-        cur = conn.cursor()
-        cur.execute('CREATE EXTENSION IF NOT EXISTS vector')
-        conn.commit()
+        with self._pool.connection() as conn:
+            cur = conn.cursor()
+            cur.execute('CREATE EXTENSION IF NOT EXISTS vector')
+            conn.commit()
 
-        # Import register_vector only when needed
-        from pgvector.psycopg2 import register_vector
-        register_vector(conn)
+            cur.execute("SELECT extversion FROM pg_extension WHERE extname = 'vector'")
+            self._pgvector_version = parse_version(cur.fetchone()[0])
 
-        from psycopg2 import sql
+            from psycopg2 import sql
 
-        cur.execute(
-            sql.SQL(
-                "SELECT EXISTS (SELECT 1 FROM pg_tables WHERE schemaname = 'public' AND tablename = {})")
-            .format(sql.Literal(self.table_name))
-        )
-        exists = cur.fetchone()[0]
-        # Create the table for this kb id if it doesn't exist
-        if not exists:
             cur.execute(
                 sql.SQL(
-                    "CREATE TABLE {} (id TEXT PRIMARY KEY, metadata JSONB, embedding vector(%s))")
-                .format(sql.Identifier(self.table_name)),
-                [vector_dimension]
+                    "SELECT EXISTS (SELECT 1 FROM pg_tables WHERE schemaname = 'public' AND tablename = {})")
+                .format(sql.Literal(self.table_name))
             )
-            conn.commit()
+            exists = cur.fetchone()[0]
+            # Create the table for this kb id if it doesn't exist
+            if not exists:
+                cur.execute(
+                    sql.SQL(
+                        "CREATE TABLE {} (id TEXT PRIMARY KEY, metadata JSONB, embedding {}(%s))")
+                    .format(sql.Identifier(self.table_name), sql.SQL("halfvec" if use_halfvec else "vector")),
+                    [vector_dimension]
+                )
+                conn.commit()
+
+            # an existing table keeps the type it was created with, whatever use_halfvec says
+            cur.execute(
+                """
+                SELECT t.typname FROM pg_attribute a JOIN pg_type t ON a.atttypid = t.oid
+                WHERE a.attname = 'embedding' AND a.attrelid = (
+                    SELECT oid FROM pg_class WHERE relname = %s AND relnamespace = 'public'::regnamespace
+                )
+                """,
+                (self.table_name,),
+            )
+            self._vector_type = cur.fetchone()[0]
+
+        # with defer_index_build, build_index() is called once the initial load is done
+        if not exists and not defer_index_build:
+            self.build_index()
 
-            # Create the index
+    def build_index(self) -> None:
+        """Create the HNSW index if it doesn't exist yet, e.g. after a load with `defer_index_build=True`."""
+        from psycopg2 import sql
+
+        with self._pool.connection() as conn:
+            cur = conn.cursor()
             cur.execute(
                 sql.SQL(
                     """
-                    CREATE INDEX {} ON {} USING hnsw(embedding vector_cosine_ops)
+                    CREATE INDEX IF NOT EXISTS {} ON {} USING hnsw(embedding {})
                     WITH (m = 16, ef_construction = 64)
                     """)
                 .format(
                     sql.Identifier(self.index_name),
-                    sql.Identifier(self.table_name)
+                    sql.Identifier(self.table_name),
+                    sql.SQL(f"{self._vector_type}_cosine_ops"),
                 )
             )
             conn.commit()
 
-        conn.close()
-
     def get_num_vectors(self):
-        conn = psycopg2.connect(
-            dbname=self.database,
-            user=self.username,
-            password=self.password,
-            host=self.host,
-            port=self.port
-        )
-
-        try:
+        with self._pool.connection() as conn:
             from psycopg2 import sql
 
             cur = conn.cursor()
             cur.execute(
                 sql.SQL("SELECT COUNT(*) FROM {}").format(sql.Identifier(self.table_name)))
             count = cur.fetchone()[0]
-        finally:
-            conn.close()
         return count
 
     def add_vectors(self, vectors: Sequence[Vector], metadata: Sequence[ChunkMetadata]):
-
-        conn = psycopg2.connect(
-            dbname=self.database,
-            user=self.username,
-            password=self.password,
-            host=self.host,
-            port=self.port
-        )
-        cur = conn.cursor()
-
-        vectors = np.array(vectors)
-        # Create the ids from the doc_id and chunk_index
-        ids = [
-            f"{content['doc_id']}_{content['chunk_index']}" for content in metadata]
-        data_to_insert = [(id, json.dumps(content), embedding)
-                          for id, content, embedding in zip(ids, metadata, vectors)]
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if len(vectors) != len(metadata):
+            raise ValueError("Error in add_vectors: the number of vectors and metadata items must be the same.")
+
+        # Stream the rows through COPY as CSV; the vector literal is the same for vector and halfvec
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for content, embedding in zip(metadata, vectors):
+            writer.writerow([
+                f"{content['doc_id']}_{content['chunk_index']}",
+                json.dumps(content),
+                "[" + ",".join(map(repr, embedding.tolist())) + "]",
+            ])
+        buffer.seek(0)
 
         from psycopg2 import sql
-        insert_sql = sql.SQL("INSERT INTO {} (id, metadata, embedding) VALUES (%s, %s, %s)").format(
-            sql.Identifier(self.table_name)).as_string(cur)
-
-        cur.executemany(insert_sql, data_to_insert)
-        conn.commit()
-        conn.close()
+        with self._pool.connection() as conn:
+            cur = conn.cursor()
+            cur.copy_expert(
+                sql.SQL("COPY {} (id, metadata, embedding) FROM STDIN WITH (FORMAT csv)").format(
+                    sql.Identifier(self.table_name)),
+                buffer,
+            )
+            conn.commit()
 
     def remove_document(self, doc_id):
+        with self._pool.connection() as conn:
+            cur = conn.cursor()
 
-        conn = psycopg2.connect(
-            dbname=self.database,
-            user=self.username,
-            password=self.password,
-            host=self.host,
-            port=self.port
-        )
-        cur = conn.cursor()
+            # Delete all vectors with the given doc_id
+            condition = {"doc_id": doc_id}
 
-        # Delete all vectors with the given doc_id
-        condition = {"doc_id": doc_id}
+            from psycopg2 import sql
+            cur.execute(
+                sql.SQL(
+                    "DELETE FROM {} WHERE metadata @> %s").format(sql.Identifier(self.table_name)),
+                [json.dumps(condition)]
+            )
 
-        from psycopg2 import sql
-        cur.execute(
-            sql.SQL(
-                "DELETE FROM {} WHERE metadata @> %s").format(sql.Identifier(self.table_name)),
-            [json.dumps(condition)]
-        )
+            conn.commit()
 
-        conn.commit()
-        conn.close()
+    def _search_settings(self, top_k: int, filtered: bool) -> list[str]:
+        """SET LOCAL statements for one search, so results aren't truncated at ef_search rows."""
+        settings = [f"SET LOCAL hnsw.ef_search = {min(max(self.ef_search, top_k), MAX_EF_SEARCH)}"]
+        # a filter applied after the index scan can discard most of its rows; iterative scans
+        # (pgvector 0.8.0+) keep scanning until there are enough matches
+        if filtered and self.iterative_scan != "off" and self._pgvector_version >= (0, 8, 0):
+            settings.append(f"SET LOCAL hnsw.iterative_scan = {self.iterative_scan}")
+        return settings
 
     def search(self, query_vector: list, top_k: int = 10, metadata_filter: Optional[MetadataFilter] = None):
-
-        conn = psycopg2.connect(
-            dbname=self.database,
-            user=self.username,
-            password=self.password,
-            host=self.host,
-            port=self.port
-        )
-        cur = conn.cursor()
-
-        query_vector = np.array(query_vector)
-
-        if metadata_filter:
-            filter_expression, filter_params = format_metadata_filter(metadata_filter)
+        query_vector = np.asarray(query_vector, dtype=np.float32)
 
         from psycopg2 import sql
         if metadata_filter:
-            query = sql.SQL("""
-                SELECT metadata, embedding, 1 - (embedding <=> %s) AS cosine_similarity
-                FROM {} 
-                WHERE {} 
-                ORDER BY cosine_similarity DESC 
-                LIMIT %s
-            """).format(
-                sql.Identifier(self.table_name),
-                sql.SQL(filter_expression)
-            )
+            filter_expression, filter_params = format_metadata_filter(metadata_filter)
+            where = sql.SQL("WHERE {}").format(sql.SQL(filter_expression))
+        else:
+            filter_params = ()
+            where = sql.SQL("")
+
+        # ORDER BY the distance operator itself, which is what lets the HNSW index serve the query
+        query = sql.SQL("""
+            SELECT metadata, embedding::vector, embedding <=> %s::{vector_type} AS distance
+            FROM {table}
+            {where}
+            ORDER BY distance
+            LIMIT %s
+        """).format(
+            vector_type=sql.SQL(self._vector_type),
+            table=sql.Identifier(self.table_name),
+            where=where,
+        )
+        if metadata_filter and self.iterative_scan == "relaxed_order":
+            # relaxed iterative scans can return rows slightly out of order
+            query = sql.SQL("WITH candidates AS MATERIALIZED ({}) SELECT * FROM candidates ORDER BY distance").format(query)
 
-            params = (query_vector, *filter_params, top_k)
+        with self._pool.connection(register_vector=True) as conn:
+            cur = conn.cursor()
+            for setting in self._search_settings(top_k, filtered=bool(metadata_filter)):
+                cur.execute(setting)
+            cur.execute(query, (query_vector, *filter_params, top_k))
+            results = cur.fetchall()
 
-            cur.execute(query, params)
-        else:
-            query = sql.SQL("""
-                SELECT metadata, embedding, 1 - (embedding <=> %s) AS cosine_similarity
-                FROM {}
-                ORDER BY cosine_similarity DESC
-                LIMIT %s
-            """).format(sql.Identifier(self.table_name))
-            cur.execute(query, (query_vector, top_k))
-
-        results = cur.fetchall()
         formatted_results: list[VectorSearchResult] = []
         for row in results:
-            metadata, embedding, cosine_similarity = row
+            metadata, embedding, distance = row
 
             formatted_results.append(
                 VectorSearchResult(
                     doc_id=metadata["doc_id"],
                     vector=embedding,
                     metadata=metadata,
-                    similarity=cosine_similarity,
+                    similarity=1 - distance,
                 )
             )
 
-        conn.close()
+        return formatted_results
+
+    async def asearch(self, query_vector: list, top_k: int = 10, metadata_filter: Optional[MetadataFilter] = None):
+        # vectors travel as real[] so the asyncpg connections don't need pgvector codecs
+        params = [np.asarray(query_vector, dtype=np.float32).tolist()]
+        where = ""
+        if metadata_filter:
+            filter_expression, filter_params = format_metadata_filter(metadata_filter)
+            where = f"WHERE {number_placeholders(filter_expression, 2)}"
+            params.extend(filter_params)
+        params.append(top_k)
+        query = f"""
+            SELECT metadata, embedding::vector::real[], embedding <=> $1::real[]::{self._vector_type} AS distance
+            FROM {quote_identifier(self.table_name)}
+            {where}
+            ORDER BY distance
+            LIMIT ${len(params)}
+        """
+        if metadata_filter and self.iterative_scan == "relaxed_order":
+            query = f"WITH candidates AS MATERIALIZED ({query}) SELECT * FROM candidates ORDER BY distance"
+
+        pool = await get_async_connection_pool(
+            self.host, self.port, self.database, self.username, self.password,
+            self.min_connections, self.max_connections,
+        )
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                for setting in self._search_settings(top_k, filtered=bool(metadata_filter)):
+                    await conn.execute(setting)
+                results = await conn.fetch(query, *params)
 
+        formatted_results: list[VectorSearchResult] = []
+        for metadata, embedding, distance in results:
+            metadata = json.loads(metadata)
+            formatted_results.append(
+                VectorSearchResult(
+                    doc_id=metadata["doc_id"],
+                    vector=np.asarray(embedding, dtype=np.float32),
+                    metadata=metadata,
+                    similarity=1 - distance,
+                )
+            )
         return formatted_results
 
+    async def asearch_batch(
+        self, query_vectors: Sequence[Vector], top_k: int = 10, metadata_filter: Optional[MetadataFilter] = None
+    ) -> list[list[VectorSearchResult]]:
+        """Runs the searches concurrently, each on its own pooled connection."""
+        return list(await asyncio.gather(*(
+            self.asearch(query_vector, top_k=top_k, metadata_filter=metadata_filter)
+            for query_vector in query_vectors
+        )))
+
     def delete(self):
         # Delete the table
-        conn = psycopg2.connect(
-            dbname=self.database,
-            user=self.username,
-            password=self.password,
-            host=self.host,
-            port=self.port
-        )
-
-        from psycopg2 import sql
-        cur = conn.cursor()
-        cur.execute(sql.SQL("DROP TABLE {}").format(
-            sql.Identifier(self.table_name)))
-        conn.commit()
-        conn.close()
+        with self._pool.connection() as conn:
+            from psycopg2 import sql
+            cur = conn.cursor()
+            cur.execute(sql.SQL("DROP TABLE {}").format(
+                sql.Identifier(self.table_name)))
+            conn.commit()
 
     def to_dict(self):
         return {
@@ -292,5 +399,11 @@ class PostgresVectorDB(VectorDB):
             "database": self.database,
             "host": self.host,
             "port": self.port,
-            "vector_dimension": self.vector_dimension
+            "vector_dimension": self.vector_dimension,
+            "ef_search": self.ef_search,
+            "iterative_scan": self.iterative_scan,
+            "use_halfvec": self.use_halfvec,
+            "defer_index_build": self.defer_index_build,
+            "min_connections": self.min_connections,
+            "max_connections": self.max_connections,
         }
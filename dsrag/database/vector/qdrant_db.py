@@ -5,6 +5,7 @@ from dsrag.database.vector.types import ChunkMetadata, Vector, VectorSearchResul
 from dsrag.database.vector.db import VectorDB
 import numpy as np
 from typing import Optional
+from dsrag.utils.async_utils import LoopLocal
 from dsrag.utils.imports import LazyLoader
 
 # Lazy load qdrant_client
@@ -21,6 +22,15 @@ def convert_id(_id: str) -> str:
     return str(uuid.uuid5(uuid.NAMESPACE_DNS, _id))
 
 
+def to_search_result(point) -> VectorSearchResult:
+    return VectorSearchResult(
+        doc_id=cast(str, point.payload.get("doc_id")),
+        metadata=cast(ChunkMetadata, point.payload.get("metadata")),
+        similarity=point.score,
+        vector=cast(Vector, point.vector),
+    )
+
+
 class QdrantVectorDB(VectorDB):
     """
     An implementation of the VectorDB interface for Qdrant - https://qdrant.tech/.
@@ -84,6 +94,13 @@ class QdrantVectorDB(VectorDB):
             "path": path,
         }
         self.client = qdrant_client.QdrantClient(**self.client_options)
+        # async clients are bound to the event loop they're created in
+        self._async_clients = LoopLocal(lambda: qdrant_client.AsyncQdrantClient(**self.client_options))
+
+    @property
+    def _is_local(self) -> bool:
+        # a local (in-memory or on-disk) Qdrant can't be shared with a second, async client
+        return self.client_options["location"] == ":memory:" or self.client_options["path"] is not None
 
     def close(self):
         """
@@ -177,7 +194,6 @@ class QdrantVectorDB(VectorDB):
         if isinstance(query_vector, np.ndarray):
             query_vector = query_vector.tolist()
 
-        results: list[VectorSearchResult] = []
         response = self.client.query_points(
             self.kb_id,
             query=query_vector,
@@ -186,16 +202,66 @@ class QdrantVectorDB(VectorDB):
             with_payload=True,
             with_vectors=True,
         ).points
-        for point in response:
-            results.append(
-                VectorSearchResult(
-                    doc_id=cast(str, point.payload.get("doc_id")),
-                    metadata=cast(ChunkMetadata, point.payload.get("metadata")),
-                    similarity=point.score,
-                    vector=cast(Vector, point.vector),
-                )
+        return [to_search_result(point) for point in response]
+
+    async def asearch(
+        self,
+        query_vector: list,
+        top_k: int = 10,
+        metadata_filter: Optional[dict] = None,
+    ) -> list[VectorSearchResult]:
+        if self._is_local:
+            return await super().asearch(query_vector, top_k=top_k, metadata_filter=metadata_filter)
+        if isinstance(query_vector, np.ndarray):
+            query_vector = query_vector.tolist()
+        response = await self._async_clients.get().query_points(
+            self.kb_id,
+            query=query_vector,
+            limit=top_k,
+            query_filter=metadata_filter,
+            with_payload=True,
+            with_vectors=True,
+        )
+        return [to_search_result(point) for point in response.points]
+
+    def _query_requests(self, query_vectors: Sequence[Vector], top_k: int, metadata_filter: Optional[dict]) -> list:
+        return [
+            qdrant_client.models.QueryRequest(
+                query=query_vector.tolist() if isinstance(query_vector, np.ndarray) else query_vector,
+                limit=top_k,
+                filter=metadata_filter,
+                with_payload=True,
+                with_vector=True,
             )
-        return results
+            for query_vector in query_vectors
+        ]
+
+    def search_batch(
+        self,
+        query_vectors: Sequence[Vector],
+        top_k: int = 10,
+        metadata_filter: Optional[dict] = None,
+    ) -> list[list[VectorSearchResult]]:
+        """Runs all the searches in a single `query_batch_points` request."""
+        requests = self._query_requests(query_vectors, top_k, metadata_filter)
+        if not requests:
+            return []
+        responses = self.client.query_batch_points(self.kb_id, requests=requests)
+        return [[to_search_result(point) for point in response.points] for response in responses]
+
+    async def asearch_batch(
+        self,
+        query_vectors: Sequence[Vector],
+        top_k: int = 10,
+        metadata_filter: Optional[dict] = None,
+    ) -> list[list[VectorSearchResult]]:
+        if self._is_local:
+            return await super().asearch_batch(query_vectors, top_k=top_k, metadata_filter=metadata_filter)
+        requests = self._query_requests(query_vectors, top_k, metadata_filter)
+        if not requests:
+            return []
+        responses = await self._async_clients.get().query_batch_points(self.kb_id, requests=requests)
+        return [[to_search_result(point) for point in response.points] for response in responses]
 
     def get_num_vectors(self):
         return self.client.count(self.kb_id).count
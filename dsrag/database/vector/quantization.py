@@ -0,0 +1,115 @@
+from typing import Optional
+
+import numpy as np
+
+from dsrag.database.vector.faiss_index import normalize_rows
+
+
+QUANTIZATION_TYPES = ("float16", "int8")
+
+# rows are converted back to float32 in blocks of this size while scoring, to bound the
+# temporary memory a query needs
+SCORING_BLOCK_ROWS = 65_536
+
+INT8_MAX = 127
+
+
+class QuantizedMatrix:
+    """
+    A compact copy of the unit-normalized rows of a `BasicVectorDB`, used for a first scoring
+    pass whose top candidates are then re-scored exactly against the float32 vectors.
+
+    - "float16" halves the memory of the matrix.
+    - "int8" stores each value as `round(value / scale[dimension])`, with a per-dimension scale
+      taken from the largest absolute value in that dimension, which quarters it.
+
+    Like `FaissIndex`, rows appended to the vector matrix are appended here as-is, and anything
+    that moves rows around marks the matrix as stale so it is rebuilt on the next `sync()`.
+    """
+
+    def __init__(self, quantization: str):
+        if quantization not in QUANTIZATION_TYPES:
+            raise ValueError(
+                f"Unsupported quantization: {quantization}. Expected one of {QUANTIZATION_TYPES}."
+            )
+        self.quantization = quantization
+        self.reset()
+
+    def reset(self) -> None:
+        self._buffer: Optional[np.ndarray] = None
+        self._num_rows = 0
+        self.scale: Optional[np.ndarray] = None
+        self.stale = False
+
+    def invalidate(self) -> None:
+        self.stale = True
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._buffer[: self._num_rows]
+
+    @property
+    def nbytes(self) -> int:
+        return 0 if self._buffer is None else self.matrix.nbytes
+
+    def _quantize(self, vectors: np.ndarray) -> np.ndarray:
+        normalized = normalize_rows(vectors)
+        if self.quantization == "float16":
+            return normalized.astype(np.float16)
+        codes = np.rint(normalized / self.scale)
+        return np.clip(codes, -INT8_MAX, INT8_MAX).astype(np.int8)
+
+    def build(self, vectors: np.ndarray) -> None:
+        """Quantize all rows from scratch (which also refreshes the int8 scale)."""
+        if self.quantization == "int8":
+            max_abs = np.zeros(vectors.shape[1], dtype=np.float32)
+            for start in range(0, len(vectors), SCORING_BLOCK_ROWS):
+                block = normalize_rows(vectors[start : start + SCORING_BLOCK_ROWS])
+                max_abs = np.maximum(max_abs, np.abs(block).max(axis=0))
+            max_abs[max_abs == 0] = 1.0
+            self.scale = max_abs / INT8_MAX
+        dtype = np.float16 if self.quantization == "float16" else np.int8
+        self._buffer = np.empty(vectors.shape, dtype=dtype)
+        for start in range(0, len(vectors), SCORING_BLOCK_ROWS):
+            block = vectors[start : start + SCORING_BLOCK_ROWS]
+            self._buffer[start : start + len(block)] = self._quantize(block)
+        self._num_rows = len(vectors)
+        self.stale = False
+
+    def sync(self, vectors: np.ndarray) -> None:
+        """Bring the matrix up to date with `vectors`, quantizing only the rows it hasn't seen."""
+        num_rows = len(vectors)
+        if self._buffer is None or self.stale or self._num_rows > num_rows:
+            self.build(vectors)
+            return
+        if self._num_rows == num_rows:
+            return
+        new_rows = self._quantize(vectors[self._num_rows :])
+        required = num_rows
+        if required > len(self._buffer):
+            buffer = np.empty(
+                (max(required, 2 * self._num_rows), self._buffer.shape[1]), dtype=self._buffer.dtype
+            )
+            buffer[: self._num_rows] = self.matrix
+            self._buffer = buffer
+        self._buffer[self._num_rows : required] = new_rows
+        self._num_rows = required
+
+    def scores(self, query_vectors, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Approximate cosine similarities of each query vector against the quantized rows.
+
+        Returns:
+            A (num_queries, num_rows) float32 array, or (num_queries, len(rows)) when `rows`
+            restricts the candidates.
+        """
+        queries = normalize_rows(np.asarray(query_vectors).reshape(len(query_vectors), -1))
+        if self.quantization == "int8":
+            # (codes * scale) @ q == codes @ (scale * q)
+            queries = queries * self.scale
+        matrix = self.matrix if rows is None else self.matrix[rows]
+        scores = np.empty((len(queries), len(matrix)), dtype=np.float32)
+        for start in range(0, len(matrix), SCORING_BLOCK_ROWS):
+            block = matrix[start : start + SCORING_BLOCK_ROWS].astype(np.float32)
+            scores[:, start : start + len(block)] = queries @ block.T
+        return scores
@@ -0,0 +1,139 @@
+import concurrent.futures
+from typing import Optional
+
+import numpy as np
+from sklearn.preprocessing import normalize
+
+
+# below this many rows per shard, the thread hand-off costs more than it saves
+MIN_ROWS_PER_SHARD = 4096
+
+
+def top_k_indices(similarities: np.ndarray, top_k: int) -> np.ndarray:
+    """
+    Indices of the `top_k` highest similarities, best first. Ties are broken by position, the
+    same order a stable descending sort produces.
+    """
+    if top_k >= len(similarities):
+        candidates = np.arange(len(similarities))
+    else:
+        threshold = np.partition(similarities, len(similarities) - top_k)[len(similarities) - top_k]
+        # keep every candidate tied with the k-th score so the tie-break stays deterministic
+        candidates = np.flatnonzero(similarities >= threshold)
+    order = np.lexsort((candidates, -similarities[candidates]))
+    return candidates[order[:top_k]]
+
+
+def similarity_dtype(query_vectors: np.ndarray, vectors: np.ndarray) -> type:
+    """The dtype `sklearn.metrics.pairwise.cosine_similarity` computes in for these inputs."""
+    if query_vectors.dtype == vectors.dtype == np.float32:
+        return np.float32
+    return np.float64
+
+
+class ShardedExactSearch:
+    """
+    Exact cosine search over a pre-normalized copy of the rows of a `BasicVectorDB`.
+
+    The rows are normalized once (rather than on every query), split into contiguous shards that
+    are scored in a thread pool (numpy releases the GIL inside BLAS), and each shard only hands
+    its partial top-k to the final merge. Normalization and scoring use the same operations as
+    `cosine_similarity`, so similarities and ordering are identical to the unsharded search.
+
+    The normalized copy is kept in the dtype `cosine_similarity` would use, which is float64 for
+    the usual float64 query vectors, i.e. twice the memory of the float32 matrix.
+    """
+
+    def __init__(self, num_shards: int):
+        if num_shards < 1:
+            raise ValueError(f"search_shards must be at least 1, got {num_shards}.")
+        self.num_shards = num_shards
+        self._executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self.reset()
+
+    def reset(self) -> None:
+        # dtype -> (buffer, number of normalized rows)
+        self._normalized: dict[type, tuple[np.ndarray, int]] = {}
+
+    def invalidate(self) -> None:
+        self.reset()
+
+    def _normalized_rows(self, rows: np.ndarray, dtype: type) -> np.ndarray:
+        """The normalized rows in `dtype`, normalizing only rows appended since the last call."""
+        buffer, num_rows = self._normalized.get(dtype, (None, 0))
+        if buffer is None or num_rows > len(rows):
+            buffer = normalize(np.asarray(rows, dtype=dtype), copy=True)
+            num_rows = len(rows)
+        elif num_rows < len(rows):
+            new_rows = normalize(np.asarray(rows[num_rows:], dtype=dtype), copy=True)
+            if len(rows) > len(buffer):
+                grown = np.empty((max(len(rows), 2 * num_rows), rows.shape[1]), dtype=dtype)
+                grown[:num_rows] = buffer[:num_rows]
+                buffer = grown
+            buffer[num_rows : len(rows)] = new_rows
+            num_rows = len(rows)
+        self._normalized[dtype] = (buffer, num_rows)
+        return buffer[:num_rows]
+
+    def _map(self, fn, shards: list) -> list:
+        if len(shards) == 1:
+            return [fn(shards[0])]
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.num_shards, thread_name_prefix="dsrag-vector-search"
+            )
+        return list(self._executor.map(fn, shards))
+
+    def search(
+        self,
+        query_vectors,
+        vectors: np.ndarray,
+        top_k: int,
+        rows: Optional[np.ndarray] = None,
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """
+        Args:
+            query_vectors: The query vectors.
+            vectors: All stored rows.
+            top_k: The number of hits per query.
+            rows: If given, only these row ids are searched.
+
+        Returns:
+            For each query vector, the (similarities, row ids) of its hits, best first.
+        """
+        queries = np.asarray(query_vectors)
+        if queries.dtype.kind != "f":
+            queries = queries.astype(np.float64)
+        dtype = similarity_dtype(queries, vectors)
+        normalized_queries = normalize(queries.astype(dtype, copy=False), copy=True)
+        normalized = self._normalized_rows(vectors, dtype)
+
+        num_candidates = len(normalized) if rows is None else len(rows)
+        num_shards = max(1, min(self.num_shards, num_candidates // MIN_ROWS_PER_SHARD))
+        bounds = np.linspace(0, num_candidates, num_shards + 1).astype(int)
+
+        def score_shard(shard: tuple[int, int]) -> list[tuple[np.ndarray, np.ndarray]]:
+            start, stop = shard
+            if rows is None:
+                shard_ids = np.arange(start, stop)
+                block = normalized[start:stop]
+            else:
+                shard_ids = rows[start:stop]
+                block = normalized[shard_ids]
+            similarities = normalized_queries @ block.T
+            shard_hits = []
+            for query_similarities in similarities:
+                best = top_k_indices(query_similarities, top_k)
+                shard_hits.append((query_similarities[best], shard_ids[best]))
+            return shard_hits
+
+        shard_results = self._map(score_shard, list(zip(bounds[:-1], bounds[1:])))
+
+        # merge the per-shard top-k lists, keeping ties in row order
+        merged = []
+        for query_index in range(len(normalized_queries)):
+            similarities = np.concatenate([hits[query_index][0] for hits in shard_results])
+            ids = np.concatenate([hits[query_index][1] for hits in shard_results])
+            order = np.lexsort((ids, -similarities))[:top_k]
+            merged.append((similarities[order], ids[order]))
+        return merged
@@ -1,8 +1,21 @@
+import hashlib
+import json
+import logging
 import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
 from abc import ABC, abstractmethod
-from typing import Optional
+from collections import OrderedDict
+from typing import Optional, Sequence, Union
+
+import numpy as np
+
 from dsrag.database.vector.types import Vector
 from dsrag.utils.imports import openai, cohere, voyageai, ollama
+from dsrag.utils.async_utils import LoopLocal, run_sync
 
 
 dimensionality = {
@@ -48,6 +61,17 @@ class Embedding(ABC):
     def get_embeddings(self, text: list[str], input_type: Optional[str]) -> list[Vector]:
         pass
 
+    async def aget_embeddings(self, text: list[str], input_type: Optional[str] = None) -> list[Vector]:
+        """
+        Async version of `get_embeddings`. The default runs `get_embeddings` in a shared thread
+        pool; models with an async client override it.
+        """
+        return await run_sync(self.get_embeddings, text, input_type)
+
+    def cache_stats(self) -> Optional[dict[str, int]]:
+        """Hit/miss counters of a caching embedding model, or None for models that don't cache."""
+        return None
+
 
 class OpenAIEmbedding(Embedding):
     def __init__(self, model: str = "text-embedding-3-small", dimension: int = 768):
@@ -61,6 +85,10 @@ class OpenAIEmbedding(Embedding):
             self.client = openai.OpenAI(api_key=os.environ["OPENAI_API_KEY"], base_url=base_url)
         else:
             self.client = openai.OpenAI(api_key=os.environ["OPENAI_API_KEY"])
+        # async clients are bound to the event loop they're created in
+        self._async_clients = LoopLocal(
+            lambda: openai.AsyncOpenAI(api_key=self.client.api_key, base_url=self.client.base_url)
+        )
 
     def get_embeddings(self, text: list[str], input_type: Optional[str] = None) -> list[Vector]:
         response = self.client.embeddings.create(
@@ -69,6 +97,13 @@ class OpenAIEmbedding(Embedding):
         embeddings = [embedding_item.embedding for embedding_item in response.data]
         return embeddings[0] if isinstance(text, str) else embeddings
 
+    async def aget_embeddings(self, text: list[str], input_type: Optional[str] = None) -> list[Vector]:
+        response = await self._async_clients.get().embeddings.create(
+            input=text, model=self.model, dimensions=self.dimension
+        )
+        embeddings = [embedding_item.embedding for embedding_item in response.data]
+        return embeddings[0] if isinstance(text, str) else embeddings
+
     def to_dict(self):
         base_dict = super().to_dict()
         base_dict.update({"model": self.model})
@@ -83,8 +118,12 @@ class CohereEmbedding(Embedding):
         base_url = os.environ.get("DSRAG_COHERE_BASE_URL", None)
         if base_url is not None:
             self.client = cohere.Client(api_key=os.environ["CO_API_KEY"], base_url=base_url)
+            self._async_clients = LoopLocal(
+                lambda: cohere.AsyncClient(api_key=os.environ["CO_API_KEY"], base_url=base_url)
+            )
         else:
             self.client = cohere.Client(api_key=os.environ["CO_API_KEY"])
+            self._async_clients = LoopLocal(lambda: cohere.AsyncClient(api_key=os.environ["CO_API_KEY"]))
 
         # Set dimension if not provided
         if dimension is None:
@@ -97,14 +136,25 @@ class CohereEmbedding(Embedding):
         else:
             self.dimension = dimension
 
-    def get_embeddings(self, text: list[str], input_type: Optional[str]):
+    def _input_type(self, input_type: Optional[str]) -> Optional[str]:
         if input_type == "query":
-            input_type = "search_query"
+            return "search_query"
         elif input_type == "document":
-            input_type = "search_document"
+            return "search_document"
+        return input_type
+
+    def get_embeddings(self, text: list[str], input_type: Optional[str]):
         response = self.client.embed(
             texts=[text] if isinstance(text, str) else text,
-            input_type=input_type,
+            input_type=self._input_type(input_type),
+            model=self.model,
+        )
+        return response.embeddings[0] if isinstance(text, str) else response.embeddings
+
+    async def aget_embeddings(self, text: list[str], input_type: Optional[str] = None):
+        response = await self._async_clients.get().embed(
+            texts=[text] if isinstance(text, str) else text,
+            input_type=self._input_type(input_type),
             model=self.model,
         )
         return response.embeddings[0] if isinstance(text, str) else response.embeddings
@@ -120,6 +170,8 @@ class VoyageAIEmbedding(Embedding):
         super().__init__()
         self.model = model
         self.client = voyageai.Client()
+        # async clients are bound to the event loop they're created in
+        self._async_clients = LoopLocal(lambda: voyageai.AsyncClient())
 
         # Set dimension if not provided
         if dimension is None:
@@ -140,6 +192,14 @@ class VoyageAIEmbedding(Embedding):
         )
         return response.embeddings[0] if isinstance(text, str) else response.embeddings
 
+    async def aget_embeddings(self, text: list[str], input_type: Optional[str] = None):
+        response = await self._async_clients.get().embed(
+            texts=[text] if isinstance(text, str) else text,
+            model=self.model,
+            input_type=input_type,
+        )
+        return response.embeddings[0] if isinstance(text, str) else response.embeddings
+
     def to_dict(self):
         base_dict = super().to_dict()
         base_dict.update({"model": self.model})
@@ -183,4 +243,213 @@ class OllamaEmbedding(Embedding):
     def to_dict(self):
         base_dict = super().to_dict()
         base_dict.update({"model": self.model})
-        return base_dict
\ No newline at end of file
+        return base_dict
+
+def normalize_embedding_text(text: str) -> str:
+    """The form of `text` used in embedding cache keys: NFC unicode with whitespace collapsed."""
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFC", text)).strip()
+
+
+class CachedEmbedding(Embedding):
+    """
+    Caches the embeddings of another embedding model, so repeated texts (typically search
+    queries) don't pay for another embedding call.
+
+    Entries are keyed by the wrapped model's class, model name and dimension, the input type and
+    the normalized text (see `normalize_embedding_text`), and kept in an in-memory LRU. With
+    `cache_path`, they are also stored in a SQLite file that every process using the same path
+    shares, and that is checked before calling the wrapped model.
+
+    Args:
+        embedding_model: The Embedding to cache, or its `to_dict()` config.
+        max_entries: The most embeddings kept in memory.
+        ttl_seconds: How long an embedding is reused, in memory and on disk. None keeps them
+            until they are evicted.
+        cache_path: Optional path of the SQLite file to share embeddings through.
+        input_types: The input types that are cached. Defaults to queries only, so that
+            ingesting documents doesn't flush the cache.
+        dimension: Ignored; the wrapped model's dimension is used.
+    """
+
+    def __init__(
+        self,
+        embedding_model: Union[Embedding, dict],
+        max_entries: int = 10_000,
+        ttl_seconds: Optional[float] = 24 * 60 * 60,
+        cache_path: Optional[str] = None,
+        input_types: Sequence[Optional[str]] = ("query",),
+        dimension: Optional[int] = None,
+    ):
+        if isinstance(embedding_model, dict):
+            embedding_model = Embedding.from_dict(dict(embedding_model))
+        if max_entries < 1:
+            raise ValueError(f"max_entries must be at least 1, got {max_entries}.")
+        super().__init__(embedding_model.dimension)
+        self.embedding_model = embedding_model
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.cache_path = os.path.expanduser(cache_path) if cache_path else None
+        self.input_types = tuple(input_types)
+        self._lock = threading.Lock()
+        # key -> (vector, time it was embedded)
+        self._entries: OrderedDict[str, tuple[Vector, float]] = OrderedDict()
+        self._local = threading.local()
+        self.hits = 0
+        self.misses = 0
+        if self.cache_path:
+            os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+            with self._connection() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS embeddings "
+                    "(key TEXT PRIMARY KEY, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+                )
+
+    def to_dict(self):
+        base_dict = super().to_dict()
+        base_dict.update({
+            "embedding_model": self.embedding_model.to_dict(),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "cache_path": self.cache_path,
+            "input_types": list(self.input_types),
+        })
+        return base_dict
+
+    def cache_stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._entries)}
+
+    def _connection(self) -> sqlite3.Connection:
+        local = self._local
+        if getattr(local, "conn", None) is None or local.pid != os.getpid():
+            conn = sqlite3.connect(self.cache_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            local.conn = conn
+            local.pid = os.getpid()
+        return local.conn
+
+    def _key(self, text: str, input_type: Optional[str]) -> str:
+        key = [
+            self.embedding_model.__class__.__name__,
+            getattr(self.embedding_model, "model", None),
+            self.embedding_model.dimension,
+            input_type,
+            normalize_embedding_text(text),
+        ]
+        return hashlib.sha256(json.dumps(key).encode("utf-8")).hexdigest()
+
+    def _is_fresh(self, created_at: float, now: float) -> bool:
+        return self.ttl_seconds is None or now - created_at < self.ttl_seconds
+
+    def _get_from_memory(self, keys: list[str], now: float) -> dict[str, Vector]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                entry = self._entries.get(key)
+                if entry is None:
+                    continue
+                if not self._is_fresh(entry[1], now):
+                    del self._entries[key]
+                    continue
+                self._entries.move_to_end(key)
+                found[key] = entry[0]
+        return found
+
+    def _put_in_memory(self, entries: dict[str, tuple[Vector, float]]) -> None:
+        with self._lock:
+            for key, entry in entries.items():
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _get_from_disk(self, keys: list[str], now: float) -> dict[str, tuple[Vector, float]]:
+        # the disk tier only saves embedding calls, so a failure there is logged, not raised
+        found = {}
+        try:
+            conn = self._connection()
+            for i in range(0, len(keys), 500):
+                batch = keys[i:i + 500]
+                rows = conn.execute(
+                    f"SELECT key, vector, created_at FROM embeddings WHERE key IN ({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                for key, vector, created_at in rows:
+                    if self._is_fresh(created_at, now):
+                        found[key] = (np.frombuffer(vector, dtype=np.float64).tolist(), created_at)
+        except sqlite3.Error as e:
+            logging.warning(f"Could not read the embedding cache at {self.cache_path}: {e}")
+        return found
+
+    def _put_on_disk(self, entries: dict[str, tuple[Vector, float]]) -> None:
+        try:
+            conn = self._connection()
+            with conn:
+                conn.execute("BEGIN IMMEDIATE")
+                conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, created_at) VALUES (?, ?, ?)",
+                    [
+                        (key, np.asarray(vector, dtype=np.float64).tobytes(), created_at)
+                        for key, (vector, created_at) in entries.items()
+                    ],
+                )
+        except sqlite3.Error as e:
+            logging.warning(f"Could not write to the embedding cache at {self.cache_path}: {e}")
+
+    def _lookup(self, texts: list[str], input_type: Optional[str], now: float) -> tuple[list[str], dict[str, Vector], dict[str, str]]:
+        """
+        The cache keys of `texts`, the cached vectors, and the distinct texts that still have to
+        be embedded (by key, in the order they were asked for).
+        """
+        keys = [self._key(t, input_type) for t in texts]
+        vectors = self._get_from_memory(keys, now)
+        missing = [key for key in dict.fromkeys(keys) if key not in vectors]
+        if missing and self.cache_path:
+            from_disk = self._get_from_disk(missing, now)
+            self._put_in_memory(from_disk)
+            vectors.update({key: vector for key, (vector, _) in from_disk.items()})
+        to_embed = {}
+        for key, t in zip(keys, texts):
+            if key not in vectors and key not in to_embed:
+                to_embed[key] = t
+        with self._lock:
+            self.misses += len(to_embed)
+            self.hits += len(keys) - len(to_embed)
+        return keys, vectors, to_embed
+
+    def _store(self, vectors: dict[str, Vector], to_embed: dict[str, str], embedded: list[Vector], now: float) -> None:
+        new_entries = {key: (vector, now) for key, vector in zip(to_embed, embedded)}
+        self._put_in_memory(new_entries)
+        if self.cache_path:
+            self._put_on_disk(new_entries)
+        vectors.update({key: vector for key, (vector, _) in new_entries.items()})
+
+    def get_embeddings(self, text: list[str], input_type: Optional[str] = None) -> list[Vector]:
+        if input_type not in self.input_types:
+            return self.embedding_model.get_embeddings(text, input_type)
+        now = time.time()
+        keys, vectors, to_embed = self._lookup([text] if isinstance(text, str) else list(text), input_type, now)
+        if to_embed:
+            embedded = self.embedding_model.get_embeddings(list(to_embed.values()), input_type)
+            self._store(vectors, to_embed, embedded, now)
+        embeddings = [vectors[key] for key in keys]
+        return embeddings[0] if isinstance(text, str) else embeddings
+
+    async def aget_embeddings(self, text: list[str], input_type: Optional[str] = None) -> list[Vector]:
+        if input_type not in self.input_types:
+            return await self.embedding_model.aget_embeddings(text, input_type)
+        now = time.time()
+        texts = [text] if isinstance(text, str) else list(text)
+        if self.cache_path:
+            # the disk tier is read and written in the shared thread pool
+            keys, vectors, to_embed = await run_sync(self._lookup, texts, input_type, now)
+        else:
+            keys, vectors, to_embed = self._lookup(texts, input_type, now)
+        if to_embed:
+            embedded = await self.embedding_model.aget_embeddings(list(to_embed.values()), input_type)
+            if self.cache_path:
+                await run_sync(self._store, vectors, to_embed, embedded, now)
+            else:
+                self._store(vectors, to_embed, embedded, now)
+        embeddings = [vectors[key] for key in keys]
+        return embeddings[0] if isinstance(text, str) else embeddings
@@ -1,3 +1,4 @@
+import asyncio
 import numpy as np
 import os
 import time
@@ -11,8 +12,8 @@ from dsrag.dsparse.main import parse_and_chunk
 from dsrag.add_document import (
     auto_context, 
     get_embeddings, 
-    add_chunks_to_db, 
     add_vectors_to_db,
+    get_chunk_db_document,
 )
 from dsrag.auto_context import get_segment_header
 from dsrag.rse import (
@@ -29,6 +30,7 @@ from dsrag.reranker import Reranker, CohereReranker
 from dsrag.llm import LLM, OpenAIChatAPI
 from dsrag.dsparse.file_parsing.file_system import FileSystem, LocalFileSystem
 from dsrag.metadata import MetadataStorage, LocalMetadataStorage
+from dsrag.query_cache import QueryCache, get_query_cache_key
 from dsrag.chat.citations import convert_elements_to_page_content
 from dsrag.dsparse.file_parsing.vlm_clients import VLM
 from dsrag.config.profiles import (
@@ -41,12 +43,38 @@ from dsrag.config.schema import (
     redact_sensitive_config,
     validate_stable_kb_config_schema,
 )
+from dsrag.utils.async_utils import run_sync
 from dsrag.telemetry import (
     NullTelemetrySink,
     emit_telemetry_event,
 )
 
 
+# chunk fields that segment assembly reads, fetched with one `ChunkDB.get_chunks` call per segment
+SEGMENT_CHUNK_FIELDS = (
+    "chunk_text",
+    "document_title",
+    "document_summary",
+    "chunk_page_start",
+    "chunk_page_end",
+    "is_visual",
+)
+
+
+# search queries embedded per embedding call, the same batch size as document chunks
+QUERY_EMBEDDING_BATCH_SIZE = 50
+
+
+def _with_open_options(component_class, config: dict, **options: bool) -> dict:
+    """Add the enabled open-time options to a stored component config, if the component supports them."""
+    subclass = component_class.subclasses.get(config.get("subclass_name"))
+    supported = subclass.open_options if subclass is not None else ()
+    return {
+        **config,
+        **{name: True for name, enabled in options.items() if enabled and name in supported},
+    }
+
+
 class KnowledgeBase:
     def __init__(
         self,
@@ -68,6 +96,10 @@ class KnowledgeBase:
         vlm_client: Optional[VLM] = None,
         profile: str = DEFAULT_PROFILE,
         telemetry_sink=None,
+        lazy_load: bool = False,
+        prefetch: bool = False,
+        read_only: bool = False,
+        query_cache: Optional[QueryCache] = None,
     ):
         """Initialize a KnowledgeBase instance.
 
@@ -98,6 +130,19 @@ class KnowledgeBase:
                 Defaults to None.
             telemetry_sink (optional): Structured telemetry sink with `emit(event)` method.
                 Defaults to an in-process no-op sink.
+            lazy_load (bool, optional): When loading an existing KB, defer reading the stored
+                vectors and chunks until the first query, for databases that support it
+                (BasicVectorDB and BasicChunkDB). Defaults to False.
+            prefetch (bool, optional): When loading an existing KB, start loading the stored
+                vectors and chunks in background threads right away. Defaults to False.
+            read_only (bool, optional): When loading an existing KB, serve the data last published
+                with `publish()` and share it with other processes that open the KB read-only,
+                instead of giving each process its own copy (BasicVectorDB and BasicChunkDB).
+                The KB config isn't rewritten on open, and writes raise a ValueError.
+                Defaults to False.
+            query_cache (Optional[QueryCache], optional): Cache for the results of repeated
+                identical queries. Cached results are invalidated when documents are added or
+                deleted. Defaults to None (no caching).
 
         Raises:
             ValueError: If KB exists and exists_ok is False.
@@ -107,14 +152,20 @@ class KnowledgeBase:
         self.metadata_storage = metadata_storage if metadata_storage else LocalMetadataStorage(self.storage_directory)
         self.profile = profile
         self.telemetry_sink = telemetry_sink if telemetry_sink is not None else NullTelemetrySink()
+        self.query_cache = query_cache
 
         if save_metadata_to_disk:
             # load the KB if it exists; otherwise, initialize it and save it to disk
             if self.metadata_storage.kb_exists(self.kb_id) and exists_ok:
                 self._load(
-                    auto_context_model, reranker, file_system, chunk_db, vector_db, vlm_client
+                    auto_context_model, reranker, file_system, chunk_db, vector_db, vlm_client,
+                    lazy_load=lazy_load, read_only=read_only,
                 )
-                self._save()
+                if prefetch:
+                    self.vector_db.prefetch()
+                    self.chunk_db.prefetch()
+                if not read_only:
+                    self._save()
             elif self.metadata_storage.kb_exists(self.kb_id) and not exists_ok:
                 raise ValueError(
                     f"Knowledge Base with ID {kb_id} already exists. Use exists_ok=True to load it."
@@ -128,6 +179,8 @@ class KnowledgeBase:
                     "supp_id": supp_id,
                     "profile": profile,
                     "created_on": created_time,
+                    "generation": 0,
+                    "instance_id": uuid.uuid4().hex,
                 }
                 self._initialize_components(
                     embedding_model, reranker, auto_context_model, vector_db, chunk_db, file_system, vlm_client
@@ -140,6 +193,8 @@ class KnowledgeBase:
                 "language": language,
                 "supp_id": supp_id,
                 "profile": profile,
+                "generation": 0,
+                "instance_id": uuid.uuid4().hex,
             }
             self._initialize_components(
                 embedding_model, reranker, auto_context_model, vector_db, chunk_db, file_system, vlm_client
@@ -238,7 +293,7 @@ class KnowledgeBase:
         validate_stable_kb_config_schema(schema)
         return schema
 
-    def _load(self, auto_context_model=None, reranker=None, file_system=None, chunk_db=None, vector_db=None, vlm_client: Optional[VLM] = None):
+    def _load(self, auto_context_model=None, reranker=None, file_system=None, chunk_db=None, vector_db=None, vlm_client: Optional[VLM] = None, lazy_load: bool = False, read_only: bool = False):
         """Load a knowledge base configuration from disk.
 
         Internal method to deserialize components and metadata.
@@ -250,6 +305,8 @@ class KnowledgeBase:
             chunk_db (Optional[ChunkDB], optional): Override stored chunk database.
             vector_db (Optional[VectorDB], optional): Override stored vector database.
             vlm_client (Optional[VLM], optional): Override stored VLM client.
+            lazy_load (bool, optional): Open the stored vector and chunk databases lazily.
+            read_only (bool, optional): Open the stored vector and chunk databases read-only.
         Note:
             Only auto_context_model and reranker can safely override stored components.
             Other component overrides may break functionality if not compatible.
@@ -260,6 +317,8 @@ class KnowledgeBase:
         }
         self.profile = self.kb_metadata.get("profile", DEFAULT_PROFILE)
         self.kb_metadata["profile"] = self.profile
+        # KBs saved before instance IDs existed get one now; it's persisted on the next save
+        self.kb_metadata.setdefault("instance_id", uuid.uuid4().hex)
         components = data.get("components", {})
         # Deserialize components
         self.embedding_model = Embedding.from_dict(
@@ -282,13 +341,21 @@ class KnowledgeBase:
         self.vector_db = (
             vector_db
             if vector_db
-            else VectorDB.from_dict(components.get("vector_db", {}))
+            else VectorDB.from_dict(
+                _with_open_options(
+                    VectorDB, components.get("vector_db", {}), lazy_load=lazy_load, read_only=read_only
+                )
+            )
         )
         if chunk_db is not None:
             logging.warning(f"Overriding stored chunk_db for KB '{self.kb_id}' during load.", extra=base_extra)
             self.chunk_db = chunk_db
         else:
-            self.chunk_db = ChunkDB.from_dict(components.get("chunk_db", {}))
+            self.chunk_db = ChunkDB.from_dict(
+                _with_open_options(
+                    ChunkDB, components.get("chunk_db", {}), lazy_load=lazy_load, read_only=read_only
+                )
+            )
 
         file_system_dict = components.get("file_system", None)
 
@@ -316,6 +383,33 @@ class KnowledgeBase:
 
         self.vector_dimension = self.embedding_model.dimension
 
+    def publish(self):
+        """Make all changes so far visible to processes that opened this KB with `read_only=True`."""
+        self.vector_db.publish()
+        self.chunk_db.publish()
+
+    def refresh(self) -> bool:
+        """Switch a read-only KB to the latest published data.
+
+        Returns:
+            bool: True if a newer generation was picked up.
+        """
+        vector_db_refreshed = self.vector_db.refresh()
+        chunk_db_refreshed = self.chunk_db.refresh()
+        refreshed = vector_db_refreshed or chunk_db_refreshed
+        if refreshed:
+            # the published data includes writes made by other processes
+            self._bump_generation()
+        return refreshed
+
+    def _bump_generation(self) -> None:
+        """Mark the KB's contents as changed, invalidating cached query results.
+
+        Internal method called after every write. The generation is persisted with the KB metadata
+        on the next `_save()`.
+        """
+        self.kb_metadata["generation"] = self.kb_metadata.get("generation", 0) + 1
+
     def delete(self):
         """Delete the knowledge base and all associated data.
 
@@ -470,6 +564,43 @@ class KnowledgeBase:
             5. Embedding
             6. Storage in vector and chunk databases
         """
+        prepared = self._prepare_document(
+            doc_id=doc_id,
+            text=text,
+            file_path=file_path,
+            document_title=document_title,
+            auto_context_config=auto_context_config,
+            file_parsing_config=file_parsing_config,
+            semantic_sectioning_config=semantic_sectioning_config,
+            chunking_config=chunking_config,
+            chunk_size=chunk_size,
+            min_length_for_chunking=min_length_for_chunking,
+            supp_id=supp_id,
+            metadata=metadata,
+        )
+        if prepared is not None:
+            self._store_documents([prepared])
+
+    def _prepare_document(
+        self,
+        doc_id: str,
+        text: str = "",
+        file_path: str = "",
+        document_title: str = "",
+        auto_context_config: Optional[dict] = None,
+        file_parsing_config: Optional[dict] = None,
+        semantic_sectioning_config: Optional[dict] = None,
+        chunking_config: Optional[dict] = None,
+        chunk_size: int = None,
+        min_length_for_chunking: int = None,
+        supp_id: str = "",
+        metadata: Optional[dict] = None,
+    ) -> Optional[dict]:
+        """Run every ingestion step of `add_document` up to (but not including) storage.
+
+        Returns the prepared document for `_store_documents`, or None if the document already
+        exists in the knowledge base.
+        """
         # Get a logger specific to ingestion operations
         ingestion_logger = logging.getLogger("dsrag.ingestion")
         auto_context_config = auto_context_config or {}
@@ -526,20 +657,9 @@ class KnowledgeBase:
                 raise ValueError("Either text or file_path must be provided")
 
             # verify that the document does not already exist in the KB - the doc_id should be unique
-            if doc_id in self.chunk_db.get_all_doc_ids():
-                ingestion_logger.warning(
-                    "Document already exists in knowledge base, skipping", 
-                    extra=base_extra
-                )
-                emit_telemetry_event(
-                    sink=self.telemetry_sink,
-                    event_type="add_document",
-                    kb_id=self.kb_id,
-                    profile=self.profile,
-                    status="skipped",
-                    payload={"doc_id": doc_id, "reason": "doc_already_exists"},
-                )
-                return
+            if self.chunk_db.has_document(doc_id):
+                self._report_skipped_document(base_extra)
+                return None
             
             # verify the doc_id is valid
             if "/" in doc_id:
@@ -619,48 +739,82 @@ class KnowledgeBase:
                 "model": self.embedding_model.__class__.__name__
             })
             
+            return {
+                "doc_id": doc_id,
+                "file_path": file_path,
+                "supp_id": supp_id,
+                "metadata": metadata,
+                "num_sections": len(sections),
+                "chunks": chunks,
+                "chunks_to_embed": chunks_to_embed,
+                "chunk_embeddings": chunk_embeddings,
+                "base_extra": base_extra,
+                "start_time": overall_start_time,
+            }
+
+        except Exception as e:
+            self._report_failed_document(base_extra, overall_start_time, bool(file_path), e)
+            # Re-raise the exception
+            raise
+
+    def _store_documents(self, prepared_documents: List[dict]) -> None:
+        """Store documents returned by `_prepare_document`.
+
+        The chunks of all the documents are written with a single `ChunkDB.add_documents` call,
+        so backends that support it commit them in one transaction.
+        """
+        ingestion_logger = logging.getLogger("dsrag.ingestion")
+        try:
             # --- DB Storage Step ---
             step_start_time = time.perf_counter()
-            add_chunks_to_db(
-                chunk_db=self.chunk_db,
-                chunks=chunks,
-                chunks_to_embed=chunks_to_embed,
-                chunk_embeddings=chunk_embeddings,
-                metadata=metadata,
-                doc_id=doc_id,
-                supp_id=supp_id
-            )
-            add_vectors_to_db(
-                vector_db=self.vector_db,
-                chunks=chunks,
-                chunk_embeddings=chunk_embeddings,
-                metadata=metadata,
-                doc_id=doc_id,
-            )
+            self.chunk_db.add_documents([
+                get_chunk_db_document(
+                    chunks=prepared["chunks"],
+                    chunks_to_embed=prepared["chunks_to_embed"],
+                    chunk_embeddings=prepared["chunk_embeddings"],
+                    metadata=prepared["metadata"],
+                    doc_id=prepared["doc_id"],
+                    supp_id=prepared["supp_id"],
+                )
+                for prepared in prepared_documents
+            ])
+            for prepared in prepared_documents:
+                add_vectors_to_db(
+                    vector_db=self.vector_db,
+                    chunks=prepared["chunks"],
+                    chunk_embeddings=prepared["chunk_embeddings"],
+                    metadata=prepared["metadata"],
+                    doc_id=prepared["doc_id"],
+                    supp_id=prepared["supp_id"],
+                )
             step_duration = time.perf_counter() - step_start_time
-            ingestion_logger.debug("Database storage complete", extra={
-                **base_extra,
-                "step": "db_storage", 
-                "duration_s": round(step_duration, 4),
-                "vector_db": self.vector_db.__class__.__name__,
-                "chunk_db": self.chunk_db.__class__.__name__
-            })
+            for prepared in prepared_documents:
+                ingestion_logger.debug("Database storage complete", extra={
+                    **prepared["base_extra"],
+                    "step": "db_storage", 
+                    "duration_s": round(step_duration, 4),
+                    "num_documents": len(prepared_documents),
+                    "vector_db": self.vector_db.__class__.__name__,
+                    "chunk_db": self.chunk_db.__class__.__name__
+                })
 
             # Convert elements to page content if elements are present (works for both VLM paths)
-            if file_path:
+            for prepared in prepared_documents:
+                if not prepared["file_path"]:
+                    continue
                 try:
                     step_start_time = time.perf_counter()
-                    elements = self.file_system.load_data(kb_id=self.kb_id, doc_id=doc_id, data_name="elements")
+                    elements = self.file_system.load_data(kb_id=self.kb_id, doc_id=prepared["doc_id"], data_name="elements")
                     if elements:
                         convert_elements_to_page_content(
                             elements=elements,
                             kb_id=self.kb_id,
-                            doc_id=doc_id,
+                            doc_id=prepared["doc_id"],
                             file_system=self.file_system
                         )
                     step_duration = time.perf_counter() - step_start_time
                     ingestion_logger.debug("Page content conversion complete", extra={
-                        **base_extra,
+                        **prepared["base_extra"],
                         "step": "page_content", 
                         "duration_s": round(step_duration, 4),
                         "num_elements": len(elements) if elements else 0
@@ -668,15 +822,27 @@ class KnowledgeBase:
                 except Exception as e:
                     ingestion_logger.warning(
                         "Failed to load or process elements for page content", 
-                        extra={**base_extra, "error": str(e)}
+                        extra={**prepared["base_extra"], "error": str(e)}
                     )
 
-            self._save()  # save to disk after adding a document
-            
+            self._bump_generation()
+            self._save()  # save to disk after adding the documents
+
+        except Exception as e:
+            # the documents may have been partially stored
+            self._bump_generation()
+            for prepared in prepared_documents:
+                self._report_failed_document(
+                    prepared["base_extra"], prepared["start_time"], bool(prepared["file_path"]), e
+                )
+            # Re-raise the exception
+            raise
+
+        for prepared in prepared_documents:
             # Log successful completion with total duration
-            overall_duration = time.perf_counter() - overall_start_time
+            overall_duration = time.perf_counter() - prepared["start_time"]
             ingestion_logger.info("Document ingestion successful", extra={
-                **base_extra,
+                **prepared["base_extra"],
                 "total_duration_s": round(overall_duration, 4)
             })
             emit_telemetry_event(
@@ -687,37 +853,51 @@ class KnowledgeBase:
                 status="success",
                 duration_ms=overall_duration * 1000,
                 payload={
-                    "doc_id": doc_id,
-                    "num_sections": len(sections),
-                    "num_chunks": len(chunks),
-                    "has_file_path": bool(file_path),
-                },
-            )
-            
-        except Exception as e:
-            # Log error with exception info
-            overall_duration = time.perf_counter() - overall_start_time
-            ingestion_logger.error(
-                "Document ingestion failed", 
-                extra={
-                    **base_extra,
-                    "total_duration_s": round(overall_duration, 4),
-                    "error": str(e)
+                    "doc_id": prepared["doc_id"],
+                    "num_sections": prepared["num_sections"],
+                    "num_chunks": len(prepared["chunks"]),
+                    "has_file_path": bool(prepared["file_path"]),
                 },
-                exc_info=True
-            )
-            emit_telemetry_event(
-                sink=self.telemetry_sink,
-                event_type="add_document",
-                kb_id=self.kb_id,
-                profile=self.profile,
-                status="error",
-                duration_ms=overall_duration * 1000,
-                error=str(e),
-                payload={"doc_id": doc_id, "has_file_path": bool(file_path)},
             )
-            # Re-raise the exception
-            raise
+
+    def _report_skipped_document(self, base_extra: dict) -> None:
+        logging.getLogger("dsrag.ingestion").warning(
+            "Document already exists in knowledge base, skipping", 
+            extra=base_extra
+        )
+        emit_telemetry_event(
+            sink=self.telemetry_sink,
+            event_type="add_document",
+            kb_id=self.kb_id,
+            profile=self.profile,
+            status="skipped",
+            payload={"doc_id": base_extra["doc_id"], "reason": "doc_already_exists"},
+        )
+
+    def _report_failed_document(
+        self, base_extra: dict, start_time: float, has_file_path: bool, error: Exception
+    ) -> None:
+        # Log error with exception info
+        overall_duration = time.perf_counter() - start_time
+        logging.getLogger("dsrag.ingestion").error(
+            "Document ingestion failed", 
+            extra={
+                **base_extra,
+                "total_duration_s": round(overall_duration, 4),
+                "error": str(error)
+            },
+            exc_info=True
+        )
+        emit_telemetry_event(
+            sink=self.telemetry_sink,
+            event_type="add_document",
+            kb_id=self.kb_id,
+            profile=self.profile,
+            status="error",
+            duration_ms=overall_duration * 1000,
+            error=str(error),
+            payload={"doc_id": base_extra["doc_id"], "has_file_path": has_file_path},
+        )
 
     def add_documents(
         self,
@@ -725,6 +905,7 @@ class KnowledgeBase:
         max_workers: int = 1,
         show_progress: bool = True,
         rate_limit_pause: float = 1.0,
+        write_batch_size: int = 32,
     ) -> List[str]:
         """Add multiple documents to the knowledge base in parallel.
         
@@ -745,17 +926,23 @@ class KnowledgeBase:
             max_workers (int, optional): Maximum number of worker threads. Defaults to 1.
             show_progress (bool, optional): Whether to show a progress bar. Defaults to True.
             rate_limit_pause (float, optional): Pause between uploads in seconds. Defaults to 1.0.
+            write_batch_size (int, optional): Number of processed documents that are written to
+                the databases together. The chunks of a batch are stored with a single
+                `ChunkDB.add_documents` call (one transaction for SQLiteDB). Defaults to 32.
 
         Returns:
             List[str]: List of successfully uploaded document IDs.
 
         Note:
-            Be sure to use thread-safe VectorDB and ChunkDB implementations when max_workers > 1.
-            The default implementations (BasicVectorDB and BasicChunkDB) are not thread-safe.
+            Parsing, AutoContext and embedding run in the worker threads, while all database
+            writes happen on the calling thread. A failed write fails every document in its batch.
         """
+        if write_batch_size < 1:
+            raise ValueError(f"write_batch_size must be at least 1, got {write_batch_size}.")
+
         successful_uploads = []
         
-        def process_document(doc: Dict) -> Optional[str]:
+        def process_document(doc: Dict) -> Optional[tuple[str, Optional[dict]]]:
             try:
                 # Extract required parameters
                 doc_id = doc['doc_id']
@@ -779,8 +966,8 @@ class KnowledgeBase:
                 
                 print(f"Extracted parameters for {doc_id}")  # Debug log
                 
-                # Call add_document with extracted parameters
-                self.add_document(
+                # Run every step but storage, which happens in batches on the calling thread
+                prepared = self._prepare_document(
                     doc_id=doc_id,
                     text=text,
                     file_path=file_path,
@@ -793,11 +980,9 @@ class KnowledgeBase:
                     metadata=metadata
                 )
                 
-                print(f"Successfully processed document: {doc_id}")  # Debug log
-                
                 # Pause to avoid rate limits
                 time.sleep(rate_limit_pause)
-                return doc_id
+                return doc_id, prepared
                 
             except Exception as e:
                 import traceback
@@ -809,6 +994,23 @@ class KnowledgeBase:
                 print(error_msg)
                 return None
 
+        pending = []
+        # documents prepared by this call; a repeated doc_id may have been checked before the
+        # first copy was stored
+        added_doc_ids = set()
+
+        def store_pending() -> None:
+            try:
+                self._store_documents(pending)
+            except Exception as e:
+                print(f"Error storing documents {[prepared['doc_id'] for prepared in pending]}: {e}")
+                added_doc_ids.difference_update(prepared["doc_id"] for prepared in pending)
+            else:
+                for prepared in pending:
+                    print(f"Successfully processed document: {prepared['doc_id']}")  # Debug log
+                    successful_uploads.append(prepared["doc_id"])
+            pending.clear()
+
         # Process documents in parallel
         with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
             # Create futures
@@ -828,9 +1030,24 @@ class KnowledgeBase:
                 futures = concurrent.futures.as_completed(future_to_doc)
                 
             for future in futures:
-                doc_id = future.result()
-                if doc_id:
+                result = future.result()
+                if result is None:
+                    continue
+                doc_id, prepared = result
+                if prepared is None:
+                    # the document was already in the knowledge base
+                    successful_uploads.append(doc_id)
+                elif doc_id in added_doc_ids:
+                    self._report_skipped_document(prepared["base_extra"])
                     successful_uploads.append(doc_id)
+                else:
+                    added_doc_ids.add(doc_id)
+                    pending.append(prepared)
+                    if len(pending) >= write_batch_size:
+                        store_pending()
+
+        if pending:
+            store_pending()
         
         return successful_uploads
 
@@ -840,9 +1057,13 @@ class KnowledgeBase:
         Args:
             doc_id (str): ID of the document to delete.
         """
-        self.chunk_db.remove_document(doc_id)
-        self.vector_db.remove_document(doc_id)
-        self.file_system.delete_directory(self.kb_id, doc_id)
+        try:
+            self.chunk_db.remove_document(doc_id)
+            self.vector_db.remove_document(doc_id)
+            self.file_system.delete_directory(self.kb_id, doc_id)
+        finally:
+            self._bump_generation()
+        self._save()
 
     def _get_chunk_text(self, doc_id: str, chunk_index: int) -> Optional[str]:
         """Get the text content of a specific chunk.
@@ -884,6 +1105,18 @@ class KnowledgeBase:
         """
         return self.embedding_model.get_embeddings(text, input_type)
 
+    def _get_query_embeddings(self, queries: list[str]) -> list[Vector]:
+        """Embed search queries with as few embedding calls as possible.
+
+        Internal method for query execution.
+        """
+        query_vectors = []
+        for i in range(0, len(queries), QUERY_EMBEDDING_BATCH_SIZE):
+            query_vectors += self._get_embeddings(
+                queries[i:i + QUERY_EMBEDDING_BATCH_SIZE], input_type="query"
+            )
+        return query_vectors
+
     def _cosine_similarity(self, v1, v2):
         """Calculate cosine similarity between vectors.
 
@@ -898,10 +1131,16 @@ class KnowledgeBase:
         """
         query_vector = self._get_embeddings([query], input_type="query")[0]
         search_results = self.vector_db.search(query_vector, top_k, metadata_filter)
+        return self._rerank_search_results(query, search_results)
+
+    def _rerank_search_results(self, query: str, search_results: list) -> list:
+        """Rerank the vector search results for a single query.
+
+        Internal method shared by single and batched search.
+        """
         if len(search_results) == 0:
             return []
-        search_results = self.reranker.rerank_search_results(query, search_results)
-        return search_results
+        return self.reranker.rerank_search_results(query, search_results)
 
     def _get_all_ranked_results(
         self,
@@ -911,40 +1150,108 @@ class KnowledgeBase:
     ):
         """Execute multiple search queries.
 
-        Internal method for parallel query execution.
+        Internal method for parallel query execution. All the queries are embedded with one
+        batched embedding call and searched with a single batched vector DB call, and then
+        reranked in parallel.
         """
+        query_vectors = self._get_query_embeddings(search_queries)
+        all_search_results = self.vector_db.search_batch(query_vectors, top_k_per_query, metadata_filter)
+        if len(search_queries) == 1:
+            return [self._rerank_search_results(search_queries[0], all_search_results[0])]
         with concurrent.futures.ThreadPoolExecutor() as executor:
-            futures = [executor.submit(self._search, query, top_k_per_query, metadata_filter) for query in search_queries]
-            all_ranked_results = []
-            for future in futures:
-                ranked_results = future.result()
-                all_ranked_results.append(ranked_results)
+            all_ranked_results = list(executor.map(
+                self._rerank_search_results, search_queries, all_search_results
+            ))
         return all_ranked_results
-    
-    def _get_segment_page_numbers(self, doc_id: str, chunk_start: int, chunk_end: int) -> tuple:
+
+    async def _aget_query_embeddings(self, queries: list[str]) -> list[Vector]:
+        """Async version of `_get_query_embeddings`.
+
+        Internal method for async query execution.
+        """
+        query_vectors = []
+        for i in range(0, len(queries), QUERY_EMBEDDING_BATCH_SIZE):
+            query_vectors += await self.embedding_model.aget_embeddings(
+                queries[i:i + QUERY_EMBEDDING_BATCH_SIZE], input_type="query"
+            )
+        return query_vectors
+
+    async def _arerank_search_results(self, query: str, search_results: list) -> list:
+        """Async version of `_rerank_search_results`.
+
+        Internal method for async query execution.
+        """
+        if len(search_results) == 0:
+            return []
+        return await self.reranker.arerank_search_results(query, search_results)
+
+    async def _aget_all_ranked_results(
+        self,
+        search_queries: list[str],
+        metadata_filter: Optional[MetadataFilter] = None,
+        top_k_per_query: int = 200,
+    ):
+        """Async version of `_get_all_ranked_results`, reranking the queries concurrently.
+
+        Internal method for async query execution.
+        """
+        query_vectors = await self._aget_query_embeddings(search_queries)
+        all_search_results = await self.vector_db.asearch_batch(
+            query_vectors, top_k=top_k_per_query, metadata_filter=metadata_filter
+        )
+        return list(await asyncio.gather(*[
+            self._arerank_search_results(query, search_results)
+            for query, search_results in zip(search_queries, all_search_results)
+        ]))
+
+    def _cache_telemetry(self) -> dict:
+        """Cumulative hit/miss counters of the KB's caching components, for query telemetry.
+
+        Internal method for telemetry.
+        """
+        telemetry = {}
+        chunk_cache_stats = self.chunk_db.cache_stats()
+        if chunk_cache_stats is not None:
+            telemetry["chunk_cache"] = chunk_cache_stats
+        embedding_cache_stats = self.embedding_model.cache_stats()
+        if embedding_cache_stats is not None:
+            telemetry["embedding_cache"] = embedding_cache_stats
+        if self.query_cache is not None:
+            telemetry["query_cache"] = self.query_cache.stats()
+        return telemetry
+
+    def _get_segment_chunks(self, doc_id: str, chunk_start: int, chunk_end: int) -> dict:
+        """Fetch everything segment assembly needs for a segment's chunks in one chunk DB call.
+
+        Internal method for content retrieval.
+        """
+        return self.chunk_db.get_chunks(doc_id, chunk_start, chunk_end, fields=SEGMENT_CHUNK_FIELDS)
+
+    def _get_segment_page_numbers(self, doc_id: str, chunk_start: int, chunk_end: int, chunks: Optional[dict] = None) -> tuple:
         """Get page numbers for a segment.
 
-        Internal method for page number lookup.
+        Internal method for page number lookup. `chunks` are the segment's chunks from
+        `_get_segment_chunks`, if they have already been fetched.
         """
-        start_page_number, _ = self.chunk_db.get_chunk_page_numbers(doc_id, chunk_start)
-        _, end_page_number = self.chunk_db.get_chunk_page_numbers(doc_id, chunk_end - 1)
+        if chunks is None:
+            chunks = self._get_segment_chunks(doc_id, chunk_start, chunk_end)
+        start_page_number = chunks.get(chunk_start, {}).get("chunk_page_start")
+        end_page_number = chunks.get(chunk_end - 1, {}).get("chunk_page_end")
         return start_page_number, end_page_number
     
-    def _get_segment_content_from_database(self, doc_id: str, chunk_start: int, chunk_end: int, return_mode: str):
+    def _get_segment_content_from_database(self, doc_id: str, chunk_start: int, chunk_end: int, return_mode: str, chunks: Optional[dict] = None):
         """Retrieve segment content from database.
 
-        Internal method for content retrieval.
+        Internal method for content retrieval. `chunks` are the segment's chunks from
+        `_get_segment_chunks`, if they have already been fetched.
         """
         assert return_mode in ["text", "page_images", "dynamic"]
+        if chunks is None:
+            chunks = self._get_segment_chunks(doc_id, chunk_start, chunk_end)
 
         if return_mode == "dynamic":
-            # loop through the chunks in the segment to see if any of them are visual
-            segment_is_visual = False
-            for chunk_index in range(chunk_start, chunk_end):
-                is_visual = self._get_is_visual(doc_id, chunk_index)
-                if is_visual:
-                    segment_is_visual = True
-                    break
+            # check whether any of the chunks in the segment are visual
+            segment_is_visual = any(chunk.get("is_visual") for chunk in chunks.values())
 
             # set the return mode based on whether the segment contains visual content or not
             if segment_is_visual:
@@ -953,18 +1260,23 @@ class KnowledgeBase:
                 return_mode = "text"
 
         if return_mode == "text":
-            segment_text = f"{self._get_segment_header(doc_id=doc_id, chunk_index=chunk_start)}\n\n"  # initialize the segment with the segment header
+            first_chunk = chunks.get(chunk_start, {})
+            segment_header = get_segment_header(
+                document_title=first_chunk.get("document_title") or "",
+                document_summary=first_chunk.get("document_summary") or "",
+            )
+            segment_text = f"{segment_header}\n\n"  # initialize the segment with the segment header
             for chunk_index in range(chunk_start, chunk_end):
-                chunk_text = self._get_chunk_text(doc_id, chunk_index) or ""
+                chunk_text = chunks.get(chunk_index, {}).get("chunk_text") or ""
                 segment_text += chunk_text
             return segment_text.strip()
         else:
             # get the page numbers that the segment starts and ends on
-            start_page_number, end_page_number = self._get_segment_page_numbers(doc_id, chunk_start, chunk_end)
+            start_page_number, end_page_number = self._get_segment_page_numbers(doc_id, chunk_start, chunk_end, chunks)
             page_image_paths = self.file_system.get_files(kb_id=self.kb_id, doc_id=doc_id, page_start=start_page_number, page_end=end_page_number)
             # If there are no page images, fallback to using text mode
             if page_image_paths == []:
-                page_image_paths = self._get_segment_content_from_database(doc_id, chunk_start, chunk_end, return_mode="text")
+                page_image_paths = self._get_segment_content_from_database(doc_id, chunk_start, chunk_end, return_mode="text", chunks=chunks)
             return page_image_paths
 
     def query(
@@ -1049,75 +1361,20 @@ class KnowledgeBase:
                 }
                 ```
         """
-        # Get a logger specific to query operations
-        query_logger = logging.getLogger("dsrag.query")
-        
-        # Generate a unique query ID
-        query_id = str(uuid.uuid4())
-        
-        # Create a dictionary with base log context fields
-        base_extra = {"kb_id": self.kb_id, "query_id": query_id}
-        
-        # Log start of query operation at INFO level
-        query_logger.info("Starting query", extra={
-            **base_extra, 
-            "num_search_queries": len(search_queries)
-        })
-        
-        # Start timing the overall query process
-        overall_start_time = time.perf_counter()
+        base_extra, overall_start_time = self._start_query(search_queries)
 
         try:
-            # Log query parameters at DEBUG level
-            query_logger.debug("Query parameters", extra={
-                **base_extra,
-                "search_queries": search_queries,
-                "rse_params": rse_params if isinstance(rse_params, dict) else {"preset": rse_params},
-                "metadata_filter": metadata_filter,
-                "return_mode": return_mode,
-                "reranker_model": self.reranker.__class__.__name__
-            })
-            
-            # check if the rse_params is a preset name and convert it to a dictionary if it is
-            profile_query_defaults = get_profile_preset(self.profile).get("query_defaults", {})
-            if rse_params is None:
-                rse_params = profile_query_defaults.get("rse_params", "balanced")
-            if vector_search_top_k is None:
-                vector_search_top_k = profile_query_defaults.get("vector_search_top_k", 200)
-
-            if isinstance(rse_params, str) and rse_params in RSE_PARAMS_PRESETS:
-                rse_params = RSE_PARAMS_PRESETS[rse_params]
-            elif isinstance(rse_params, str):
-                raise ValueError(f"Invalid rse_params preset name: {rse_params}")
-
-            # set the RSE parameters - use the 'balanced' preset as the default for any missing parameters
-            default_rse_params = RSE_PARAMS_PRESETS["balanced"]
-            max_length = rse_params.get("max_length", default_rse_params["max_length"])
-            overall_max_length = rse_params.get(
-                "overall_max_length", default_rse_params["overall_max_length"]
-            )
-            minimum_value = rse_params.get(
-                "minimum_value", default_rse_params["minimum_value"]
+            rse_params, vector_search_top_k = self._resolve_query_params(
+                base_extra, search_queries, rse_params, metadata_filter, return_mode, vector_search_top_k
             )
-            irrelevant_chunk_penalty = rse_params.get(
-                "irrelevant_chunk_penalty", default_rse_params["irrelevant_chunk_penalty"]
+            rse_settings = self._get_rse_settings(rse_params, len(search_queries))
+            query_cache_entry, cached_results = self._lookup_query_cache(
+                search_queries, rse_settings, metadata_filter, return_mode, vector_search_top_k
             )
-            overall_max_length_extension = rse_params.get(
-                "overall_max_length_extension",
-                default_rse_params["overall_max_length_extension"],
-            )
-            decay_rate = rse_params.get("decay_rate", default_rse_params["decay_rate"])
-            top_k_for_document_selection = rse_params.get(
-                "top_k_for_document_selection",
-                default_rse_params["top_k_for_document_selection"],
-            )
-            chunk_length_adjustment = rse_params.get(
-                "chunk_length_adjustment", default_rse_params["chunk_length_adjustment"]
-            )
-
-            overall_max_length += (
-                len(search_queries) - 1
-            ) * overall_max_length_extension  # increase the overall max length for each additional query
+            if cached_results is not None:
+                return self._finish_cached_query(
+                    base_extra, overall_start_time, search_queries, return_mode, vector_search_top_k, cached_results
+                )
 
             # --- Search/Rerank Step ---
             step_start_time = time.perf_counter()
@@ -1126,192 +1383,523 @@ class KnowledgeBase:
                 metadata_filter=metadata_filter,
                 top_k_per_query=vector_search_top_k,
             )
-            step_duration = time.perf_counter() - step_start_time
-            
-            # Get the number of initial results per query
-            initial_results_per_query = [len(results) for results in all_ranked_results]
-            
-            # Log information about search/rerank step
-            query_logger.debug("Search/Rerank complete", extra={
-                **base_extra, 
-                "step": "search_rerank", 
-                "duration_s": round(step_duration, 4),
-                "num_initial_results_per_query": initial_results_per_query,
-                "total_initial_results": sum(initial_results_per_query),
-                "reranker": self.reranker.__class__.__name__
-            })
-            
-            if latency_profiling:
-                print(
-                    f"get_all_ranked_results took {step_duration} seconds to run for {len(search_queries)} queries"
-                )
+            self._log_search_step(base_extra, search_queries, all_ranked_results, step_start_time, latency_profiling)
 
             # --- RSE Step ---
-            step_start_time = time.perf_counter()
-            document_splits, document_start_points, unique_document_ids = get_meta_document(
-                all_ranked_results=all_ranked_results,
-                top_k_for_document_selection=top_k_for_document_selection,
-            )
-
-            # verify that we have a valid meta-document - otherwise return an empty list of segments
-            if len(document_splits) == 0:
-                query_logger.info("Query returned no results (empty meta-document)", extra=base_extra)
-                emit_telemetry_event(
-                    sink=self.telemetry_sink,
-                    event_type="query",
-                    kb_id=self.kb_id,
-                    profile=self.profile,
-                    status="success",
-                    duration_ms=(time.perf_counter() - overall_start_time) * 1000,
-                    payload={
-                        "num_search_queries": len(search_queries),
-                        "num_results": 0,
-                        "return_mode": return_mode,
-                        "vector_search_top_k": vector_search_top_k,
-                    },
+            relevant_segment_info = self._select_segments(base_extra, all_ranked_results, rse_settings)
+            if relevant_segment_info is None:
+                self._store_query_results(query_cache_entry, [])
+                return self._finish_empty_query(
+                    base_extra, overall_start_time, search_queries, return_mode, vector_search_top_k
                 )
-                return []
-
-            # get the length of the meta-document so we don't have to pass in the whole list of splits
-            meta_document_length = document_splits[-1]
-
-            # get the relevance values for each chunk in the meta-document and use those to find the best segments
-            all_relevance_values = get_relevance_values(
-                all_ranked_results=all_ranked_results,
-                meta_document_length=meta_document_length,
-                document_start_points=document_start_points,
-                unique_document_ids=unique_document_ids,
-                irrelevant_chunk_penalty=irrelevant_chunk_penalty,
-                decay_rate=decay_rate,
-                chunk_length_adjustment=chunk_length_adjustment,
-            )
-            best_segments, scores = get_best_segments(
-                all_relevance_values=all_relevance_values,
-                document_splits=document_splits,
-                max_length=max_length,
-                overall_max_length=overall_max_length,
-                minimum_value=minimum_value,
-            )
-            step_duration = time.perf_counter() - step_start_time
-            
-            # Log information about RSE step
-            query_logger.debug("RSE complete", extra={
-                **base_extra,
-                "step": "rse", 
-                "duration_s": round(step_duration, 4),
-                "num_final_segments": len(best_segments),
-                "segment_scores": [round(s, 4) for s in scores]
-            })
 
             # --- Content Retrieval Step ---
             step_start_time = time.perf_counter()
-            
-            # convert the best segments into a list of dictionaries that contain the document id and the start and end of the chunk
-            relevant_segment_info = []
-            for segment_index, (start, end) in enumerate(best_segments):
-                # find the document that this segment starts in
-                for i, split in enumerate(document_splits):
-                    if start < split:  # splits represent the end of each document
-                        doc_start = document_splits[i - 1] if i > 0 else 0
-                        relevant_segment_info.append(
-                            {
-                                "doc_id": unique_document_ids[i],
-                                "chunk_start": start - doc_start,
-                                "chunk_end": end - doc_start,
-                            }
-                        )  # NOTE: end index is non-inclusive
-                        break
-
-                score = scores[segment_index]
-                relevant_segment_info[-1]["score"] = score
-
-            # retrieve the content for each of the segments
             for segment_info in relevant_segment_info:
-                segment_info["content"] = self._get_segment_content_from_database(
+                # one chunk DB call per segment for its text, page numbers and visual flags
+                segment_chunks = self._get_segment_chunks(
                     segment_info["doc_id"],
                     segment_info["chunk_start"],
                     segment_info["chunk_end"],
-                    return_mode=return_mode,
                 )
-                start_page_number, end_page_number = self._get_segment_page_numbers(
-                    segment_info["doc_id"],
-                    segment_info["chunk_start"],
-                    segment_info["chunk_end"]
+                self._fill_segment(segment_info, segment_chunks, return_mode)
+
+            self._store_query_results(query_cache_entry, relevant_segment_info)
+            return self._finish_query(
+                base_extra, overall_start_time, step_start_time, search_queries, return_mode,
+                vector_search_top_k, rse_settings, relevant_segment_info,
+            )
+
+        except Exception as e:
+            self._fail_query(base_extra, overall_start_time, e, search_queries, return_mode, vector_search_top_k)
+            raise
+
+    async def aquery(
+        self,
+        search_queries: list[str],
+        rse_params: Optional[Union[Dict, str]] = None,
+        latency_profiling: bool = False,
+        metadata_filter: Optional[MetadataFilter] = None,
+        return_mode: str = "text",
+        vector_search_top_k: Optional[int] = None,
+    ) -> list[dict]:
+        """Async version of `query`, with the same arguments and results.
+
+        The embedding, vector search, reranking and chunk retrieval calls use the components'
+        async methods, so many queries can run concurrently in one event loop; the segments'
+        chunks are fetched concurrently too. Blocking work without an async counterpart (page
+        image lookups) runs in a shared thread pool.
+        """
+        base_extra, overall_start_time = self._start_query(search_queries)
+
+        try:
+            rse_params, vector_search_top_k = self._resolve_query_params(
+                base_extra, search_queries, rse_params, metadata_filter, return_mode, vector_search_top_k
+            )
+            rse_settings = self._get_rse_settings(rse_params, len(search_queries))
+            query_cache_entry, cached_results = self._lookup_query_cache(
+                search_queries, rse_settings, metadata_filter, return_mode, vector_search_top_k
+            )
+            if cached_results is not None:
+                return self._finish_cached_query(
+                    base_extra, overall_start_time, search_queries, return_mode, vector_search_top_k, cached_results
                 )
-                segment_info["segment_page_start"] = start_page_number
-                segment_info["segment_page_end"] = end_page_number
 
-                # Deprecated keys, but needed for backwards compatibility
-                segment_info["chunk_page_start"] = start_page_number
-                segment_info["chunk_page_end"] = end_page_number
+            # --- Search/Rerank Step ---
+            step_start_time = time.perf_counter()
+            all_ranked_results = await self._aget_all_ranked_results(
+                search_queries=search_queries,
+                metadata_filter=metadata_filter,
+                top_k_per_query=vector_search_top_k,
+            )
+            self._log_search_step(base_extra, search_queries, all_ranked_results, step_start_time, latency_profiling)
+
+            # --- RSE Step ---
+            relevant_segment_info = self._select_segments(base_extra, all_ranked_results, rse_settings)
+            if relevant_segment_info is None:
+                self._store_query_results(query_cache_entry, [])
+                return self._finish_empty_query(
+                    base_extra, overall_start_time, search_queries, return_mode, vector_search_top_k
+                )
 
-                # Backwards compatibility, where previously the content was stored in the "text" key
-                if type(segment_info["content"]) == str:
-                    segment_info["text"] = segment_info["content"]
+            # --- Content Retrieval Step ---
+            step_start_time = time.perf_counter()
+            all_segment_chunks = await asyncio.gather(*[
+                self.chunk_db.aget_chunks(
+                    segment_info["doc_id"],
+                    segment_info["chunk_start"],
+                    segment_info["chunk_end"],
+                    fields=SEGMENT_CHUNK_FIELDS,
+                )
+                for segment_info in relevant_segment_info
+            ])
+            for segment_info, segment_chunks in zip(relevant_segment_info, all_segment_chunks):
+                if return_mode == "text":
+                    self._fill_segment(segment_info, segment_chunks, return_mode)
                 else:
-                    segment_info["text"] = ""
-            
-            step_duration = time.perf_counter() - step_start_time
-            
-            # Log information about content retrieval step
-            query_logger.debug("Content retrieval complete", extra={
-                **base_extra, 
-                "step": "content_retrieval", 
-                "duration_s": round(step_duration, 4),
-                "return_mode": return_mode
-            })
-            
-            # Calculate and log overall query duration
-            overall_duration = time.perf_counter() - overall_start_time
-            query_logger.info("Query successful", extra={
-                **base_extra, 
-                "total_duration_s": round(overall_duration, 4), 
-                "num_final_segments": len(relevant_segment_info)
-            })
-            emit_telemetry_event(
-                sink=self.telemetry_sink,
-                event_type="query",
-                kb_id=self.kb_id,
-                profile=self.profile,
-                status="success",
-                duration_ms=overall_duration * 1000,
-                payload={
-                    "num_search_queries": len(search_queries),
-                    "num_results": len(relevant_segment_info),
-                    "return_mode": return_mode,
-                    "vector_search_top_k": vector_search_top_k,
-                    "rse_max_length": max_length,
-                    "rse_overall_max_length": overall_max_length,
-                },
+                    # page image modes list files through the file system
+                    await run_sync(self._fill_segment, segment_info, segment_chunks, return_mode)
+
+            self._store_query_results(query_cache_entry, relevant_segment_info)
+            return self._finish_query(
+                base_extra, overall_start_time, step_start_time, search_queries, return_mode,
+                vector_search_top_k, rse_settings, relevant_segment_info,
             )
 
-            return relevant_segment_info
-            
         except Exception as e:
-            # Log error with exception info
-            overall_duration = time.perf_counter() - overall_start_time
-            query_logger.error(
-                "Query failed", 
-                extra={
-                    **base_extra,
-                    "total_duration_s": round(overall_duration, 4),
-                    "error": str(e)
-                },
-                exc_info=True
+            self._fail_query(base_extra, overall_start_time, e, search_queries, return_mode, vector_search_top_k)
+            raise
+
+    def _start_query(self, search_queries: list[str]) -> tuple[dict, float]:
+        """Log the start of a query and start its timer.
+
+        Internal method for query execution. Returns the base log context and the start time.
+        """
+        # Get a logger specific to query operations
+        query_logger = logging.getLogger("dsrag.query")
+        
+        # Generate a unique query ID
+        query_id = str(uuid.uuid4())
+        
+        # Create a dictionary with base log context fields
+        base_extra = {"kb_id": self.kb_id, "query_id": query_id}
+        
+        # Log start of query operation at INFO level
+        query_logger.info("Starting query", extra={
+            **base_extra, 
+            "num_search_queries": len(search_queries)
+        })
+        
+        # Start timing the overall query process
+        return base_extra, time.perf_counter()
+
+    def _resolve_query_params(
+        self,
+        base_extra: dict,
+        search_queries: list[str],
+        rse_params: Optional[Union[Dict, str]],
+        metadata_filter: Optional[MetadataFilter],
+        return_mode: str,
+        vector_search_top_k: Optional[int],
+    ) -> tuple[Union[Dict, str], int]:
+        """Log the query parameters and fill in the profile defaults for the omitted ones.
+
+        Internal method for query execution.
+        """
+        query_logger = logging.getLogger("dsrag.query")
+        # Log query parameters at DEBUG level
+        query_logger.debug("Query parameters", extra={
+            **base_extra,
+            "search_queries": search_queries,
+            "rse_params": rse_params if isinstance(rse_params, dict) else {"preset": rse_params},
+            "metadata_filter": metadata_filter,
+            "return_mode": return_mode,
+            "reranker_model": self.reranker.__class__.__name__
+        })
+        
+        profile_query_defaults = get_profile_preset(self.profile).get("query_defaults", {})
+        if rse_params is None:
+            rse_params = profile_query_defaults.get("rse_params", "balanced")
+        if vector_search_top_k is None:
+            vector_search_top_k = profile_query_defaults.get("vector_search_top_k", 200)
+        return rse_params, vector_search_top_k
+
+    def _get_rse_settings(self, rse_params: Union[Dict, str], num_search_queries: int) -> dict:
+        """Resolve RSE parameters (a preset name or a partial dict) into the full settings.
+
+        Internal method for query execution.
+        """
+        # check if the rse_params is a preset name and convert it to a dictionary if it is
+        if isinstance(rse_params, str) and rse_params in RSE_PARAMS_PRESETS:
+            rse_params = RSE_PARAMS_PRESETS[rse_params]
+        elif isinstance(rse_params, str):
+            raise ValueError(f"Invalid rse_params preset name: {rse_params}")
+
+        # set the RSE parameters - use the 'balanced' preset as the default for any missing parameters
+        default_rse_params = RSE_PARAMS_PRESETS["balanced"]
+        settings = {
+            name: rse_params.get(name, default_rse_params[name])
+            for name in (
+                "max_length",
+                "overall_max_length",
+                "minimum_value",
+                "irrelevant_chunk_penalty",
+                "overall_max_length_extension",
+                "decay_rate",
+                "top_k_for_document_selection",
+                "chunk_length_adjustment",
             )
-            emit_telemetry_event(
-                sink=self.telemetry_sink,
-                event_type="query",
-                kb_id=self.kb_id,
-                profile=self.profile,
-                status="error",
-                duration_ms=overall_duration * 1000,
-                error=str(e),
-                payload={
-                    "num_search_queries": len(search_queries),
-                    "return_mode": return_mode,
-                    "vector_search_top_k": vector_search_top_k,
-                },
+        }
+
+        settings["overall_max_length"] += (
+            num_search_queries - 1
+        ) * settings["overall_max_length_extension"]  # increase the overall max length for each additional query
+        return settings
+
+    def _log_search_step(
+        self,
+        base_extra: dict,
+        search_queries: list[str],
+        all_ranked_results: list,
+        step_start_time: float,
+        latency_profiling: bool,
+    ) -> None:
+        """Log the search/rerank step of a query.
+
+        Internal method for query execution.
+        """
+        query_logger = logging.getLogger("dsrag.query")
+        step_duration = time.perf_counter() - step_start_time
+        
+        # Get the number of initial results per query
+        initial_results_per_query = [len(results) for results in all_ranked_results]
+        
+        # Log information about search/rerank step
+        query_logger.debug("Search/Rerank complete", extra={
+            **base_extra, 
+            "step": "search_rerank", 
+            "duration_s": round(step_duration, 4),
+            "num_initial_results_per_query": initial_results_per_query,
+            "total_initial_results": sum(initial_results_per_query),
+            "reranker": self.reranker.__class__.__name__
+        })
+        
+        if latency_profiling:
+            print(
+                f"get_all_ranked_results took {step_duration} seconds to run for {len(search_queries)} queries"
             )
-            # Re-raise the exception
-            raise
+
+    def _lookup_query_cache(
+        self,
+        search_queries: list[str],
+        rse_settings: dict,
+        metadata_filter: Optional[MetadataFilter],
+        return_mode: str,
+        vector_search_top_k: int,
+    ) -> tuple[Optional[tuple[str, int]], Optional[list[dict]]]:
+        """Look a query up in the query cache, if the KB has one.
+
+        Internal method for query execution. Returns the (key, generation) to store the query's
+        results under, and the cached results, if any.
+        """
+        if self.query_cache is None:
+            return None, None
+        # the instance ID tells this KB apart from other KBs sharing the cache, including an earlier
+        # KB with the same kb_id that was deleted, whose generations started from 0 as well
+        key = get_query_cache_key(
+            self.kb_id, self.kb_metadata["instance_id"],
+            search_queries, rse_settings, metadata_filter, return_mode, vector_search_top_k,
+        )
+        # read before searching, so results computed during a write are stored as already stale
+        generation = self.kb_metadata.get("generation", 0)
+        return (key, generation), self.query_cache.get(key, generation)
+
+    def _store_query_results(self, query_cache_entry: Optional[tuple[str, int]], results: list[dict]) -> None:
+        """Store a query's results in the query cache.
+
+        Internal method for query execution. `query_cache_entry` is from `_lookup_query_cache`.
+        """
+        if query_cache_entry is not None:
+            key, generation = query_cache_entry
+            self.query_cache.put(key, generation, results)
+
+    def _select_segments(self, base_extra: dict, all_ranked_results: list, rse_settings: dict) -> Optional[list[dict]]:
+        """Run RSE over the ranked results.
+
+        Internal method for query execution. Returns the best segments (doc_id, chunk range and
+        score, without their content), or None if the results don't make a meta-document.
+        """
+        query_logger = logging.getLogger("dsrag.query")
+        step_start_time = time.perf_counter()
+        document_splits, document_start_points, unique_document_ids = get_meta_document(
+            all_ranked_results=all_ranked_results,
+            top_k_for_document_selection=rse_settings["top_k_for_document_selection"],
+        )
+
+        # verify that we have a valid meta-document - otherwise there are no segments
+        if len(document_splits) == 0:
+            return None
+
+        # get the length of the meta-document so we don't have to pass in the whole list of splits
+        meta_document_length = document_splits[-1]
+
+        # get the relevance values for each chunk in the meta-document and use those to find the best segments
+        all_relevance_values = get_relevance_values(
+            all_ranked_results=all_ranked_results,
+            meta_document_length=meta_document_length,
+            document_start_points=document_start_points,
+            unique_document_ids=unique_document_ids,
+            irrelevant_chunk_penalty=rse_settings["irrelevant_chunk_penalty"],
+            decay_rate=rse_settings["decay_rate"],
+            chunk_length_adjustment=rse_settings["chunk_length_adjustment"],
+        )
+        best_segments, scores = get_best_segments(
+            all_relevance_values=all_relevance_values,
+            document_splits=document_splits,
+            max_length=rse_settings["max_length"],
+            overall_max_length=rse_settings["overall_max_length"],
+            minimum_value=rse_settings["minimum_value"],
+        )
+        step_duration = time.perf_counter() - step_start_time
+        
+        # Log information about RSE step
+        query_logger.debug("RSE complete", extra={
+            **base_extra,
+            "step": "rse", 
+            "duration_s": round(step_duration, 4),
+            "num_final_segments": len(best_segments),
+            "segment_scores": [round(s, 4) for s in scores]
+        })
+
+        # convert the best segments into a list of dictionaries that contain the document id and the start and end of the chunk
+        relevant_segment_info = []
+        for segment_index, (start, end) in enumerate(best_segments):
+            # find the document that this segment starts in
+            for i, split in enumerate(document_splits):
+                if start < split:  # splits represent the end of each document
+                    doc_start = document_splits[i - 1] if i > 0 else 0
+                    relevant_segment_info.append(
+                        {
+                            "doc_id": unique_document_ids[i],
+                            "chunk_start": start - doc_start,
+                            "chunk_end": end - doc_start,
+                        }
+                    )  # NOTE: end index is non-inclusive
+                    break
+
+            score = scores[segment_index]
+            relevant_segment_info[-1]["score"] = score
+        return relevant_segment_info
+
+    def _fill_segment(self, segment_info: dict, segment_chunks: dict, return_mode: str) -> None:
+        """Add a segment's content and page numbers to its segment info.
+
+        Internal method for content retrieval. `segment_chunks` are the segment's chunks from
+        `_get_segment_chunks`.
+        """
+        segment_info["content"] = self._get_segment_content_from_database(
+            segment_info["doc_id"],
+            segment_info["chunk_start"],
+            segment_info["chunk_end"],
+            return_mode=return_mode,
+            chunks=segment_chunks,
+        )
+        start_page_number, end_page_number = self._get_segment_page_numbers(
+            segment_info["doc_id"],
+            segment_info["chunk_start"],
+            segment_info["chunk_end"],
+            chunks=segment_chunks,
+        )
+        segment_info["segment_page_start"] = start_page_number
+        segment_info["segment_page_end"] = end_page_number
+
+        # Deprecated keys, but needed for backwards compatibility
+        segment_info["chunk_page_start"] = start_page_number
+        segment_info["chunk_page_end"] = end_page_number
+
+        # Backwards compatibility, where previously the content was stored in the "text" key
+        if type(segment_info["content"]) == str:
+            segment_info["text"] = segment_info["content"]
+        else:
+            segment_info["text"] = ""
+
+    def _finish_empty_query(
+        self,
+        base_extra: dict,
+        overall_start_time: float,
+        search_queries: list[str],
+        return_mode: str,
+        vector_search_top_k: int,
+    ) -> list[dict]:
+        """Log and report a query whose results didn't make a meta-document.
+
+        Internal method for query execution. Returns the (empty) query results.
+        """
+        query_logger = logging.getLogger("dsrag.query")
+        query_logger.info("Query returned no results (empty meta-document)", extra=base_extra)
+        emit_telemetry_event(
+            sink=self.telemetry_sink,
+            event_type="query",
+            kb_id=self.kb_id,
+            profile=self.profile,
+            status="success",
+            duration_ms=(time.perf_counter() - overall_start_time) * 1000,
+            payload={
+                "num_search_queries": len(search_queries),
+                "num_results": 0,
+                "return_mode": return_mode,
+                "vector_search_top_k": vector_search_top_k,
+            },
+        )
+        return []
+
+    def _finish_cached_query(
+        self,
+        base_extra: dict,
+        overall_start_time: float,
+        search_queries: list[str],
+        return_mode: str,
+        vector_search_top_k: int,
+        cached_results: list[dict],
+    ) -> list[dict]:
+        """Log and report a query served from the query cache.
+
+        Internal method for query execution. Returns the query results.
+        """
+        query_logger = logging.getLogger("dsrag.query")
+        overall_duration = time.perf_counter() - overall_start_time
+        query_logger.info("Query served from cache", extra={
+            **base_extra,
+            "total_duration_s": round(overall_duration, 4),
+            "num_final_segments": len(cached_results)
+        })
+        emit_telemetry_event(
+            sink=self.telemetry_sink,
+            event_type="query",
+            kb_id=self.kb_id,
+            profile=self.profile,
+            status="success",
+            duration_ms=overall_duration * 1000,
+            payload={
+                "num_search_queries": len(search_queries),
+                "num_results": len(cached_results),
+                "return_mode": return_mode,
+                "vector_search_top_k": vector_search_top_k,
+                "query_cache_hit": True,
+                **self._cache_telemetry(),
+            },
+        )
+        return cached_results
+
+    def _finish_query(
+        self,
+        base_extra: dict,
+        overall_start_time: float,
+        step_start_time: float,
+        search_queries: list[str],
+        return_mode: str,
+        vector_search_top_k: int,
+        rse_settings: dict,
+        relevant_segment_info: list[dict],
+    ) -> list[dict]:
+        """Log and report a successful query.
+
+        Internal method for query execution. Returns the query results.
+        """
+        query_logger = logging.getLogger("dsrag.query")
+        step_duration = time.perf_counter() - step_start_time
+
+        # Log information about content retrieval step
+        query_logger.debug("Content retrieval complete", extra={
+            **base_extra, 
+            "step": "content_retrieval", 
+            "duration_s": round(step_duration, 4),
+            "return_mode": return_mode
+        })
+        
+        # Calculate and log overall query duration
+        overall_duration = time.perf_counter() - overall_start_time
+        query_logger.info("Query successful", extra={
+            **base_extra, 
+            "total_duration_s": round(overall_duration, 4), 
+            "num_final_segments": len(relevant_segment_info)
+        })
+        emit_telemetry_event(
+            sink=self.telemetry_sink,
+            event_type="query",
+            kb_id=self.kb_id,
+            profile=self.profile,
+            status="success",
+            duration_ms=overall_duration * 1000,
+            payload={
+                "num_search_queries": len(search_queries),
+                "num_results": len(relevant_segment_info),
+                "return_mode": return_mode,
+                "vector_search_top_k": vector_search_top_k,
+                "rse_max_length": rse_settings["max_length"],
+                "rse_overall_max_length": rse_settings["overall_max_length"],
+                **self._cache_telemetry(),
+            },
+        )
+
+        return relevant_segment_info
+
+    def _fail_query(
+        self,
+        base_extra: dict,
+        overall_start_time: float,
+        error: Exception,
+        search_queries: list[str],
+        return_mode: str,
+        vector_search_top_k: Optional[int],
+    ) -> None:
+        """Log and report a failed query. Must be called from the `except` block that caught `error`.
+
+        Internal method for query execution.
+        """
+        query_logger = logging.getLogger("dsrag.query")
+        # Log error with exception info
+        overall_duration = time.perf_counter() - overall_start_time
+        query_logger.error(
+            "Query failed", 
+            extra={
+                **base_extra,
+                "total_duration_s": round(overall_duration, 4),
+                "error": str(error)
+            },
+            exc_info=True
+        )
+        emit_telemetry_event(
+            sink=self.telemetry_sink,
+            event_type="query",
+            kb_id=self.kb_id,
+            profile=self.profile,
+            status="error",
+            duration_ms=overall_duration * 1000,
+            error=str(error),
+            payload={
+                "num_search_queries": len(search_queries),
+                "return_mode": return_mode,
+                "vector_search_top_k": vector_search_top_k,
+            },
+        )
@@ -0,0 +1,102 @@
+import copy
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+DEFAULT_MAX_ENTRIES = 1000
+DEFAULT_TTL = 300.0  # seconds
+
+
+def get_query_cache_key(
+    kb_id: str,
+    instance_id: str,
+    search_queries: list[str],
+    rse_settings: dict,
+    metadata_filter: Optional[dict],
+    return_mode: str,
+    vector_search_top_k: int,
+) -> str:
+    """
+    The cache key of a query to the KB with this `kb_id` and `instance_id` (unique to each KB created,
+    so a cache shared by several KBs never mixes up their results). It's built from the resolved RSE
+    settings rather than the `rse_params` argument, so a preset name and the equivalent dict share
+    their results.
+    """
+    return json.dumps(
+        [kb_id, instance_id, list(search_queries), rse_settings, metadata_filter, return_mode, vector_search_top_k],
+        sort_keys=True,
+        default=str,
+    )
+
+
+class QueryCache:
+    """
+    A thread-safe LRU of `KnowledgeBase.query` results, for repeated identical queries.
+
+    Each result is stored with the KB generation it was computed at: the KB bumps its generation
+    whenever documents are added or deleted, and a result from an older generation is never
+    returned. Results are also dropped once they're older than `ttl`, which bounds how stale they
+    can get when another process writes to the KB.
+
+    Args:
+        max_entries: The most query results to keep.
+        ttl: Seconds a result stays valid. None keeps results until they're evicted or invalidated.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: Optional[float] = DEFAULT_TTL):
+        if max_entries < 1:
+            raise ValueError(f"Invalid query cache size: max_entries={max_entries}.")
+        if ttl is not None and ttl <= 0:
+            raise ValueError(f"Invalid query cache TTL: {ttl}.")
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (generation, stored_at, results)
+        self._entries: OrderedDict[str, tuple[int, float, list[dict]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str, generation: int) -> Optional[list[dict]]:
+        """A copy of the results cached for `key` at `generation`, or None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry_generation, stored_at, results = entry
+                expired = self.ttl is not None and time.monotonic() - stored_at > self.ttl
+                if entry_generation != generation or expired:
+                    del self._entries[key]
+                    entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        # callers own the segments they get back, so they can't change the cached ones
+        return copy.deepcopy(results)
+
+    def put(self, key: str, generation: int, results: list[dict]) -> None:
+        results = copy.deepcopy(results)
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (generation, time.monotonic(), results)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+            }
@@ -1,9 +1,26 @@
 from abc import ABC, abstractmethod
 import os
 from dsrag.utils.imports import cohere, voyageai
+from dsrag.utils.async_utils import LoopLocal, run_sync
 from scipy.stats import beta
 
 
+def get_rerank_documents(search_results: list) -> list[str]:
+    """The text a reranker scores for each search result: its chunk header and chunk text."""
+    return [
+        f"{result['metadata']['chunk_header']}\n\n{result['metadata']['chunk_text']}"
+        for result in search_results
+    ]
+
+
+def apply_rerank_results(search_results: list, results: list, transform) -> list:
+    """Reorder `search_results` by a rerank API response, with transformed relevance scores."""
+    reranked_search_results = [search_results[result.index] for result in results]
+    for result, search_result in zip(results, reranked_search_results):
+        search_result['similarity'] = transform(result.relevance_score)
+    return reranked_search_results
+
+
 class Reranker(ABC):
     subclasses = {}
 
@@ -29,6 +46,13 @@ class Reranker(ABC):
     def rerank_search_results(self, query: str, search_results: list) -> list:
         pass
 
+    async def arerank_search_results(self, query: str, search_results: list) -> list:
+        """
+        Async version of `rerank_search_results`. The default runs `rerank_search_results` in a
+        shared thread pool; rerankers with an async client override it.
+        """
+        return await run_sync(self.rerank_search_results, query, search_results)
+
 class CohereReranker(Reranker):
     def __init__(self, model: str = "rerank-english-v3.0"):
         self.model = model
@@ -38,6 +62,8 @@ class CohereReranker(Reranker):
             self.client = cohere.Client(api_key=cohere_api_key)
         else:
             self.client = cohere.Client(api_key=cohere_api_key)
+        # async clients are bound to the event loop they're created in
+        self._async_clients = LoopLocal(lambda: cohere.AsyncClient(api_key=cohere_api_key))
 
     def transform(self, x):
         """
@@ -51,18 +77,16 @@ class CohereReranker(Reranker):
         """
         Use Cohere Rerank API to rerank the search results
         """
-        documents = []
-        for result in search_results:
-            documents.append(f"{result['metadata']['chunk_header']}\n\n{result['metadata']['chunk_text']}")
-
+        documents = get_rerank_documents(search_results)
         reranked_results = self.client.rerank(model=self.model, query=query, documents=documents)
-        results = reranked_results.results
-        reranked_indices = [result.index for result in results]
-        reranked_similarity_scores = [result.relevance_score for result in results]
-        reranked_search_results = [search_results[i] for i in reranked_indices]
-        for i, result in enumerate(reranked_search_results):
-            result['similarity'] = self.transform(reranked_similarity_scores[i])
-        return reranked_search_results
+        return apply_rerank_results(search_results, reranked_results.results, self.transform)
+
+    async def arerank_search_results(self, query: str, search_results: list) -> list:
+        documents = get_rerank_documents(search_results)
+        reranked_results = await self._async_clients.get().rerank(
+            model=self.model, query=query, documents=documents
+        )
+        return apply_rerank_results(search_results, reranked_results.results, self.transform)
     
     def to_dict(self):
         base_dict = super().to_dict()
@@ -76,6 +100,8 @@ class VoyageReranker(Reranker):
         self.model = model
         voyage_api_key = os.environ['VOYAGE_API_KEY']
         self.client = voyageai.Client(api_key=voyage_api_key)
+        # async clients are bound to the event loop they're created in
+        self._async_clients = LoopLocal(lambda: voyageai.AsyncClient(api_key=voyage_api_key))
 
     def transform(self, x):
         """
@@ -89,18 +115,16 @@ class VoyageReranker(Reranker):
         """
         Use Voyage Rerank API to rerank the search results
         """
-        documents = []
-        for result in search_results:
-            documents.append(f"{result['metadata']['chunk_header']}\n\n{result['metadata']['chunk_text']}")
-        
+        documents = get_rerank_documents(search_results)
         reranked_results = self.client.rerank(model=self.model, query=query, documents=documents)
-        results = reranked_results.results
-        reranked_indices = [result.index for result in results]
-        reranked_similarity_scores = [result.relevance_score for result in results]
-        reranked_search_results = [search_results[i] for i in reranked_indices]
-        for i, result in enumerate(reranked_search_results):
-            result['similarity'] = self.transform(reranked_similarity_scores[i])
-        return reranked_search_results
+        return apply_rerank_results(search_results, reranked_results.results, self.transform)
+
+    async def arerank_search_results(self, query: str, search_results: list) -> list:
+        documents = get_rerank_documents(search_results)
+        reranked_results = await self._async_clients.get().rerank(
+            model=self.model, query=query, documents=documents
+        )
+        return apply_rerank_results(search_results, reranked_results.results, self.transform)
     
     def to_dict(self):
         base_dict = super().to_dict()
@@ -1,5 +1,40 @@
 import numpy as np
 
+def get_segment_values(relevance_values: list, max_length: int) -> np.ndarray:
+    """
+    Get the value of every segment of up to max_length chunks, as an array indexed by [start, length - 1] (with NaN for segments that run past the end).
+
+    Each row is a running sum over the chunks from that start, accumulated left to right, so every value is exactly what sum(relevance_values[start:end]) gives.
+    """
+    relevance_values = np.asarray(relevance_values, dtype=np.float64)
+    segment_values = np.full((len(relevance_values), max_length), np.nan)
+    if max_length > 0:
+        segment_values[:, 0] = relevance_values
+    for length in range(2, max_length + 1):
+        num_starts = len(relevance_values) - length + 1
+        if num_starts <= 0:
+            break
+        segment_values[:num_starts, length - 1] = segment_values[:num_starts, length - 2] + relevance_values[length - 1:]
+    return segment_values
+
+def get_valid_segments(relevance_values: list, document_splits: list[int], max_length: int) -> np.ndarray:
+    """
+    Get a boolean mask, indexed like get_segment_values, of the segments that fit in the meta-document, start and end on non-negative chunks, and don't cross a document split.
+    """
+    relevance_values = np.asarray(relevance_values, dtype=np.float64)
+    num_chunks = len(relevance_values)
+    starts = np.arange(num_chunks)[:, None]
+    ends = starts + np.arange(1, max_length + 1)[None, :] # non-inclusive
+    in_bounds = ends <= num_chunks
+    last_chunks = np.minimum(ends - 1, num_chunks - 1)
+
+    # a segment crosses a split if any split falls strictly between its start and its end, i.e. its first and last chunks are in different documents
+    document_ids = np.searchsorted(np.sort(np.asarray(document_splits)), np.arange(num_chunks), side="right")
+    same_document = document_ids[starts] == document_ids[last_chunks]
+
+    non_negative = relevance_values >= 0
+    return in_bounds & same_document & non_negative[starts] & non_negative[last_chunks]
+
 def get_best_segments(all_relevance_values: list[list], document_splits: list[int], max_length: int, overall_max_length: int, minimum_value: float):
     """
     This function takes the chunk relevance values and then runs an optimization algorithm to find the best segments.
@@ -10,7 +45,14 @@ def get_best_segments(all_relevance_values: list[list], document_splits: list[in
     Returns
     - best_segments: a list of tuples (start, end) that represent the indices of the best segments (the end index is non-inclusive) in the meta-document
     - scores: a list of the scores for each of the best segments
+
+    The queries take turns picking their best remaining segment. The value of every candidate segment is computed once per query up front, so each pick is a masked argmax over an array; ties go to the segment with the earliest start, then the shortest one.
     """
+    max_length = max(max_length, 0)
+    all_segment_values = [None] * len(all_relevance_values) # computed the first time each query picks a segment
+    all_valid_segments = [None] * len(all_relevance_values)
+    occupied = [np.zeros(len(relevance_values), dtype=bool) for relevance_values in all_relevance_values]
+
     best_segments = []
     scores = []
     total_length = 0
@@ -30,29 +72,29 @@ def get_best_segments(all_relevance_values: list[list], document_splits: list[in
         
         # find the best remaining segment for this query
         relevance_values = all_relevance_values[rv_index] # get the relevance values for this query
+        if all_segment_values[rv_index] is None:
+            all_segment_values[rv_index] = get_segment_values(relevance_values, max_length)
+            all_valid_segments[rv_index] = get_valid_segments(relevance_values, document_splits, max_length)
+        # only segments that wouldn't push us over the overall max length
+        max_segment_length = min(max_length, overall_max_length - total_length)
+        segment_values = all_segment_values[rv_index][:, :max_segment_length]
+        valid_segments = all_valid_segments[rv_index][:, :max_segment_length]
+
+        # segments can't overlap with any of the best segments so far
+        num_occupied = np.concatenate(([0], np.cumsum(occupied[rv_index])))
+        starts = np.arange(len(relevance_values))[:, None]
+        ends = np.minimum(starts + np.arange(1, max_segment_length + 1)[None, :], len(relevance_values))
+        valid_segments = valid_segments & (num_occupied[ends] == num_occupied[starts])
+        valid_segments &= segment_values > -1000
+
         best_segment = None
         best_value = -1000
-        for start in range(len(relevance_values)):
-            # skip over negative value starting points
-            if relevance_values[start] < 0:
-                continue
-            for end in range(start+1, min(start+max_length+1, len(relevance_values)+1)):
-                # skip over negative value ending points
-                if relevance_values[end-1] < 0:
-                    continue
-                # check if this segment overlaps with any of the best segments
-                if any(start < seg_end and end > seg_start for seg_start, seg_end in best_segments):
-                    continue
-                # check if this segment overlaps with any of the document splits
-                if any(start < split and end > split for split in document_splits):
-                    continue
-                # check if this segment would push us over the overall max length
-                if total_length + end - start > overall_max_length:
-                    continue
-                segment_value = sum(relevance_values[start:end]) # define segment value as the sum of the relevance values of its chunks
-                if segment_value > best_value:
-                    best_value = segment_value
-                    best_segment = (start, end)
+        if valid_segments.any():
+            # argmax returns the first of equal values, in (start, length) order
+            best_index = np.argmax(np.where(valid_segments, segment_values, -np.inf))
+            start, length_index = np.unravel_index(best_index, valid_segments.shape)
+            best_segment = (int(start), int(start + length_index + 1))
+            best_value = float(segment_values[start, length_index])
         
         # if we didn't find a valid segment, mark this query as done
         if best_segment is None or best_value < minimum_value:
@@ -64,6 +106,8 @@ def get_best_segments(all_relevance_values: list[list], document_splits: list[in
         best_segments.append(best_segment)
         scores.append(best_value)
         total_length += best_segment[1] - best_segment[0]
+        for query_occupied in occupied:
+            query_occupied[best_segment[0]:best_segment[1]] = True
         rv_index += 1
     
     return best_segments, scores
@@ -0,0 +1,67 @@
+"""
+Helpers for the async (`a`-prefixed) component methods.
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import os
+import threading
+import weakref
+from typing import Any, Callable, Generic, TypeVar
+
+T = TypeVar("T")
+
+# threads shared by every default async method that wraps a blocking call
+DEFAULT_MAX_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def get_executor() -> concurrent.futures.ThreadPoolExecutor:
+    """The process-wide executor for blocking calls made from async code, created on first use."""
+    global _executor, _executor_pid
+    with _executor_lock:
+        # a forked child doesn't inherit the parent's worker threads
+        if _executor is None or _executor_pid != os.getpid():
+            _executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=DEFAULT_MAX_WORKERS, thread_name_prefix="dsrag-async"
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+async def run_sync(fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Run a blocking call in the shared executor without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(
+        get_executor(), functools.partial(context.run, fn, *args, **kwargs)
+    )
+
+
+class LoopLocal(Generic[T]):
+    """
+    One lazily created value per event loop, for async clients and connection pools, which can
+    only be used from the loop they were created in.
+    """
+
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._values: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, T]" = weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def get(self) -> T:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if loop not in self._values:
+                self._values[loop] = self._factory()
+            return self._values[loop]
+
+    def discard(self) -> None:
+        """Forget the running loop's value, so the next `get()` creates a new one."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._values.pop(loop, None)
@@ -0,0 +1,198 @@
+"""
+Measure the recall and latency impact of BasicVectorDB quantization.
+
+Every KB in the example vector storage is loaded once per mode (exact, float16, int8). The
+queries are held out: a sample of the KB's chunk vectors is removed from the KB, and each of
+them is perturbed with random noise, so no query has an exact match to find. Each quantized
+mode's top-k is compared with the exact top-k at three stages:
+
+- `first_pass_recall_at_k`: the top-k of the quantized scan alone, before any re-scoring
+- `rescored_recall_at_k`: the best `rescore_multiplier * top_k` candidates of the quantized scan
+  re-scored exactly, without the `MIN_RESCORE_CANDIDATES` floor, which isolates the effect of
+  the multiplier
+- `recall_at_k`: `search_batch` as shipped, floor included. On small KBs the floor re-scores
+  most or all of the rows exactly, which `rescored_fraction` (the share of the KB's rows
+  re-scored per query) makes visible.
+
+Example:
+    python eval/vector_quantization_eval.py --top-k 10 --output-config /tmp/quantization.json
+
+The optional `--output-config` file uses the benchmark runner config shape, so it can be turned
+into a report with `eval/benchmark_runner.py`.
+"""
+
+import argparse
+import json
+import os
+import pickle
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../")))
+
+from dsrag.database.vector import BasicVectorDB
+from dsrag.database.vector.basic_db import MIN_RESCORE_CANDIDATES
+from dsrag.database.vector.quantization import normalize_rows
+
+
+DEFAULT_DATA_DIR = Path(__file__).resolve().parents[1] / "examples" / "example_kb_data" / "vector_storage"
+MODES = [None, "float16", "int8"]
+
+# at most this share of a KB's vectors is held out as queries
+MAX_HELD_OUT_FRACTION = 0.25
+
+
+def load_legacy_vectors(path: Path):
+    with open(path, "rb") as f:
+        vectors, metadata = pickle.load(f)
+    return np.asarray(vectors, dtype=np.float32), list(metadata)
+
+
+def result_key(result) -> tuple:
+    return (result["metadata"]["doc_id"], result["metadata"]["chunk_index"])
+
+
+def make_queries(rng, vectors: np.ndarray, num_queries: int, noise: float):
+    """
+    Hold out `num_queries` rows as queries, each perturbed by a random vector `noise` times its
+    own norm. Returns the queries and the indices of the rows that stay in the KB.
+    """
+    num_queries = max(1, min(num_queries, int(len(vectors) * MAX_HELD_OUT_FRACTION)))
+    held_out = rng.choice(len(vectors), size=num_queries, replace=False)
+    directions = normalize_rows(rng.normal(size=(num_queries, vectors.shape[1])).astype(np.float32))
+    norms = np.linalg.norm(vectors[held_out], axis=1, keepdims=True)
+    queries = vectors[held_out] + noise * norms * directions
+    kept = np.setdiff1d(np.arange(len(vectors)), held_out)
+    return queries, kept
+
+
+def rescored_top_k(approximate: np.ndarray, exact: np.ndarray, top_k: int, num_candidates: int) -> list[set]:
+    """The exact top-k among each query's `num_candidates` best approximate scores."""
+    all_rows = []
+    for approximate_scores, exact_scores in zip(approximate, exact):
+        candidates = np.argsort(-approximate_scores, kind="stable")[:num_candidates]
+        best = candidates[np.argsort(-exact_scores[candidates], kind="stable")[:top_k]]
+        all_rows.append(set(best.tolist()))
+    return all_rows
+
+
+def recall(expected: list[set], found: list[set]) -> tuple[int, int]:
+    return sum(len(e & f) for e, f in zip(expected, found)), sum(len(e) for e in expected)
+
+
+def evaluate(data_dir: Path, top_k: int, num_queries: int, rescore_multiplier: int, seed: int, noise: float) -> dict:
+    rng = np.random.default_rng(seed)
+    datasets = [load_legacy_vectors(path) for path in sorted(data_dir.glob("*.pkl"))]
+    if not datasets:
+        raise ValueError(f"No vector storage pickles found in {data_dir}")
+
+    counters = ("hits", "first_pass_hits", "rescored_hits", "total", "rescored_rows", "kb_rows")
+    metrics = {
+        mode or "float32": {**{name: 0 for name in counters}, "latency_s": 0.0, "memory_bytes": 0}
+        for mode in MODES
+    }
+    total_queries = 0
+    with tempfile.TemporaryDirectory() as storage_directory:
+        for dataset_index, (all_vectors, all_metadata) in enumerate(datasets):
+            queries, kept = make_queries(rng, all_vectors, num_queries, noise)
+            vectors = all_vectors[kept]
+            metadata = [all_metadata[row] for row in kept]
+            row_of_key = {(m["doc_id"], m["chunk_index"]): row for row, m in enumerate(metadata)}
+            exact_scores = normalize_rows(queries) @ normalize_rows(vectors).T
+            total_queries += len(queries)
+
+            exact_rows = None
+            for mode in MODES:
+                db = BasicVectorDB(
+                    f"quantization_eval_{dataset_index}_{mode}",
+                    storage_directory,
+                    quantization=mode,
+                    rescore_multiplier=rescore_multiplier,
+                )
+                db.add_vectors(vectors, metadata)
+                # build the quantized matrix outside of the timed section
+                db.search_batch(queries[:1], top_k=top_k)
+
+                start = time.perf_counter()
+                results = db.search_batch(queries, top_k=top_k)
+                elapsed = time.perf_counter() - start
+                found_rows = [{row_of_key[result_key(result)] for result in query_results} for query_results in results]
+
+                entry = metrics[mode or "float32"]
+                entry["latency_s"] += elapsed
+                entry["memory_bytes"] += db._quantized.nbytes if db._quantized is not None else db.vectors.nbytes
+                if exact_rows is None:
+                    exact_rows = found_rows
+
+                hits, total = recall(exact_rows, found_rows)
+                entry["hits"] += hits
+                entry["total"] += total
+                if db._quantized is None:
+                    first_pass_hits = rescored_hits = hits
+                    num_rescored = len(vectors)
+                else:
+                    approximate = db._quantized.scores(queries)
+                    first_pass_hits, _ = recall(exact_rows, rescored_top_k(approximate, exact_scores, top_k, top_k))
+                    rescored_hits, _ = recall(
+                        exact_rows, rescored_top_k(approximate, exact_scores, top_k, rescore_multiplier * top_k)
+                    )
+                    num_rescored = min(len(vectors), max(top_k * rescore_multiplier, MIN_RESCORE_CANDIDATES))
+                entry["first_pass_hits"] += first_pass_hits
+                entry["rescored_hits"] += rescored_hits
+                entry["rescored_rows"] += num_rescored * len(queries)
+                entry["kb_rows"] += len(vectors) * len(queries)
+                db.delete()
+
+    def ratio(numerator, denominator):
+        return round(numerator / denominator, 4) if denominator else 1.0
+
+    return {
+        mode: {
+            f"first_pass_recall_at_{top_k}": ratio(entry["first_pass_hits"], entry["total"]),
+            f"rescored_recall_at_{top_k}": ratio(entry["rescored_hits"], entry["total"]),
+            f"recall_at_{top_k}": ratio(entry["hits"], entry["total"]),
+            "rescored_fraction": ratio(entry["rescored_rows"], entry["kb_rows"]),
+            "latency_ms": round(1000 * entry["latency_s"] / total_queries, 3),
+            "memory_mb": round(entry["memory_bytes"] / (1024 * 1024), 3),
+        }
+        for mode, entry in metrics.items()
+    }
+
+
+def to_benchmark_config(results: dict, top_k: int) -> dict:
+    return {
+        "name": "basic-vector-db-quantization",
+        "domain": "general",
+        "dataset_version": "example_kb_data",
+        "run_id": "current",
+        "baseline": "float32",
+        "lower_is_better": ["latency_ms", "memory_mb"],
+        "runs": [{"name": mode, "metrics": mode_metrics} for mode, mode_metrics in results.items()],
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", type=Path, default=DEFAULT_DATA_DIR)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--num-queries", type=int, default=200, help="Queries held out per KB (at most a quarter of it)")
+    parser.add_argument("--rescore-multiplier", type=int, default=4)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--noise", type=float, default=0.5, help="Query perturbation, relative to the vector norm")
+    parser.add_argument("--output-config", type=Path, help="Write a benchmark runner config JSON")
+    args = parser.parse_args()
+
+    results = evaluate(args.data_dir, args.top_k, args.num_queries, args.rescore_multiplier, args.seed, args.noise)
+    for mode, mode_metrics in results.items():
+        print(f"{mode:>8}: " + ", ".join(f"{name}={value}" for name, value in mode_metrics.items()))
+
+    if args.output_config:
+        args.output_config.write_text(json.dumps(to_benchmark_config(results, args.top_k), indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import asyncio
+import contextvars
+import threading
+import unittest
+
+from dsrag.utils.async_utils import LoopLocal, run_sync
+
+
+request_id = contextvars.ContextVar("request_id", default=None)
+
+
+class TestRunSync(unittest.TestCase):
+    def test_runs_off_the_event_loop_thread(self):
+        async def main():
+            request_id.set("abc")
+            return await run_sync(lambda x, y=0: (x + y, threading.get_ident(), request_id.get()), 1, y=2)
+
+        result, thread_id, context_value = asyncio.run(main())
+        self.assertEqual(result, 3)
+        self.assertNotEqual(thread_id, threading.get_ident())
+        # the caller's context variables are visible in the worker thread
+        self.assertEqual(context_value, "abc")
+
+    def test_propagates_exceptions(self):
+        def fail():
+            raise ValueError("boom")
+
+        with self.assertRaisesRegex(ValueError, "boom"):
+            asyncio.run(run_sync(fail))
+
+
+class TestLoopLocal(unittest.TestCase):
+    def test_one_value_per_event_loop(self):
+        created = []
+
+        def factory():
+            created.append(object())
+            return created[-1]
+
+        loop_local = LoopLocal(factory)
+
+        async def get_twice():
+            return loop_local.get(), loop_local.get()
+
+        first, again = asyncio.run(get_twice())
+        self.assertIs(first, again)
+        second, _ = asyncio.run(get_twice())
+        self.assertIsNot(first, second)
+        self.assertEqual(len(created), 2)
+
+    def test_discard(self):
+        loop_local = LoopLocal(object)
+
+        async def get_discard_get():
+            first = loop_local.get()
+            loop_local.discard()
+            return first, loop_local.get()
+
+        first, second = asyncio.run(get_discard_get())
+        self.assertIsNot(first, second)
+
+    def test_requires_running_loop(self):
+        with self.assertRaises(RuntimeError):
+            LoopLocal(object).get()
+
+
+if __name__ == "__main__":
+    unittest.main()
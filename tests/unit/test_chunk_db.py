@@ -1,19 +1,32 @@
+import asyncio
 import os
+import pickle
 import sys
 import unittest
 import shutil
+import gc
+import threading
+import sqlite3
 import psycopg2
 import time
+import unittest.mock
 import pytest
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
 from dsrag.database.chunk.basic_db import BasicChunkDB
-from dsrag.database.chunk.sqlite_db import SQLiteDB
+from dsrag.database.chunk.sqlite_db import SQLiteDB, SCHEMA_VERSION
 from dsrag.database.chunk.db import ChunkDB
+from dsrag.database.chunk.cached_db import CachedChunkDB
 from dsrag.database.chunk.postgres_db import PostgresChunkDB
+from dsrag.database.postgres_pool import PostgresConnectionPool, get_connection_pool
 from dsrag.database.chunk import DynamoDB
 
+try:
+    from moto import mock_aws
+except ImportError:
+    mock_aws = None
+
 
 class TestChunkDB(unittest.TestCase):
     def setUp(self):
@@ -121,12 +134,33 @@ class TestChunkDB(unittest.TestCase):
         summary = db.get_section_summary(doc_id, 0)
         self.assertEqual(summary, "Summary 1")
 
+    def test__get_chunks(self):
+        db = BasicChunkDB(self.kb_id, self.storage_directory)
+        chunks = {
+            i: {"chunk_text": f"Content of chunk {i}", "chunk_page_start": i, "chunk_page_end": i + 1}
+            for i in range(4)
+        }
+        db.add_document("doc1", chunks)
+        self.assertEqual(
+            db.get_chunks("doc1", 1, 3, fields=["chunk_text", "chunk_page_end", "is_visual"]),
+            {
+                1: {"chunk_text": "Content of chunk 1", "chunk_page_end": 2, "is_visual": False},
+                2: {"chunk_text": "Content of chunk 2", "chunk_page_end": 3, "is_visual": False},
+            },
+        )
+        self.assertEqual(list(db.get_chunks("doc1", 2, 10)), [2, 3])
+        self.assertEqual(db.get_chunks("doc2", 0, 2), {})
+        with self.assertRaises(ValueError):
+            db.get_chunks("doc1", 0, 2, fields=["chunk_text", "doc_id"])
+
     def test__remove_document(self):
         db = BasicChunkDB(self.kb_id, self.storage_directory)
         doc_id = "doc1"
         chunks = {0: {"chunk_text": "Content of chunk 1"}}
         db.add_document(doc_id, chunks)
+        self.assertTrue(db.has_document(doc_id))
         db.remove_document(doc_id)
+        self.assertFalse(db.has_document(doc_id))
         self.assertNotIn(doc_id, db.data)
 
     def test__persistence(self):
@@ -145,6 +179,75 @@ class TestChunkDB(unittest.TestCase):
         db2 = BasicChunkDB(self.kb_id, self.storage_directory)
         self.assertIn(doc_id, db2.data)
 
+    def test__lazy_load(self):
+        db = BasicChunkDB(self.kb_id, self.storage_directory)
+        db.add_document("doc1", {0: {"chunk_text": "Content of chunk 1"}})
+
+        lazy_db = BasicChunkDB(self.kb_id, self.storage_directory, lazy_load=True)
+        self.assertIsNone(lazy_db._data)
+        self.assertEqual(lazy_db.get_chunk_text("doc1", 0), "Content of chunk 1")
+
+        prefetched_db = BasicChunkDB(self.kb_id, self.storage_directory, lazy_load=True)
+        prefetched_db.prefetch().join()
+        self.assertIn("doc1", prefetched_db._data)
+
+    def test__per_document_storage(self):
+        db = BasicChunkDB(self.kb_id, self.storage_directory)
+        db.add_document("doc1", {0: {"chunk_text": "Content of chunk 1"}}, supp_id="Supp ID 1")
+        db.add_documents([
+            {"doc_id": "doc2", "chunks": {0: {"chunk_text": "Content of chunk 2"}}},
+            {"doc_id": "doc/3", "chunks": {0: {"chunk_text": "Content of chunk 3"}}},
+        ])
+        self.assertEqual(len(os.listdir(db.storage_path)), 4)
+
+        reopened = BasicChunkDB(self.kb_id, self.storage_directory)
+        # document-level calls are answered from the manifest without loading any document
+        self.assertEqual(reopened.get_all_doc_ids(), ["doc1", "doc2", "doc/3"])
+        self.assertEqual(reopened.get_all_doc_ids("Supp ID 1"), ["doc1"])
+        self.assertEqual(reopened.get_total_num_characters(), 54)
+        self.assertEqual(reopened.data._loaded, {})
+        self.assertEqual(reopened.get_chunk_text("doc/3", 0), "Content of chunk 3")
+        self.assertEqual(list(reopened.data._loaded), ["doc/3"])
+
+        reopened.remove_document("doc2")
+        self.assertEqual(len(os.listdir(db.storage_path)), 3)
+        self.assertEqual(BasicChunkDB(self.kb_id, self.storage_directory).get_all_doc_ids(), ["doc1", "doc/3"])
+
+    def test__migrate_single_pickle(self):
+        db = BasicChunkDB(self.kb_id, self.storage_directory)
+        with open(db.legacy_storage_path, "wb") as f:
+            pickle.dump({"doc1": {0: {"chunk_text": "Content of chunk 1", "supp_id": "Supp ID 1"}}}, f)
+
+        reader = BasicChunkDB(self.kb_id, self.storage_directory, read_only=True)
+        self.assertEqual(reader.get_chunk_text("doc1", 0), "Content of chunk 1")
+        self.assertTrue(os.path.exists(db.legacy_storage_path))
+
+        migrated = BasicChunkDB(self.kb_id, self.storage_directory)
+        self.assertEqual(migrated.get_all_doc_ids("Supp ID 1"), ["doc1"])
+        self.assertFalse(os.path.exists(db.legacy_storage_path))
+        self.assertEqual(BasicChunkDB(self.kb_id, self.storage_directory).get_chunk_text("doc1", 0), "Content of chunk 1")
+
+    def test__read_only_serves_published_snapshots(self):
+        writer = BasicChunkDB(self.kb_id, self.storage_directory)
+        writer.add_document("doc1", {0: {"chunk_text": "Content of chunk 1", "document_title": "Title 1"}})
+        writer.publish()
+
+        reader = BasicChunkDB(self.kb_id, self.storage_directory, read_only=True)
+        self.assertEqual(reader.get_chunk_text("doc1", 0), "Content of chunk 1")
+        self.assertEqual(reader.get_document("doc1")["title"], "Title 1")
+        with self.assertRaises(ValueError):
+            reader.add_document("doc2", {0: {"chunk_text": "Content of chunk 2"}})
+
+        writer.add_document("doc2", {0: {"chunk_text": "Content of chunk 2"}})
+        self.assertFalse(reader.refresh())
+        self.assertEqual(reader.get_all_doc_ids(), ["doc1"])
+        writer.publish()
+        self.assertTrue(reader.refresh())
+        self.assertEqual(reader.get_chunk_text("doc2", 0), "Content of chunk 2")
+        self.assertEqual(reader.get_document_count(), 2)
+        writer.delete()
+        self.assertFalse(os.path.exists(writer.shared_storage_path))
+
     def test__save_and_load_from_dict(self):
         db = BasicChunkDB(self.kb_id, self.storage_directory)
         config = db.to_dict()
@@ -169,6 +272,8 @@ class TestSQLiteDB(unittest.TestCase):
     def setUp(self):
         self.storage_directory = "~/test__sqlite_db_dsRAG"
         self.kb_id = "test_kb"
+        # close the connections of earlier tests' databases, which remove their WAL files on close
+        gc.collect()
         resolved_test_storage_directory = os.path.expanduser(self.storage_directory)
         if os.path.exists(resolved_test_storage_directory):
             shutil.rmtree(resolved_test_storage_directory)
@@ -299,12 +404,69 @@ class TestSQLiteDB(unittest.TestCase):
         # There should only be one document with the supp_id 'Supp ID 1'
         self.assertEqual(len(docs), 1)
 
+    def test__add_documents(self):
+        db = SQLiteDB(self.kb_id, self.storage_directory)
+        db.add_documents([
+            {
+                "doc_id": f"doc{i}",
+                "chunks": {j: {"chunk_text": f"Chunk {j} of document {i}", "document_title": f"Title {i}"} for j in range(i + 1)},
+                "supp_id": "Supp ID 1" if i % 2 else "",
+                "metadata": {"index": i},
+            }
+            for i in range(3)
+        ])
+        self.assertEqual(sorted(db.get_all_doc_ids()), ["doc0", "doc1", "doc2"])
+        self.assertEqual(db.get_all_doc_ids("Supp ID 1"), ["doc1"])
+        document = db.get_document("doc2", include_content=True)
+        self.assertEqual(document["title"], "Title 2")
+        self.assertEqual(document["chunk_count"], 3)
+        self.assertEqual(document["metadata"], {"index": 2})
+        self.assertEqual(document["content"], "Chunk 0 of document 2\nChunk 1 of document 2\nChunk 2 of document 2")
+
+        # re-adding a document replaces its chunks rather than duplicating them
+        db.add_documents([{"doc_id": "doc2", "chunks": {0: {"chunk_text": "Replaced"}}}])
+        self.assertEqual(db.get_chunk_text("doc2", 0), "Replaced")
+        self.assertEqual(db.get_document("doc2")["chunk_count"], 1)
+        self.assertEqual(db.get_document_count(), 3)
+
+    def test__readd_shorter_document(self):
+        db = SQLiteDB(self.kb_id, self.storage_directory)
+        db.add_document("doc1", {i: {"chunk_text": f"t{i}"} for i in range(3)})
+        db.add_document("doc2", {0: {"chunk_text": "other"}})
+        db.add_document("doc1", {0: {"chunk_text": "new t0"}})
+        # the old chunks past the new document's end are gone, not mixed in with the new ones
+        self.assertEqual(db.get_chunks("doc1", 0, 5, fields=["chunk_text"]), {0: {"chunk_text": "new t0"}})
+        self.assertIsNone(db.get_chunk_text("doc1", 1))
+        document = db.get_document("doc1", include_content=True)
+        self.assertEqual(document["content"], "new t0")
+        self.assertEqual(document["chunk_count"], 1)
+        self.assertEqual(db.get_chunk_text("doc2", 0), "other")
+
+    def test__get_chunks(self):
+        db = SQLiteDB(self.kb_id, self.storage_directory)
+        chunks = {
+            i: {"chunk_text": f"Content of chunk {i}", "document_title": "Title", "is_visual": i == 2}
+            for i in range(4)
+        }
+        db.add_document("doc1", chunks)
+        db.add_document("doc2", {0: {"chunk_text": "Other document"}})
+        result = db.get_chunks("doc1", 1, 3, fields=["chunk_text", "document_title", "is_visual"])
+        self.assertEqual(list(result), [1, 2])
+        self.assertEqual(result[1]["chunk_text"], "Content of chunk 1")
+        self.assertEqual(result[1]["document_title"], "Title")
+        self.assertFalse(result[1]["is_visual"])
+        self.assertTrue(result[2]["is_visual"])
+        self.assertEqual(list(db.get_chunks("doc1", 3, 10)), [3])
+        self.assertEqual(db.get_chunks("doc1", 2, 2), {})
+
     def test__remove_document(self):
         db = SQLiteDB(self.kb_id, self.storage_directory)
         doc_id = "doc1"
         chunks = {0: {"chunk_text": "Content of chunk 1"}}
         db.add_document(doc_id, chunks)
+        self.assertTrue(db.has_document(doc_id))
         db.remove_document(doc_id)
+        self.assertFalse(db.has_document(doc_id))
         results = db.get_document(doc_id)
         # Make sure the document does not exist, it should just be None
         self.assertIsNone(results)
@@ -327,6 +489,170 @@ class TestSQLiteDB(unittest.TestCase):
         # Make sure the storage directory does not exist
         self.assertFalse(os.path.exists(os.path.join(db.db_path, f"{self.kb_id}.db")))
 
+    def test__migrate_unindexed_schema(self):
+        # a database written before the schema was versioned: no indexes, no document_info table,
+        # and a document that was added twice
+        db_path = os.path.join(os.path.expanduser(self.storage_directory), "chunk_storage")
+        os.makedirs(db_path, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(db_path, f"{self.kb_id}.db"))
+        conn.execute(
+            "CREATE TABLE documents (doc_id TEXT, document_title TEXT, document_summary TEXT, "
+            "chunk_text TEXT, chunk_index INT, chunk_length INT, created_on TEXT, supp_id TEXT, metadata TEXT)"
+        )
+        rows = [
+            ("doc1", "Title 1", "Summary 1", "Old chunk 1", 0, 11, "1", "supp1", None),
+            ("doc1", "Title 1", "Summary 1", "Chunk 1", 0, 7, "2", "supp1", None),
+            ("doc1", "Title 1", "Summary 1", "Chunk 2", 1, 7, "2", "supp1", None),
+            ("doc2", "Title 2", "Summary 2", "Chunk 1", 0, 7, "2", "", None),
+        ]
+        conn.executemany("INSERT INTO documents VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        conn.commit()
+        conn.close()
+
+        db = SQLiteDB(self.kb_id, self.storage_directory)
+        with db.get_connection() as conn:
+            self.assertEqual(conn.execute("PRAGMA user_version").fetchone()[0], SCHEMA_VERSION)
+            plan = conn.execute(
+                "EXPLAIN QUERY PLAN SELECT chunk_text FROM documents WHERE doc_id=? AND chunk_index=?",
+                ("doc1", 0),
+            ).fetchall()
+        self.assertIn("documents_doc_id_chunk_index", str(plan))
+        self.assertEqual(db.get_chunk_text("doc1", 0), "Chunk 1")
+        document = db.get_document("doc1", include_content=True)
+        self.assertEqual(document["title"], "Title 1")
+        self.assertEqual(document["chunk_count"], 2)
+        self.assertEqual(document["content"], "Chunk 1\nChunk 2")
+        self.assertEqual(db.get_all_doc_ids(), ["doc1", "doc2"])
+        self.assertEqual(db.get_all_doc_ids(supp_id="supp1"), ["doc1"])
+        self.assertEqual(db.get_document_count(), 2)
+
+        # re-adding a document replaces its chunks instead of duplicating them
+        db.add_document("doc2", {0: {"chunk_text": "New chunk 1", "document_title": "New title 2"}})
+        self.assertEqual(db.get_chunk_text("doc2", 0), "New chunk 1")
+        self.assertEqual(db.get_document("doc2")["title"], "New title 2")
+        self.assertEqual(db.get_document_count(), 2)
+        db.remove_document("doc2")
+        self.assertEqual(db.get_all_doc_ids(), ["doc1"])
+
+    def test__thread_local_connections(self):
+        db = SQLiteDB(self.kb_id, self.storage_directory, mmap_size=1024 * 1024)
+        db.add_document("doc1", {0: {"chunk_text": "Content of chunk 1"}})
+        with db.get_connection() as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+            self.assertEqual(conn.execute("PRAGMA synchronous").fetchone()[0], 1)  # NORMAL
+        # the same connection serves every call from this thread
+        with db.get_connection() as conn2:
+            self.assertIs(conn, conn2)
+
+        other_thread_results = []
+
+        def read_from_other_thread():
+            with db.get_connection() as other_conn:
+                other_thread_results.append(other_conn is conn)
+            other_thread_results.append(db.get_chunk_text("doc1", 0))
+
+        thread = threading.Thread(target=read_from_other_thread)
+        thread.start()
+        thread.join()
+        self.assertEqual(other_thread_results, [False, "Content of chunk 1"])
+        self.assertEqual(ChunkDB.from_dict(db.to_dict()).mmap_size, 1024 * 1024)
+
+class TestCachedChunkDB(unittest.TestCase):
+    def setUp(self):
+        self.storage_directory = "~/test__cached_chunk_db_dsRAG"
+        resolved_test_storage_directory = os.path.expanduser(self.storage_directory)
+        if os.path.exists(resolved_test_storage_directory):
+            shutil.rmtree(resolved_test_storage_directory)
+        self.chunk_db = SQLiteDB("test_kb", self.storage_directory)
+        self.db = CachedChunkDB(self.chunk_db)
+        self.db.add_document("doc1", {
+            i: {"chunk_text": f"chunk {i}", "document_title": "Title", "chunk_page_start": i, "chunk_page_end": i}
+            for i in range(4)
+        })
+
+    def tearDown(self):
+        self.db.delete()
+        shutil.rmtree(os.path.expanduser(self.storage_directory), ignore_errors=True)
+
+    def test__get_chunks_read_through(self):
+        expected = self.chunk_db.get_chunks("doc1", 0, 5)
+        with unittest.mock.patch.object(self.chunk_db, "get_chunks", wraps=self.chunk_db.get_chunks) as get_chunks:
+            self.assertEqual(self.db.get_chunks("doc1", 0, 5), expected)
+            self.assertEqual(self.db.get_chunks("doc1", 1, 3, fields=["chunk_text"]), {
+                1: {"chunk_text": "chunk 1"}, 2: {"chunk_text": "chunk 2"},
+            })
+            # only the uncached tail of the range is fetched, with only the uncached field
+            self.assertEqual(self.db.get_chunks("doc1", 2, 4, fields=["chunk_text"]), {
+                2: {"chunk_text": "chunk 2"}, 3: {"chunk_text": "chunk 3"},
+            })
+        # chunk 4 doesn't exist, so the first range keeps missing it
+        self.assertEqual(get_chunks.call_count, 1)
+        self.assertEqual(self.db.cache_stats()["entries"], 4 * len(expected[0]))
+
+    def test__single_getters(self):
+        with unittest.mock.patch.object(self.chunk_db, "get_chunk_text", wraps=self.chunk_db.get_chunk_text) as getter:
+            self.assertEqual(self.db.get_chunk_text("doc1", 1), "chunk 1")
+            self.assertEqual(self.db.get_chunk_text("doc1", 1), "chunk 1")
+            self.assertIsNone(self.db.get_chunk_text("doc1", 10))
+        self.assertEqual(getter.call_count, 2)
+        self.assertEqual(self.db.get_chunk_page_numbers("doc1", 2), (2, 2))
+        stats = self.db.cache_stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (1, 3, 3))
+        # a missing chunk cached by a getter is still left out of get_chunks
+        self.assertEqual(self.db.get_chunks("doc1", 10, 11), {})
+
+    def test__aget_chunks(self):
+        expected = self.chunk_db.get_chunks("doc1", 0, 4, fields=["chunk_text"])
+        with unittest.mock.patch.object(self.chunk_db, "get_chunks", wraps=self.chunk_db.get_chunks) as get_chunks:
+            self.assertEqual(asyncio.run(self.db.aget_chunks("doc1", 0, 4, fields=["chunk_text"])), expected)
+            # served from the cache without going through the wrapped ChunkDB again
+            self.assertEqual(asyncio.run(self.db.aget_chunks("doc1", 1, 3, fields=["chunk_text"])), {
+                1: {"chunk_text": "chunk 1"}, 2: {"chunk_text": "chunk 2"},
+            })
+        self.assertEqual(get_chunks.call_count, 1)
+
+    def test__invalidated_on_add_and_remove(self):
+        self.assertEqual(self.db.get_chunk_text("doc1", 0), "chunk 0")
+        self.db.add_document("doc1", {0: {"chunk_text": "new chunk 0"}})
+        self.assertEqual(self.db.get_chunk_text("doc1", 0), "new chunk 0")
+        self.assertEqual(self.db.get_chunks("doc1", 0, 1, fields=["chunk_text"]), {0: {"chunk_text": "new chunk 0"}})
+        self.db.remove_document("doc1")
+        self.assertFalse(self.db.has_document("doc1"))
+        self.assertIsNone(self.db.get_chunk_text("doc1", 0))
+        self.assertEqual(self.db.get_chunks("doc1", 0, 1), {})
+        self.assertEqual(self.db.cache_stats()["entries"], 1)
+
+    def test__document_methods_delegate(self):
+        self.assertEqual(self.db.get_document("doc1"), self.chunk_db.get_document("doc1"))
+        self.assertEqual(
+            self.db.get_document("doc1", include_content=True),
+            self.chunk_db.get_document("doc1", include_content=True),
+        )
+        self.assertIn("chunk 0", self.db.get_document("doc1", include_content=True)["content"])
+        self.assertEqual(self.db.get_document_count(), 1)
+
+    def test__bounded(self):
+        db = CachedChunkDB(self.chunk_db, max_entries=3)
+        db.get_chunks("doc1", 0, 4, fields=["chunk_text"])
+        self.assertEqual(db.cache_stats()["entries"], 3)
+        self.assertEqual(db.cache_stats()["evictions"], 1)
+
+        db = CachedChunkDB(self.chunk_db, max_bytes=sys.getsizeof("chunk 0") + 250)
+        db.get_chunks("doc1", 0, 4, fields=["chunk_text"])
+        self.assertEqual(db.cache_stats()["entries"], 1)
+        self.assertLessEqual(db.cache_stats()["bytes"], db.max_bytes)
+        with self.assertRaises(ValueError):
+            CachedChunkDB(self.chunk_db, max_entries=0)
+
+    def test__save_and_load_from_dict(self):
+        config = CachedChunkDB(self.chunk_db, max_entries=10).to_dict()
+        db = ChunkDB.from_dict(config)
+        self.assertIsInstance(db, CachedChunkDB)
+        self.assertIsInstance(db.chunk_db, SQLiteDB)
+        self.assertEqual(db.max_entries, 10)
+        self.assertEqual(db.get_chunk_text("doc1", 3), "chunk 3")
+
+
 class TestDynamoDB(unittest.TestCase):
 
     @classmethod
@@ -459,7 +785,9 @@ class TestDynamoDB(unittest.TestCase):
         doc_id = "doc1"
         chunks = {0: {"chunk_text": "Content of chunk 1"}}
         self.db.add_document(doc_id, chunks)
+        self.assertTrue(self.db.has_document(doc_id))
         self.db.remove_document(doc_id)
+        self.assertFalse(self.db.has_document(doc_id))
         results = self.db.get_document(doc_id)
         # Make sure the document does not exist, it should just be None
         self.assertIsNone(results)
@@ -474,6 +802,115 @@ class TestDynamoDB(unittest.TestCase):
         assert db2.kb_id == db.kb_id, "Failed to load kb_id from dict."
         self.assertEqual(db2.kb_id, db.kb_id)
 
+@unittest.skipUnless(mock_aws is not None, "moto is not installed")
+class TestDynamoDBLocal(unittest.TestCase):
+    """The DynamoDB chunk DB against moto's in-memory DynamoDB."""
+
+    def setUp(self):
+        self.env = unittest.mock.patch.dict(os.environ, {
+            "AWS_REGION": "us-east-1",
+            "AWS_DYNAMO_ACCESS_KEY": "testing",
+            "AWS_DYNAMO_SECRET_KEY": "testing",
+        })
+        self.env.start()
+        self.mock = mock_aws()
+        self.mock.start()
+        self.db = DynamoDB("test_dynamo_db_local")
+        for doc_id in ["doc1", "doc2"]:
+            chunks = {
+                i: {"chunk_text": f"{doc_id} chunk {i}", "chunk_page_start": i + 1, "chunk_page_end": i + 1}
+                for i in range(3)
+            }
+            self.db.add_document(doc_id, chunks, supp_id="supp")
+
+    def tearDown(self):
+        self.mock.stop()
+        self.env.stop()
+
+    def test__table_cached_per_thread(self):
+        table = self.db.table
+        self.assertIs(self.db.table, table)
+        other = []
+        thread = threading.Thread(target=lambda: other.append(self.db.table))
+        thread.start()
+        thread.join()
+        self.assertIsNot(other[0], table)
+
+    def test__delete_resets_table_status(self):
+        self.assertEqual(self.db.check_table_status(), "ACTIVE")
+        table = self.db.table
+        self.db.delete()
+        self.assertIsNot(self.db.table, table)
+        self.assertNotEqual(self.db.check_table_status(), "ACTIVE")
+
+    def test__get_chunks(self):
+        chunks = self.db.get_chunks("doc1", 1, 3, fields=["chunk_text", "chunk_page_start"])
+        self.assertEqual(
+            chunks,
+            {
+                1: {"chunk_text": "doc1 chunk 1", "chunk_page_start": 2},
+                2: {"chunk_text": "doc1 chunk 2", "chunk_page_start": 3},
+            },
+        )
+        self.assertEqual(self.db.get_chunk_text("doc2", 0), "doc2 chunk 0")
+
+    def test__get_chunks_by_keys(self):
+        with unittest.mock.patch("dsrag.database.chunk.dynamo_db.BATCH_GET_MAX_KEYS", 2):
+            chunks = self.db.get_chunks_by_keys(
+                [("doc1", 2), ("doc2", 0), ("doc2", 0), ("doc3", 0), ("doc2", 1)], fields=["chunk_text"]
+            )
+        self.assertEqual(
+            chunks,
+            {
+                ("doc1", 2): {"chunk_text": "doc1 chunk 2"},
+                ("doc2", 0): {"chunk_text": "doc2 chunk 0"},
+                ("doc2", 1): {"chunk_text": "doc2 chunk 1"},
+            },
+        )
+
+    def test__get_chunks_by_keys_retries_unprocessed_keys(self):
+        resource = self.db._resources()[0]
+        batch_get_item = resource.meta.client.batch_get_item
+        calls = []
+
+        def throttled(RequestItems):
+            # leave the last key of the first request unprocessed
+            calls.append(RequestItems)
+            if len(calls) > 1:
+                return batch_get_item(RequestItems=RequestItems)
+            request = RequestItems[self.db.table_name]
+            response = batch_get_item(RequestItems={self.db.table_name: {**request, "Keys": request["Keys"][:-1]}})
+            response["UnprocessedKeys"] = {self.db.table_name: {**request, "Keys": request["Keys"][-1:]}}
+            return response
+
+        with unittest.mock.patch.object(resource, "batch_get_item", side_effect=throttled), \
+                unittest.mock.patch("dsrag.database.chunk.dynamo_db.BATCH_GET_RETRY_DELAY", 0):
+            chunks = self.db.get_chunks_by_keys([("doc1", 0), ("doc1", 1)], fields=["chunk_text"])
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(set(chunks), {("doc1", 0), ("doc1", 1)})
+
+    def test__remove_document(self):
+        self.assertTrue(self.db.has_document("doc1"))
+        self.db.remove_document("doc1")
+        self.assertFalse(self.db.has_document("doc1"))
+        self.assertTrue(self.db.has_document("doc2"))
+        self.assertIsNone(self.db.get_chunk_text("doc1", 0))
+        self.assertEqual(self.db.get_chunk_text("doc2", 0), "doc2 chunk 0")
+
+
+class TestPostgresConnectionPool(unittest.TestCase):
+    # min_connections=0 creates the pools without connecting to a server
+
+    def test__shared_per_server(self):
+        pool = get_connection_pool("localhost", 5432, "db", "user", "password", min_connections=0)
+        self.assertIs(get_connection_pool("localhost", "5432", "db", "user", "password", min_connections=0), pool)
+        self.assertIsNot(get_connection_pool("localhost", 5432, "other_db", "user", "password", min_connections=0), pool)
+
+    def test__invalid_size(self):
+        with self.assertRaises(ValueError):
+            PostgresConnectionPool("localhost", 5432, "db", "user", "password", min_connections=5, max_connections=2)
+
+
 @pytest.mark.skipif(reason="Postgres is not available on GitHub Actions")
 class TestPostgresChunkDB(unittest.TestCase):
     
@@ -564,7 +1001,9 @@ class TestPostgresChunkDB(unittest.TestCase):
         self.assertEqual(len(docs), 1)
 
     def test__009_remove_document(self):
+        self.assertTrue(self.db.has_document(self.doc_id))
         self.db.remove_document(self.doc_id)
+        self.assertFalse(self.db.has_document(self.doc_id))
         results = self.db.get_document(self.doc_id)
         # Make sure the document does not exist, it should just be None
         self.assertIsNone(results)
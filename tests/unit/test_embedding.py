@@ -1,6 +1,11 @@
 import sys
 import os
+import asyncio
+import shutil
+import tempfile
 import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "../.."))
 
@@ -9,7 +14,27 @@ from dsrag.embedding import (
     CohereEmbedding,
     OllamaEmbedding,
     Embedding,
+    CachedEmbedding,
 )
+from dsrag.utils.async_utils import LoopLocal
+
+
+class CountingEmbedding(Embedding):
+    def __init__(self, model: str = "counting", dimension: int = 3):
+        super().__init__(dimension)
+        self.model = model
+        self.calls = []
+
+    def get_embeddings(self, text, input_type=None):
+        self.calls.append(text)
+        if isinstance(text, str):
+            return [float(len(text)), 0.5, 1 / 3]
+        return [[float(len(t)), 0.5, 1 / 3] for t in text]
+
+    def to_dict(self):
+        base_dict = super().to_dict()
+        base_dict.update({"model": self.model})
+        return base_dict
 
 
 class TestEmbedding(unittest.TestCase):
@@ -118,5 +143,112 @@ class TestEmbedding(unittest.TestCase):
         self.assertEqual(embedding_instance.dimension, 1024)
 
 
+class FakeAsyncOpenAI:
+    """Stands in for `openai.AsyncOpenAI`, recording the embedding requests."""
+
+    def __init__(self):
+        self.requests = []
+        self.embeddings = SimpleNamespace(create=self.create)
+
+    async def create(self, **kwargs):
+        self.requests.append(kwargs)
+        return SimpleNamespace(data=[SimpleNamespace(embedding=[float(len(text))]) for text in kwargs["input"]])
+
+
+class TestAsyncEmbedding(unittest.TestCase):
+    def test__aget_embeddings_default(self):
+        model = CountingEmbedding()
+        self.assertEqual(
+            asyncio.run(model.aget_embeddings(["a", "bb"], input_type="query")),
+            model.get_embeddings(["a", "bb"], input_type="query"),
+        )
+
+    @patch.dict(os.environ, {"OPENAI_API_KEY": "test"})
+    def test__aget_embeddings_openai(self):
+        embedding_provider = OpenAIEmbedding("text-embedding-3-small", 768)
+        client = FakeAsyncOpenAI()
+        embedding_provider._async_clients = LoopLocal(lambda: client)
+        embeddings = asyncio.run(embedding_provider.aget_embeddings(["a", "bb"], input_type="query"))
+        self.assertEqual(embeddings, [[1.0], [2.0]])
+        self.assertEqual(client.requests, [
+            {"input": ["a", "bb"], "model": "text-embedding-3-small", "dimensions": 768},
+        ])
+
+    def test__aget_embeddings_cached(self):
+        model = CountingEmbedding()
+        embedding = CachedEmbedding(model)
+        embedding.get_embeddings(["a"], input_type="query")
+        embeddings = asyncio.run(embedding.aget_embeddings(["a", "bb", "a"], input_type="query"))
+        self.assertEqual(embeddings, model.get_embeddings(["a", "bb", "a"]))
+        # the async path shares the cache with the sync one
+        self.assertEqual(model.calls[:2], [["a"], ["bb"]])
+        self.assertEqual(embedding.cache_stats(), {"hits": 2, "misses": 2, "entries": 2})
+
+
+class TestCachedEmbedding(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def test__cache_hits(self):
+        model = CountingEmbedding()
+        embedding = CachedEmbedding(model)
+        first = embedding.get_embeddings(["What is RSE?", "hello"], input_type="query")
+        # cached queries are matched after whitespace normalization; only "new" is embedded
+        second = embedding.get_embeddings(["  What is   RSE?", "new", "new"], input_type="query")
+        self.assertEqual(model.calls, [["What is RSE?", "hello"], ["new"]])
+        self.assertEqual(second[0], first[0])
+        self.assertEqual(second[1], second[2])
+        self.assertEqual(embedding.get_embeddings("hello", input_type="query"), first[1])
+        self.assertEqual(embedding.cache_stats(), {"hits": 3, "misses": 3, "entries": 3})
+
+        # documents are passed through uncached by default
+        embedding.get_embeddings(["hello"], input_type="document")
+        embedding.get_embeddings(["hello"], input_type="document")
+        self.assertEqual(model.calls[-2:], [["hello"], ["hello"]])
+
+    def test__lru_and_ttl(self):
+        model = CountingEmbedding()
+        embedding = CachedEmbedding(model, max_entries=2, ttl_seconds=60)
+        with patch("dsrag.embedding.time.time", return_value=1000.0):
+            embedding.get_embeddings(["a", "b"], input_type="query")
+            embedding.get_embeddings(["a"], input_type="query")
+            embedding.get_embeddings(["c"], input_type="query")
+            # "b" was the least recently used
+            embedding.get_embeddings(["a", "b"], input_type="query")
+        self.assertEqual(model.calls, [["a", "b"], ["c"], ["b"]])
+        with patch("dsrag.embedding.time.time", return_value=1061.0):
+            embedding.get_embeddings(["b"], input_type="query")
+        self.assertEqual(model.calls[-1], ["b"])
+
+    def test__disk_tier_shared(self):
+        cache_path = os.path.join(self.cache_dir, "embeddings.db")
+        model = CountingEmbedding()
+        CachedEmbedding(model, cache_path=cache_path).get_embeddings(["a", "bb"], input_type="query")
+        other_model = CountingEmbedding()
+        other = CachedEmbedding(other_model, cache_path=cache_path)
+        self.assertEqual(
+            other.get_embeddings(["bb", "a"], input_type="query"),
+            [[2.0, 0.5, 1 / 3], [1.0, 0.5, 1 / 3]],
+        )
+        self.assertEqual(other_model.calls, [])
+        # a different model (or dimension) doesn't share entries
+        different = CountingEmbedding(model="other")
+        CachedEmbedding(different, cache_path=cache_path).get_embeddings(["a"], input_type="query")
+        self.assertEqual(different.calls, [["a"]])
+
+    def test__save_and_load_from_dict(self):
+        cache_path = os.path.join(self.cache_dir, "embeddings.db")
+        embedding = CachedEmbedding(CountingEmbedding(dimension=3), max_entries=5, cache_path=cache_path)
+        loaded = Embedding.from_dict(embedding.to_dict())
+        self.assertIsInstance(loaded, CachedEmbedding)
+        self.assertIsInstance(loaded.embedding_model, CountingEmbedding)
+        self.assertEqual(loaded.dimension, 3)
+        self.assertEqual(loaded.max_entries, 5)
+        self.assertEqual(loaded.cache_path, cache_path)
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
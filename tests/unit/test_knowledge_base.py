@@ -0,0 +1,195 @@
+import asyncio
+import hashlib
+import os
+import shutil
+import unittest
+
+import numpy as np
+
+from dsrag.knowledge_base import KnowledgeBase
+from dsrag.database.chunk import SQLiteDB
+from dsrag.database.vector import BasicVectorDB
+from dsrag.embedding import Embedding
+from dsrag.llm import LLM
+from dsrag.query_cache import QueryCache
+from dsrag.reranker import NoReranker
+
+
+class StubEmbedding(Embedding):
+    """Deterministic offline embeddings that record every `get_embeddings` call."""
+
+    def __init__(self, dimension: int = 8):
+        super().__init__(dimension)
+        self.calls = []
+
+    def get_embeddings(self, text, input_type=None):
+        texts = [text] if isinstance(text, str) else list(text)
+        self.calls.append((texts, input_type))
+        embeddings = []
+        for t in texts:
+            seed = int.from_bytes(hashlib.sha256(t.encode()).digest()[:4], "little")
+            vector = np.random.default_rng(seed).random(self.dimension)
+            embeddings.append((vector / np.linalg.norm(vector)).tolist())
+        return embeddings
+
+    def to_dict(self):
+        return {**super().to_dict(), "dimension": self.dimension}
+
+
+class StubLLM(LLM):
+    def make_llm_call(self, chat_messages, **kwargs):
+        return ""
+
+
+AUTO_CONTEXT_CONFIG = {"use_generated_title": False, "get_document_summary": False, "get_section_summaries": False}
+SEMANTIC_SECTIONING_CONFIG = {"use_semantic_sectioning": False}
+
+
+class KnowledgeBaseTestCase(unittest.TestCase):
+    """Sets up a local KB with three documents, embedded offline by `StubEmbedding`."""
+
+    def setUp(self):
+        self.storage_directory = os.path.expanduser("~/test__knowledge_base_dsRAG")
+        shutil.rmtree(self.storage_directory, ignore_errors=True)
+        self.embedding_model = StubEmbedding()
+        self.kb = self.create_kb("test_kb")
+        self.add_documents(self.kb, ["doc1", "doc2", "doc3"])
+        self.embedding_model.calls.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.storage_directory, ignore_errors=True)
+
+    def create_kb(self, kb_id: str, **kwargs) -> KnowledgeBase:
+        return KnowledgeBase(
+            kb_id,
+            storage_directory=self.storage_directory,
+            embedding_model=self.embedding_model,
+            reranker=NoReranker(),
+            auto_context_model=StubLLM(),
+            chunk_db=SQLiteDB(kb_id, self.storage_directory),
+            vector_db=BasicVectorDB(kb_id, self.storage_directory),
+            exists_ok=False,
+            **kwargs,
+        )
+
+    def document(self, doc_id: str) -> dict:
+        return {
+            "doc_id": doc_id,
+            "text": " ".join(f"{doc_id} sentence {i}." for i in range(400)),
+            "document_title": doc_id,
+            "auto_context_config": AUTO_CONTEXT_CONFIG,
+            "semantic_sectioning_config": SEMANTIC_SECTIONING_CONFIG,
+        }
+
+    def add_documents(self, kb: KnowledgeBase, doc_ids: list[str]) -> None:
+        kb.add_documents(
+            [self.document(doc_id) for doc_id in doc_ids],
+            show_progress=False,
+            rate_limit_pause=0,
+        )
+
+    def ranked_chunks(self, all_ranked_results: list) -> list:
+        return [
+            [(result["metadata"]["doc_id"], result["metadata"]["chunk_index"]) for result in ranked_results]
+            for ranked_results in all_ranked_results
+        ]
+
+
+class TestKnowledgeBaseQuery(KnowledgeBaseTestCase):
+    def test_search_queries_embedded_in_one_call(self):
+        search_queries = ["first query", "second query", "third query"]
+        self.kb.query(search_queries)
+        self.assertEqual(self.embedding_model.calls, [(search_queries, "query")])
+
+    def test_search_query_batches_keep_order(self):
+        search_queries = [f"query {i}" for i in range(51)]
+        all_ranked_results = self.kb._get_all_ranked_results(search_queries)
+        self.assertEqual(
+            [(len(texts), input_type) for texts, input_type in self.embedding_model.calls],
+            [(50, "query"), (1, "query")],
+        )
+        self.assertEqual(len(all_ranked_results), len(search_queries))
+        # each query's results are the ones it gets when searched on its own
+        self.assertEqual(
+            self.ranked_chunks(all_ranked_results),
+            self.ranked_chunks([self.kb._search(query, 200) for query in search_queries]),
+        )
+
+    def test_aquery_matches_query(self):
+        search_queries = ["first query", "second query"]
+        for return_mode in ("text", "dynamic"):
+            results = self.kb.query(search_queries, return_mode=return_mode)
+            self.assertTrue(results)
+            self.assertEqual(asyncio.run(self.kb.aquery(search_queries, return_mode=return_mode)), results)
+
+    def test_concurrent_aqueries(self):
+        all_search_queries = [["first query"], ["second query", "third query"], ["first query"]]
+
+        async def run_queries():
+            return await asyncio.gather(*[self.kb.aquery(search_queries) for search_queries in all_search_queries])
+
+        self.assertEqual(
+            asyncio.run(run_queries()),
+            [self.kb.query(search_queries) for search_queries in all_search_queries],
+        )
+
+    def test_aquery_invalid_rse_params(self):
+        with self.assertRaisesRegex(ValueError, "Invalid rse_params preset name"):
+            asyncio.run(self.kb.aquery(["first query"], rse_params="unknown"))
+
+
+
+class TestKnowledgeBaseQueryCache(KnowledgeBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.query_cache = QueryCache()
+
+    def doc_ids(self, results: list[dict]) -> set:
+        return {segment["doc_id"] for segment in results}
+
+    def test_add_and_delete_document_invalidate(self):
+        kb = self.create_kb("cached_kb", query_cache=self.query_cache)
+        self.add_documents(kb, ["doc1", "doc2"])
+        search_queries = ["doc3 sentence 1.", "doc3 sentence 2."]
+        results = kb.query(search_queries)
+        self.embedding_model.calls.clear()
+        self.assertEqual(kb.query(search_queries), results)
+        self.assertEqual(self.embedding_model.calls, [])
+
+        kb.add_document(**self.document("doc3"))
+        self.embedding_model.calls.clear()
+        results_with_doc3 = kb.query(search_queries)
+        self.assertEqual(len(self.embedding_model.calls), 1)
+        self.assertIn("doc3", self.doc_ids(results_with_doc3))
+
+        kb.delete_document("doc3")
+        self.embedding_model.calls.clear()
+        self.assertEqual(kb.query(search_queries), results)
+        self.assertEqual(len(self.embedding_model.calls), 1)
+        self.assertEqual(self.query_cache.stats()["hits"], 1)
+        # the generation is persisted with the KB metadata
+        self.assertEqual(KnowledgeBase("cached_kb", storage_directory=self.storage_directory).kb_metadata["generation"], 3)
+
+    def test_shared_cache_keeps_kbs_apart(self):
+        kb_a = self.create_kb("kb_a", query_cache=self.query_cache)
+        self.add_documents(kb_a, ["doc_a"])
+        kb_b = self.create_kb("kb_b", query_cache=self.query_cache)
+        self.add_documents(kb_b, ["doc_b"])
+        search_queries = ["sentence 1."]
+
+        self.assertEqual(self.doc_ids(kb_a.query(search_queries)), {"doc_a"})
+        self.assertEqual(self.doc_ids(kb_b.query(search_queries)), {"doc_b"})
+        self.assertEqual(self.doc_ids(asyncio.run(kb_b.aquery(search_queries))), {"doc_b"})
+        self.assertEqual(self.doc_ids(asyncio.run(kb_a.aquery(search_queries))), {"doc_a"})
+        self.assertEqual(self.query_cache.stats()["hits"], 2)
+
+        # a KB created again with the same kb_id starts over at generation 0, but doesn't get the old results
+        kb_a.delete()
+        kb_a = self.create_kb("kb_a", query_cache=self.query_cache)
+        self.add_documents(kb_a, ["doc_c"])
+        self.assertEqual(kb_a.kb_metadata["generation"], 1)
+        self.assertEqual(self.doc_ids(kb_a.query(search_queries)), {"doc_c"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import unittest.mock
+
+from dsrag.query_cache import QueryCache, get_query_cache_key
+
+
+RESULTS = [{"doc_id": "doc1", "chunk_start": 0, "chunk_end": 2, "content": "text", "score": 0.5}]
+
+
+class TestQueryCache(unittest.TestCase):
+    def test_get_returns_copies(self):
+        cache = QueryCache()
+        cache.put("key", 0, RESULTS)
+        results = cache.get("key", 0)
+        self.assertEqual(results, RESULTS)
+        results[0]["content"] = "changed"
+        self.assertEqual(cache.get("key", 0), RESULTS)
+
+    def test_generation_invalidates(self):
+        cache = QueryCache()
+        cache.put("key", 1, RESULTS)
+        self.assertIsNone(cache.get("key", 2))
+        # the stale entry is dropped rather than kept around for its old generation
+        self.assertIsNone(cache.get("key", 1))
+        self.assertEqual(cache.stats()["entries"], 0)
+
+    def test_ttl(self):
+        cache = QueryCache(ttl=10)
+        with unittest.mock.patch("dsrag.query_cache.time.monotonic", return_value=100.0):
+            cache.put("key", 0, RESULTS)
+        with unittest.mock.patch("dsrag.query_cache.time.monotonic", return_value=105.0):
+            self.assertEqual(cache.get("key", 0), RESULTS)
+        with unittest.mock.patch("dsrag.query_cache.time.monotonic", return_value=111.0):
+            self.assertIsNone(cache.get("key", 0))
+
+    def test_lru_eviction_and_stats(self):
+        cache = QueryCache(max_entries=2)
+        cache.put("a", 0, RESULTS)
+        cache.put("b", 0, RESULTS)
+        cache.get("a", 0)
+        cache.put("c", 0, RESULTS)
+        self.assertIsNone(cache.get("b", 0))
+        self.assertIsNotNone(cache.get("a", 0))
+        self.assertEqual(cache.stats(), {
+            "hits": 2, "misses": 1, "evictions": 1, "entries": 2, "hit_ratio": 2 / 3,
+        })
+
+    def test_invalid_size_raises(self):
+        with self.assertRaisesRegex(ValueError, "Invalid query cache"):
+            QueryCache(max_entries=0)
+        with self.assertRaisesRegex(ValueError, "Invalid query cache"):
+            QueryCache(ttl=0)
+
+    def test_cache_key_ignores_dict_order(self):
+        self.assertEqual(
+            get_query_cache_key("kb", "1", ["q"], {"max_length": 5, "decay_rate": 0.1}, None, "text", 200),
+            get_query_cache_key("kb", "1", ["q"], {"decay_rate": 0.1, "max_length": 5}, None, "text", 200),
+        )
+        self.assertNotEqual(
+            get_query_cache_key("kb", "1", ["q"], {}, None, "text", 200),
+            get_query_cache_key("kb", "1", ["q"], {}, None, "text", 100),
+        )
+
+    def test_cache_key_includes_kb(self):
+        key = get_query_cache_key("kb", "1", ["q"], {}, None, "text", 200)
+        self.assertNotEqual(key, get_query_cache_key("other_kb", "1", ["q"], {}, None, "text", 200))
+        self.assertNotEqual(key, get_query_cache_key("kb", "2", ["q"], {}, None, "text", 200))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,28 @@
 import sys
 import os
+import asyncio
+import importlib.util
 import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
 sys.path.append(os.path.join(os.path.dirname(__file__), '../..'))
 
 from dsrag.reranker import Reranker, CohereReranker, NoReranker
+from dsrag.utils.async_utils import LoopLocal
+
+
+class FakeAsyncRerankClient:
+    """Stands in for an async rerank client, ranking the second document first."""
+
+    def __init__(self):
+        self.requests = []
+
+    async def rerank(self, **kwargs):
+        self.requests.append(kwargs)
+        return SimpleNamespace(results=[
+            SimpleNamespace(index=1, relevance_score=0.9),
+            SimpleNamespace(index=0, relevance_score=0.1),
+        ])
 
 
 class TestReranker(unittest.TestCase):
@@ -58,5 +77,36 @@ class TestReranker(unittest.TestCase):
         self.assertEqual(reranked_search_results[1]["metadata"]["chunk_text"], "Goodbye, world!")
 
 
+    def test_arerank_search_results_default(self):
+        search_results = [{"metadata": {"chunk_header": "", "chunk_text": "Hello, world!"}, "similarity": 0.5}]
+        reranker = NoReranker(ignore_absolute_relevance=True)
+        reranked_search_results = asyncio.run(reranker.arerank_search_results("Hello", search_results))
+        self.assertEqual(reranked_search_results, [
+            {"metadata": {"chunk_header": "", "chunk_text": "Hello, world!"}, "similarity": 0.8},
+        ])
+
+    @unittest.skipUnless(importlib.util.find_spec("cohere") is not None, "cohere is not installed")
+    @patch.dict(os.environ, {"CO_API_KEY": "test"})
+    def test_arerank_search_results_cohere(self):
+        search_results = [
+            {"metadata": {"chunk_header": "Header", "chunk_text": "Goodbye, world!"}},
+            {"metadata": {"chunk_header": "", "chunk_text": "Hello, world!"}},
+        ]
+        reranker = CohereReranker()
+        client = FakeAsyncRerankClient()
+        reranker._async_clients = LoopLocal(lambda: client)
+        reranked_search_results = asyncio.run(reranker.arerank_search_results("Hello", search_results))
+        self.assertEqual(client.requests, [{
+            "model": reranker.model,
+            "query": "Hello",
+            "documents": ["Header\n\nGoodbye, world!", "\n\nHello, world!"],
+        }])
+        self.assertEqual(
+            [result["metadata"]["chunk_text"] for result in reranked_search_results],
+            ["Hello, world!", "Goodbye, world!"],
+        )
+        self.assertEqual(reranked_search_results[0]["similarity"], reranker.transform(0.9))
+
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,136 @@
+import time
+import unittest
+
+import numpy as np
+
+from dsrag.rse import get_best_segments, get_segment_values, get_valid_segments
+
+
+def reference_get_best_segments(all_relevance_values, document_splits, max_length, overall_max_length, minimum_value):
+    """The original brute-force search over every (start, end) pair, which get_best_segments must match exactly."""
+    best_segments = []
+    scores = []
+    total_length = 0
+    rv_index = 0
+    bad_rv_indices = []
+    while total_length < overall_max_length:
+        if rv_index >= len(all_relevance_values):
+            rv_index = 0
+        if len(bad_rv_indices) >= len(all_relevance_values):
+            break
+        if rv_index in bad_rv_indices:
+            rv_index += 1
+            continue
+
+        relevance_values = all_relevance_values[rv_index]
+        best_segment = None
+        best_value = -1000
+        for start in range(len(relevance_values)):
+            if relevance_values[start] < 0:
+                continue
+            for end in range(start + 1, min(start + max_length + 1, len(relevance_values) + 1)):
+                if relevance_values[end - 1] < 0:
+                    continue
+                if any(start < seg_end and end > seg_start for seg_start, seg_end in best_segments):
+                    continue
+                if any(start < split and end > split for split in document_splits):
+                    continue
+                if total_length + end - start > overall_max_length:
+                    continue
+                segment_value = sum(relevance_values[start:end])
+                if segment_value > best_value:
+                    best_value = segment_value
+                    best_segment = (start, end)
+
+        if best_segment is None or best_value < minimum_value:
+            bad_rv_indices.append(rv_index)
+            rv_index += 1
+            continue
+
+        best_segments.append(best_segment)
+        scores.append(best_value)
+        total_length += best_segment[1] - best_segment[0]
+        rv_index += 1
+
+    return best_segments, scores
+
+
+def random_relevance_values(rng, num_queries, document_lengths, rounded=False):
+    meta_document_length = sum(document_lengths)
+    all_relevance_values = []
+    for _ in range(num_queries):
+        # mostly irrelevant chunks, with a few clusters of relevant ones, like real chunk values
+        values = rng.normal(-0.2, 0.05, meta_document_length)
+        for center in rng.integers(0, meta_document_length, size=max(1, meta_document_length // 20)):
+            width = rng.integers(1, 8)
+            values[max(0, center - width):center + width] += rng.uniform(0.2, 1.2)
+        if rounded:
+            # coarse values, so that many segments tie
+            values = np.round(values * 4) / 4
+        all_relevance_values.append([np.float64(value) for value in values])
+    document_splits = list(np.cumsum(document_lengths))
+    return all_relevance_values, document_splits
+
+
+class TestGetBestSegments(unittest.TestCase):
+    def assert_matches_reference(self, *args):
+        self.assertEqual(get_best_segments(*args), reference_get_best_segments(*args))
+
+    def test_matches_reference(self):
+        rng = np.random.default_rng(0)
+        for case in range(200):
+            num_documents = int(rng.integers(1, 8))
+            document_lengths = [int(length) for length in rng.integers(1, 40, size=num_documents)]
+            all_relevance_values, document_splits = random_relevance_values(
+                rng, int(rng.integers(1, 4)), document_lengths, rounded=case % 2 == 1
+            )
+            self.assert_matches_reference(
+                all_relevance_values,
+                document_splits,
+                int(rng.integers(0, 20)),
+                int(rng.integers(1, 60)),
+                float(rng.choice([-2000.0, 0.0, 0.5, 1.0])),
+            )
+
+    def test_edge_cases(self):
+        self.assert_matches_reference([[]], [0], 5, 10, 0.5)
+        self.assert_matches_reference([], [], 5, 10, 0.5)
+        self.assert_matches_reference([[1.0, 1.0, 1.0]], [3], 0, 10, 0.5)
+        # equal values: the earliest start, then the shortest segment wins
+        self.assert_matches_reference([[1.0, 0.0, 1.0, 0.0, 1.0]], [5], 3, 10, 0.5)
+        # every segment is worth less than the initial best value
+        self.assert_matches_reference([[-2000.0, -2000.0]], [2], 2, 10, -5000.0)
+        # queries with different splits between their turns
+        self.assert_matches_reference([[1.0, 2.0, 0.5, 3.0], [3.0, 0.1, 0.1, 2.0]], [2, 4], 4, 3, 0.1)
+
+    def test_segment_values(self):
+        relevance_values = [0.1, 0.2, 0.3, -0.4]
+        segment_values = get_segment_values(relevance_values, 3)
+        for start in range(4):
+            for length in range(1, 4):
+                if start + length <= 4:
+                    self.assertEqual(segment_values[start, length - 1], sum(relevance_values[start:start + length]))
+                else:
+                    self.assertTrue(np.isnan(segment_values[start, length - 1]))
+
+    def test_valid_segments(self):
+        valid_segments = get_valid_segments([0.5, 0.5, -0.1, 0.5], [2, 4], 2)
+        self.assertEqual(valid_segments.tolist(), [
+            [True, True],    # (0, 1), (0, 2)
+            [True, False],   # (1, 2), (1, 3) crosses the split at 2
+            [False, False],  # starts on a negative chunk
+            [True, False],   # (3, 4), (3, 5) runs past the end
+        ])
+
+    def test_large_meta_document(self):
+        rng = np.random.default_rng(1)
+        all_relevance_values, document_splits = random_relevance_values(rng, 3, [30] * 200)
+        start_time = time.perf_counter()
+        best_segments, scores = get_best_segments(all_relevance_values, document_splits, 40, 200, 0.5)
+        self.assertLess(time.perf_counter() - start_time, 5)
+        self.assertTrue(best_segments)
+        self.assertEqual(len(best_segments), len(scores))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,11 @@
 from typing import Sequence
+import asyncio
 import numpy as np
 import os
 import sys
+import shutil
+import pickle
+import json
 import unittest
 import time
 import pytest
@@ -17,6 +21,7 @@ from dsrag.database.vector import (
     PineconeDB
 )
 from dsrag.database.vector.types import ChunkMetadata
+from dsrag.database.record_file import RecordFile
 
 
 class TestVectorDB(unittest.TestCase):
@@ -26,11 +31,16 @@ class TestVectorDB(unittest.TestCase):
         return super().setUp()
 
     def tearDown(self):
-        storage_path = os.path.join(
+        legacy_storage_path = os.path.join(
             self.storage_directory, "vector_storage", f"{self.kb_id}.pkl"
         )
+        if os.path.exists(legacy_storage_path):
+            os.remove(legacy_storage_path)
+        storage_path = os.path.join(
+            self.storage_directory, "vector_storage", self.kb_id
+        )
         if os.path.exists(storage_path):
-            os.remove(storage_path)
+            shutil.rmtree(storage_path)
         return super().tearDown()
 
     def test__add_vectors_and_search(self):
@@ -119,6 +129,166 @@ class TestVectorDB(unittest.TestCase):
         self.assertEqual(new_db.metadata[0]["doc_id"], "1")
         self.assertEqual(new_db.metadata[1]["doc_id"], "2")
 
+    def test__load_is_memory_mapped(self):
+        db = BasicVectorDB(self.kb_id, self.storage_directory)
+        vectors = [np.array([1, 0]), np.array([0, 1])]
+        metadata: Sequence[ChunkMetadata] = [
+            {
+                "doc_id": "1",
+                "chunk_index": 0,
+                "chunk_header": "Header1",
+                "chunk_text": "Text1",
+            },
+            {
+                "doc_id": "2",
+                "chunk_index": 1,
+                "chunk_header": "Header2",
+                "chunk_text": "Text2",
+            },
+        ]
+        db.add_vectors(vectors, metadata)
+        db.compact()
+
+        new_db = BasicVectorDB(self.kb_id, self.storage_directory)
+        self.assertIsInstance(new_db.vectors, np.memmap)
+        self.assertEqual(new_db.vectors.dtype, np.float32)
+        self.assertEqual(new_db.vectors.shape, (2, 2))
+        results = new_db.search(np.array([0, 1]), top_k=1)
+        self.assertEqual(results[0]["metadata"]["doc_id"], "2")
+
+    def test__wal_appends_without_rewriting_base(self):
+        db = BasicVectorDB(self.kb_id, self.storage_directory)
+        metadata: Sequence[ChunkMetadata] = [
+            {"doc_id": "1", "chunk_index": 0, "chunk_header": "", "chunk_text": "Text1"},
+            {"doc_id": "2", "chunk_index": 0, "chunk_header": "", "chunk_text": "Text2"},
+        ]
+        db.add_vectors([np.array([1, 0, 0]), np.array([0, 1, 0])], metadata)
+        db.compact()
+        base_vectors_path = db.vectors_path
+        base_mtime = os.path.getmtime(base_vectors_path)
+
+        db.add_vectors(
+            [np.array([0, 0, 1])],
+            [{"doc_id": "3", "chunk_index": 0, "chunk_header": "", "chunk_text": "Text3"}],
+        )
+        db.remove_document("1")
+
+        # only the log was written to
+        self.assertEqual(os.path.getmtime(base_vectors_path), base_mtime)
+        self.assertTrue(os.path.exists(db.wal_path))
+
+        # the log is replayed on load
+        reloaded_db = BasicVectorDB(self.kb_id, self.storage_directory)
+        self.assertEqual([meta["doc_id"] for meta in reloaded_db.metadata], ["2", "3"])
+        results = reloaded_db.search(np.array([0, 0, 1]), top_k=1)
+        self.assertEqual(results[0]["metadata"]["doc_id"], "3")
+
+        # compaction folds the log into a new base generation
+        reloaded_db.compact()
+        self.assertFalse(os.path.exists(reloaded_db.wal_path))
+        self.assertFalse(os.path.exists(base_vectors_path))
+        compacted_db = BasicVectorDB(self.kb_id, self.storage_directory)
+        self.assertEqual([meta["doc_id"] for meta in compacted_db.metadata], ["2", "3"])
+        self.assertEqual(compacted_db.vectors.shape, (2, 3))
+
+    def test__wal_recovers_from_partial_record(self):
+        db = BasicVectorDB(self.kb_id, self.storage_directory)
+        db.add_vectors(
+            [np.array([1, 0])],
+            [{"doc_id": "1", "chunk_index": 0, "chunk_header": "", "chunk_text": "Text1"}],
+        )
+        db.add_vectors(
+            [np.array([0, 1])],
+            [{"doc_id": "2", "chunk_index": 0, "chunk_header": "", "chunk_text": "Text2"}],
+        )
+        # simulate a crash in the middle of the last append
+        wal_size = os.path.getsize(db.wal_path)
+        with open(db.wal_path, "rb+") as f:
+            f.truncate(wal_size - 10)
+
+        reloaded_db = BasicVectorDB(self.kb_id, self.storage_directory)
+        self.assertEqual([meta["doc_id"] for meta in reloaded_db.metadata], ["1"])
+        reloaded_db.add_vectors(
+            [np.array([0, 1])],
+            [{"doc_id": "3", "chunk_index": 0, "chunk_header": "", "chunk_text": "Text3"}],
+        )
+        reloaded_db = BasicVectorDB(self.kb_id, self.storage_directory)
+        self.assertEqual([meta["doc_id"] for meta in reloaded_db.metadata], ["1", "3"])
+
+    def test__migrate_legacy_pickle(self):
+        legacy_storage_path = os.path.join(
+            self.storage_directory, "vector_storage", f"{self.kb_id}.pkl"
+        )
+        os.makedirs(os.path.dirname(legacy_storage_path), exist_ok=True)
+        vectors = [[1.0, 0.0], [0.0, 1.0]]
+        metadata = [
+            {"doc_id": "1", "chunk_index": 0, "chunk_header": "", "chunk_text": "Text1"},
+            {"doc_id": "2", "chunk_index": 0, "chunk_header": "", "chunk_text": "Text2"},
+        ]
+        with open(legacy_storage_path, "wb") as f:
+            pickle.dump((vectors, metadata), f)
+
+        db = BasicVectorDB(self.kb_id, self.storage_directory)
+        self.assertFalse(os.path.exists(legacy_storage_path))
+        self.assertTrue(os.path.exists(db.vectors_path))
+        self.assertEqual(len(db.metadata), 2)
+        np.testing.assert_array_equal(db.vectors, np.array(vectors, dtype=np.float32))
+
+        reloaded_db = BasicVectorDB(self.kb_id, self.storage_directory)
+        results = reloaded_db.search(np.array([1, 0]), top_k=1)
+        self.assertEqual(results[0]["metadata"]["doc_id"], "1")
+
+    def test__search_with_metadata_filter(self):
+        db = BasicVectorDB(self.kb_id, self.storage_directory)
+        vectors = [
+            np.array([1, 0]),
+            np.array([1, 0]),
+            np.array([0, 1]),
+            np.array([1, 0]),
+        ]
+        metadata: Sequence[ChunkMetadata] = [
+            {"doc_id": "1", "chunk_index": 0, "chunk_header": "Header1", "chunk_text": "Text1", "supp_id": "a"},
+            {"doc_id": "2", "chunk_index": 0, "chunk_header": "Header1", "chunk_text": "Text1", "supp_id": "b"},
+            {"doc_id": "3", "chunk_index": 1, "chunk_header": "Header2", "chunk_text": "Text2", "supp_id": "a"},
+            {"doc_id": "4", "chunk_index": 1, "chunk_header": "Header2", "chunk_text": "Text2"},
+        ]
+        db.add_vectors(vectors, metadata)
+        query_vector = np.array([1, 0])
+
+        def doc_ids(metadata_filter):
+            results = db.search(query_vector, top_k=4, metadata_filter=metadata_filter)
+            return [result["metadata"]["doc_id"] for result in results]
+
+        self.assertEqual(doc_ids({"field": "doc_id", "operator": "equals", "value": "1"}), ["1"])
+        self.assertEqual(doc_ids({"field": "supp_id", "operator": "equals", "value": "a"}), ["1", "3"])
+        self.assertEqual(doc_ids({"field": "supp_id", "operator": "not_equals", "value": "a"}), ["2"])
+        self.assertEqual(doc_ids({"field": "doc_id", "operator": "in", "value": ["2", "3"]}), ["2", "3"])
+        self.assertEqual(doc_ids({"field": "doc_id", "operator": "not_in", "value": ["1", "2"]}), ["4", "3"])
+        self.assertEqual(doc_ids({"field": "chunk_index", "operator": "greater_than", "value": 0}), ["4", "3"])
+        self.assertEqual(doc_ids({"field": "chunk_index", "operator": "less_than_equals", "value": 0}), ["1", "2"])
+        self.assertEqual(doc_ids({"field": "doc_id", "operator": "equals", "value": "5"}), [])
+
+        # the index has to follow removals and later additions
+        db.remove_document("1")
+        db.add_vectors([np.array([1, 0])], [{"doc_id": "5", "chunk_index": 0, "chunk_header": "", "chunk_text": "", "supp_id": "a"}])
+        self.assertEqual(doc_ids({"field": "supp_id", "operator": "equals", "value": "a"}), ["5", "3"])
+
+        with self.assertRaises(ValueError):
+            db.search(query_vector, metadata_filter={"field": "doc_id", "operator": "like", "value": "1"})
+
+    def test__faiss_search_with_metadata_filter(self):
+        db = BasicVectorDB(self.kb_id, self.storage_directory, use_faiss=True)
+        vectors = [np.array([1, 0]), np.array([0.9, 0.1]), np.array([0, 1])]
+        metadata: Sequence[ChunkMetadata] = [
+            {"doc_id": "1", "chunk_index": 0, "chunk_header": "", "chunk_text": ""},
+            {"doc_id": "2", "chunk_index": 0, "chunk_header": "", "chunk_text": ""},
+            {"doc_id": "2", "chunk_index": 1, "chunk_header": "", "chunk_text": ""},
+        ]
+        db.add_vectors(vectors, metadata)
+        metadata_filter = {"field": "doc_id", "operator": "equals", "value": "2"}
+        results = db.search(np.array([1, 0]), top_k=2, metadata_filter=metadata_filter)
+        self.assertEqual([result["metadata"]["chunk_index"] for result in results], [0, 1])
+
     def test__load_from_dict(self):
         config = {
             "subclass_name": "BasicVectorDB",
@@ -189,6 +359,269 @@ class TestVectorDB(unittest.TestCase):
 
         self.assertEqual(faiss_results, non_faiss_results)
 
+    def test__search_batch_matches_search(self):
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(30, 4))
+        # duplicate rows so ties have to be broken the same way as in search
+        vectors[10] = vectors[3]
+        metadata: Sequence[ChunkMetadata] = [
+            {"doc_id": str(i % 5), "chunk_index": i, "chunk_header": "", "chunk_text": ""}
+            for i in range(30)
+        ]
+        query_vectors = [vectors[3], rng.normal(size=4), rng.normal(size=4)]
+        metadata_filter = {"field": "doc_id", "operator": "in", "value": ["0", "3"]}
+
+        for use_faiss in (False, True):
+            db = BasicVectorDB(self.kb_id, self.storage_directory, use_faiss=use_faiss)
+            db.add_vectors(vectors, metadata)
+            for top_k, query_filter in ((5, None), (50, None), (3, metadata_filter)):
+                batch_results = db.search_batch(query_vectors, top_k=top_k, metadata_filter=query_filter)
+                self.assertEqual(len(batch_results), len(query_vectors))
+                for query_vector, results in zip(query_vectors, batch_results):
+                    single_results = db.search(query_vector, top_k=top_k, metadata_filter=query_filter)
+                    self.assertEqual(
+                        [result["metadata"]["chunk_index"] for result in results],
+                        [result["metadata"]["chunk_index"] for result in single_results],
+                    )
+            db.delete()
+
+        self.assertEqual(db.search_batch([], top_k=5), [])
+
+    def test__async_search(self):
+        db = BasicVectorDB(self.kb_id, self.storage_directory)
+        vectors = np.random.default_rng(0).normal(size=(10, 4))
+        db.add_vectors(vectors, [
+            {"doc_id": str(i), "chunk_index": i, "chunk_header": "", "chunk_text": ""} for i in range(10)
+        ])
+        query_vectors = list(vectors[:3])
+        async def search():
+            return await asyncio.gather(
+                db.asearch(query_vectors[0], top_k=3),
+                db.asearch_batch(query_vectors, top_k=3),
+            )
+        single_results, batch_results = asyncio.run(search())
+        self.assertEqual(single_results, db.search(query_vectors[0], top_k=3))
+        self.assertEqual(batch_results, db.search_batch(query_vectors, top_k=3))
+        db.delete()
+
+    def test__remove_document_uses_tombstones(self):
+        metadata: Sequence[ChunkMetadata] = [
+            {"doc_id": str(i // 2), "chunk_index": i % 2, "chunk_header": "", "chunk_text": ""}
+            for i in range(6)
+        ]
+        vectors = np.eye(6)
+        for use_faiss in (False, True):
+            db = BasicVectorDB(self.kb_id, self.storage_directory, use_faiss=use_faiss)
+            db.add_vectors(vectors, metadata)
+            db.remove_document("1")
+
+            # the rows stay in place until the next compaction, but are no longer visible
+            self.assertEqual(db._rows.shape, (6, 6))
+            self.assertEqual(db.vectors.shape, (4, 6))
+            self.assertEqual([meta["doc_id"] for meta in db.metadata], ["0", "0", "2", "2"])
+            results = db.search(vectors[2], top_k=6)
+            self.assertEqual(len(results), 4)
+            self.assertNotIn("1", [result["metadata"]["doc_id"] for result in results])
+
+            # a removed doc_id can be added again
+            db.add_vectors(vectors[2:4], metadata[2:4])
+            results = db.search(vectors[2], top_k=1)
+            self.assertEqual(results[0]["metadata"]["doc_id"], "1")
+            db.remove_document("1")
+
+            # compaction reclaims the tombstoned rows
+            db.compact()
+            self.assertEqual(db._rows.shape, (4, 6))
+            reloaded_db = BasicVectorDB(self.kb_id, self.storage_directory, use_faiss=use_faiss)
+            self.assertEqual([meta["doc_id"] for meta in reloaded_db.metadata], ["0", "0", "2", "2"])
+            results = reloaded_db.search(vectors[4], top_k=1, metadata_filter={"field": "doc_id", "operator": "equals", "value": "2"})
+            self.assertEqual(results[0]["metadata"]["chunk_index"], 0)
+            db.delete()
+
+    def test__lazy_load(self):
+        metadata: Sequence[ChunkMetadata] = [
+            {"doc_id": str(i), "chunk_index": 0, "chunk_header": "", "chunk_text": ""}
+            for i in range(3)
+        ]
+        db = BasicVectorDB(self.kb_id, self.storage_directory)
+        db.add_vectors(np.eye(3), metadata)
+
+        lazy_db = BasicVectorDB(self.kb_id, self.storage_directory, lazy_load=True)
+        self.assertFalse(lazy_db._load_complete)
+        results = lazy_db.search(np.array([0, 1, 0]), top_k=1)
+        self.assertTrue(lazy_db._load_complete)
+        self.assertEqual(results[0]["metadata"]["doc_id"], "1")
+
+        prefetched_db = BasicVectorDB(self.kb_id, self.storage_directory, lazy_load=True)
+        prefetched_db.prefetch().join()
+        self.assertTrue(prefetched_db._load_complete)
+        self.assertEqual(len(prefetched_db.metadata), 3)
+        db.delete()
+
+    def test__read_only_serves_published_generations(self):
+        metadata: Sequence[ChunkMetadata] = [
+            {"doc_id": str(i), "chunk_index": 0, "chunk_header": "", "chunk_text": f"chunk {i}"}
+            for i in range(4)
+        ]
+        writer = BasicVectorDB(self.kb_id, self.storage_directory)
+        writer.add_vectors(np.eye(4)[:3], metadata[:3])
+        writer.publish()
+
+        reader = BasicVectorDB(self.kb_id, self.storage_directory, read_only=True)
+        # the reader maps the published files instead of copying them
+        self.assertIsInstance(reader._rows, np.memmap)
+        self.assertIsInstance(reader._metadata, RecordFile)
+        results = reader.search(np.array([0, 1, 0, 0]), top_k=1)
+        self.assertEqual(results[0]["metadata"]["chunk_text"], "chunk 1")
+        with self.assertRaises(ValueError):
+            reader.add_vectors(np.eye(4)[3:], metadata[3:])
+
+        # unpublished writes aren't visible, and the reader keeps its generation until it refreshes
+        writer.add_vectors(np.eye(4)[3:], metadata[3:])
+        self.assertFalse(reader.refresh())
+        writer.publish()
+        self.assertEqual(len(reader.metadata), 3)
+        self.assertTrue(reader.refresh())
+        results = reader.search(np.array([0, 0, 0, 1]), top_k=1)
+        self.assertEqual(results[0]["metadata"]["doc_id"], "3")
+        writer.delete()
+
+    def test__load_format_version_1(self):
+        vector_storage_path = os.path.join(self.storage_directory, "vector_storage", self.kb_id)
+        os.makedirs(vector_storage_path, exist_ok=True)
+        metadata = [{"doc_id": "1", "chunk_index": 0, "chunk_header": "", "chunk_text": ""}]
+        np.save(os.path.join(vector_storage_path, "vectors.1.npy"), np.ones((1, 2), dtype=np.float32))
+        with open(os.path.join(vector_storage_path, "metadata.1.pkl"), "wb") as f:
+            pickle.dump(metadata, f)
+        with open(os.path.join(vector_storage_path, "manifest.json"), "w") as f:
+            json.dump({"format_version": 1, "generation": 1, "num_vectors": 1, "dimension": 2}, f)
+
+        db = BasicVectorDB(self.kb_id, self.storage_directory)
+        self.assertEqual(db.metadata, metadata)
+        db.compact()
+        self.assertTrue(db.metadata_path.endswith(".records"))
+        self.assertEqual(list(BasicVectorDB(self.kb_id, self.storage_directory).metadata), metadata)
+        db.delete()
+
+    def test__quantized_search_matches_exact_search(self):
+        rng = np.random.default_rng(1)
+        vectors = rng.normal(size=(300, 16))
+        metadata: Sequence[ChunkMetadata] = [
+            {"doc_id": str(i % 7), "chunk_index": i, "chunk_header": "", "chunk_text": ""}
+            for i in range(300)
+        ]
+        query_vectors = rng.normal(size=(5, 16))
+        exact_db = BasicVectorDB("test_db_exact", self.storage_directory)
+        exact_db.add_vectors(vectors, metadata)
+        exact_results = exact_db.search_batch(query_vectors, top_k=10)
+        exact_db.delete()
+
+        for quantization in ("float16", "int8"):
+            db = BasicVectorDB(
+                self.kb_id, self.storage_directory, quantization=quantization, rescore_multiplier=2
+            )
+            db.add_vectors(vectors[:200], metadata[:200])
+            db.search(query_vectors[0])
+            # rows added after the quantized matrix was built are quantized incrementally
+            db.add_vectors(vectors[200:], metadata[200:])
+            results = db.search_batch(query_vectors, top_k=10)
+            for expected, actual in zip(exact_results, results):
+                self.assertEqual(
+                    [result["metadata"]["chunk_index"] for result in actual],
+                    [result["metadata"]["chunk_index"] for result in expected],
+                )
+                # similarities come from exact re-scoring
+                np.testing.assert_allclose(
+                    [result["similarity"] for result in actual],
+                    [result["similarity"] for result in expected],
+                    rtol=1e-6,
+                )
+
+            db.remove_document("3")
+            results = db.search(query_vectors[0], top_k=300)
+            self.assertEqual(len(results), len([meta for meta in metadata if meta["doc_id"] != "3"]))
+            db.delete()
+
+    def test__sharded_search_matches_exact_search(self):
+        rng = np.random.default_rng(2)
+        vectors = rng.normal(size=(10000, 8)).astype(np.float32)
+        # exact duplicates in different shards, so the tie-break has to survive the merge
+        vectors[9000] = vectors[10]
+        metadata: Sequence[ChunkMetadata] = [
+            {"doc_id": str(i % 50), "chunk_index": i, "chunk_header": "", "chunk_text": ""}
+            for i in range(10000)
+        ]
+        query_vectors = [vectors[10].astype(np.float64), rng.normal(size=8), rng.normal(size=8).astype(np.float32)]
+        metadata_filter = {"field": "doc_id", "operator": "in", "value": ["10", "20"]}
+
+        exact_db = BasicVectorDB("test_db_exact", self.storage_directory)
+        sharded_db = BasicVectorDB(self.kb_id, self.storage_directory, search_shards=4)
+        for db in (exact_db, sharded_db):
+            db.add_vectors(vectors[:6000], metadata[:6000])
+            db.search(query_vectors[0])
+            db.add_vectors(vectors[6000:], metadata[6000:])
+            db.remove_document("3")
+
+        for query_filter in (None, metadata_filter):
+            expected = exact_db.search_batch(query_vectors, top_k=25, metadata_filter=query_filter)
+            actual = sharded_db.search_batch(query_vectors, top_k=25, metadata_filter=query_filter)
+            for expected_results, actual_results in zip(expected, actual):
+                self.assertEqual(
+                    [(result["metadata"]["chunk_index"], result["similarity"]) for result in actual_results],
+                    [(result["metadata"]["chunk_index"], result["similarity"]) for result in expected_results],
+                )
+        exact_db.delete()
+
+    def test__invalid_quantization(self):
+        with self.assertRaises(ValueError):
+            BasicVectorDB(self.kb_id, self.storage_directory, quantization="int4")
+
+    def test__faiss_index_is_persisted_and_extended(self):
+        rng = np.random.default_rng(0)
+        vectors = rng.normal(size=(50, 8)).astype(np.float32)
+        metadata: Sequence[ChunkMetadata] = [
+            {"doc_id": str(i), "chunk_index": 0, "chunk_header": "", "chunk_text": ""}
+            for i in range(50)
+        ]
+        db = BasicVectorDB(
+            self.kb_id, self.storage_directory, use_faiss=True, faiss_index_type="hnsw", ef_search=32
+        )
+        db.add_vectors(vectors[:40], metadata[:40])
+        db.save()
+        self.assertTrue(os.path.exists(db.faiss_index_path))
+
+        reloaded_db = BasicVectorDB(
+            self.kb_id, self.storage_directory, use_faiss=True, faiss_index_type="hnsw", ef_search=32
+        )
+        self.assertEqual(reloaded_db._faiss_index.index.ntotal, 40)
+        reloaded_db.add_vectors(vectors[40:], metadata[40:])
+        self.assertEqual(reloaded_db._faiss_index.index.ntotal, 50)
+
+        results = reloaded_db.search(vectors[45], top_k=1)
+        self.assertEqual(results[0]["metadata"]["doc_id"], "45")
+        self.assertAlmostEqual(results[0]["similarity"], 1.0, places=5)
+
+        # removals shift rows, so the index is rebuilt before the next search
+        reloaded_db.remove_document("45")
+        results = reloaded_db.search(vectors[45], top_k=1)
+        self.assertNotEqual(results[0]["metadata"]["doc_id"], "45")
+
+    def test__faiss_ivfpq_uses_flat_index_until_trainable(self):
+        db = BasicVectorDB(self.kb_id, self.storage_directory, use_faiss=True, faiss_index_type="ivfpq")
+        vectors = [np.array([1, 0]), np.array([0, 1])]
+        metadata: Sequence[ChunkMetadata] = [
+            {"doc_id": "1", "chunk_index": 0, "chunk_header": "", "chunk_text": ""},
+            {"doc_id": "2", "chunk_index": 0, "chunk_header": "", "chunk_text": ""},
+        ]
+        db.add_vectors(vectors, metadata)
+        self.assertEqual(db._faiss_index.kind, "flat")
+        results = db.search(np.array([0, 1]), top_k=1)
+        self.assertEqual(results[0]["metadata"]["doc_id"], "2")
+
+    def test__invalid_faiss_index_type(self):
+        with self.assertRaises(ValueError):
+            BasicVectorDB(self.kb_id, self.storage_directory, use_faiss=True, faiss_index_type="lsh")
+
     def test__delete(self):
         db = BasicVectorDB(self.kb_id, self.storage_directory, use_faiss=True)
         vectors = [np.array([1, 0]), np.array([0, 1])]
@@ -283,6 +716,21 @@ class TestChromaDB(unittest.TestCase):
         self.assertEqual(results[0]["metadata"]["doc_id"], "1")
         self.assertGreaterEqual(results[0]["similarity"], 0.99)
 
+    def test__search_batch(self):
+        db = ChromaDB(kb_id=self.kb_id)
+        vectors = [np.array([1, 0]), np.array([0, 1])]
+        metadata: Sequence[ChunkMetadata] = [
+            {"doc_id": "1", "chunk_index": 0, "chunk_header": "Header1", "chunk_text": "Text1"},
+            {"doc_id": "2", "chunk_index": 1, "chunk_header": "Header2", "chunk_text": "Text2"},
+        ]
+        db.add_vectors(vectors, metadata)
+
+        results = db.search_batch([np.array([1, 0]), np.array([0, 1])], top_k=1)
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0][0]["metadata"]["doc_id"], "1")
+        self.assertEqual(results[1][0]["metadata"]["doc_id"], "2")
+
     def test__search_with_metadata_filter(self):
         db = ChromaDB(kb_id=self.kb_id)
         vectors = [
@@ -546,6 +994,21 @@ class TestQdrantDB(unittest.TestCase):
         self.assertEqual(results[0]["metadata"]["doc_id"], "1")
         self.assertGreaterEqual(results[0]["similarity"], 0.99)
 
+    def test__search_batch(self):
+        db = QdrantVectorDB(kb_id=self.kb_id, location=":memory:")
+        vectors = [np.array([1, 0]), np.array([0, 1])]
+        metadata: Sequence[ChunkMetadata] = [
+            {"doc_id": "1", "chunk_index": 0, "chunk_header": "Header1", "chunk_text": "Text1"},
+            {"doc_id": "2", "chunk_index": 1, "chunk_header": "Header2", "chunk_text": "Text2"},
+        ]
+        db.add_vectors(vectors, metadata)
+
+        results = db.search_batch([np.array([1, 0]), np.array([0, 1])], top_k=1)
+
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0][0]["metadata"]["doc_id"], "1")
+        self.assertEqual(results[1][0]["metadata"]["doc_id"], "2")
+
     def test__search_with_metadata_filter(self):
         from qdrant_client import models
 
@@ -771,6 +1234,43 @@ class TestPostgresVectorDB(unittest.TestCase):
         # Make sure the results are just an empty list
         self.assertEqual(len(results), 0)
 
+    def test__005_halfvec_bulk_load_with_deferred_index(self):
+        db = PostgresVectorDB(
+            kb_id=f"{self.kb_id}_halfvec",
+            username=self.username,
+            password=self.password,
+            database=self.database,
+            host=self.host,
+            port=self.port,
+            vector_dimension=self.vector_dimension,
+            use_halfvec=True,
+            defer_index_build=True,
+        )
+        try:
+            rng = np.random.default_rng(0)
+            vectors = rng.normal(size=(300, self.vector_dimension))
+            metadata: Sequence[ChunkMetadata] = [
+                {"doc_id": f"doc_{i % 3}", "chunk_index": i, "chunk_header": "", "chunk_text": f"Text {i}"}
+                for i in range(300)
+            ]
+            db.add_vectors(vectors, metadata)
+            db.build_index()
+            self.assertEqual(db.get_num_vectors(), 300)
+
+            # more results than pgvector's default ef_search of 40
+            results = db.search(vectors[0], top_k=200)
+            self.assertEqual(len(results), 200)
+            self.assertEqual(results[0]["metadata"]["chunk_index"], 0)
+
+            metadata_filter = {"field": "doc_id", "operator": "equals", "value": "doc_1"}
+            results = db.search(vectors[0], top_k=100, metadata_filter=metadata_filter)
+            self.assertTrue(all(result["metadata"]["doc_id"] == "doc_1" for result in results))
+            if db._pgvector_version >= (0, 8, 0):
+                # iterative scans keep going until the filter has let through enough rows
+                self.assertEqual(len(results), 100)
+        finally:
+            db.delete()
+
     """def test__assertion_error_on_mismatched_input_lengths(self):
         db = ChromaDB(kb_id=self.kb_id)
         vectors = [np.array([1, 0])]